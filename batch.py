@@ -0,0 +1,190 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from complet import (
+    collect_company_data,
+    create_enhanced_pdf_report,
+    extract_company_info,
+    generate_enhanced_porter_analysis,
+    read_pdf,
+)
+from history_store import record_analysis
+from llm_registry import warm_up
+from pdf_cache import file_digest
+
+# === Configuration ===
+DEFAULT_OUTPUT_DIR = os.path.join("output", "batch")
+DONE_MARKER = "done.json"
+ERROR_MARKER = "error.json"
+
+
+def discover_documents(source: str) -> List[str]:
+    """Liste les PDF à traiter : tous les *.pdf d'un dossier, ou les chemins
+    d'un manifeste (.json contenant une liste, ou .txt avec un chemin par ligne)."""
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.pdf")))
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        if source.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [entry if os.path.isabs(entry) else os.path.join(base_dir, entry) for entry in entries]
+
+
+def _write_json(path: str, data) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_document(file_path: str) -> str:
+    # Exécuté dans un processus du pool CPU : pas de pool imbriqué
+    return read_pdf(file_path, workers=1)
+
+
+class BatchRunner:
+    """Enchaîne lecture → extraction → collecte → génération → rendu sur plusieurs PDF.
+
+    Les documents avancent en parallèle ; les étapes CPU (lecture, rendu) et
+    les étapes LLM (extraction, génération) ont chacune leur propre limite de
+    concurrence. Un document déjà terminé (même contenu) est ignoré à la reprise.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_OUTPUT_DIR, cpu_workers: int = 2, llm_workers: int = 1,
+                 force: bool = False, analysis_options: Optional[Dict] = None):
+        self.output_dir = output_dir
+        self.cpu_workers = cpu_workers
+        self.llm_workers = llm_workers
+        self.force = force
+        self.analysis_options = analysis_options or {}
+        self._cpu_slots = threading.BoundedSemaphore(cpu_workers)
+        self._llm_slots = threading.BoundedSemaphore(llm_workers)
+
+    def document_dir(self, file_path: str) -> str:
+        """Dossier de sortie du document : nom du fichier suivi d'un hash court de son
+        chemin absolu, pour que a/rapport.pdf et b/rapport.pdf ne se chevauchent pas."""
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        path_hash = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.output_dir, f"{name}-{path_hash}")
+
+    def is_done(self, file_path: str, digest: str) -> bool:
+        marker = os.path.join(self.document_dir(file_path), DONE_MARKER)
+        if self.force or not os.path.exists(marker):
+            return False
+        with open(marker, encoding="utf-8") as f:
+            return json.load(f).get("sha256") == digest
+
+    def process(self, file_path: str, read_pool: ProcessPoolExecutor) -> str:
+        digest = file_digest(file_path)
+        if self.is_done(file_path, digest):
+            return "skipped"
+
+        doc_dir = self.document_dir(file_path)
+        os.makedirs(doc_dir, exist_ok=True)
+        started_at = datetime.now().isoformat()
+
+        with self._cpu_slots:
+            text = read_pool.submit(_read_document, file_path).result()
+        with self._llm_slots:
+            company_info = extract_company_info(text, map_reduce=self.analysis_options.get("map_reduce", False))
+        _write_json(os.path.join(doc_dir, "company_info.json"), company_info)
+
+        web_data = collect_company_data(company_info) if company_info else {}
+        _write_json(os.path.join(doc_dir, "web_data.json"), web_data)
+
+        with self._llm_slots:
+            analysis = generate_enhanced_porter_analysis(text, company_info, web_data, **self.analysis_options)
+        with open(os.path.join(doc_dir, "analysis.md"), "w", encoding="utf-8") as f:
+            f.write(analysis)
+
+        with self._cpu_slots:
+            create_enhanced_pdf_report(analysis, company_info, os.path.join(doc_dir, "rapport_porter_enrichi.pdf"))
+
+        record_analysis(company_info, web_data, analysis, digest, source=os.path.abspath(file_path),
+                        output_path=os.path.join(doc_dir, "rapport_porter_enrichi.pdf"),
+                        options=self.analysis_options)
+
+        # Le marqueur est écrit en dernier : sa présence garantit des sorties complètes
+        _write_json(os.path.join(doc_dir, DONE_MARKER), {
+            "source": os.path.abspath(file_path),
+            "sha256": digest,
+            "started_at": started_at,
+            "finished_at": datetime.now().isoformat(),
+        })
+        error_marker = os.path.join(doc_dir, ERROR_MARKER)
+        if os.path.exists(error_marker):
+            os.remove(error_marker)
+        return "done"
+
+    def run(self, documents: List[str]) -> Dict[str, str]:
+        statuses: Dict[str, str] = {}
+        # Assez de documents en vol pour occuper à la fois les slots CPU et LLM
+        in_flight = self.cpu_workers + self.llm_workers
+        with ProcessPoolExecutor(max_workers=self.cpu_workers) as read_pool, \
+                ThreadPoolExecutor(max_workers=in_flight) as executor:
+            futures = {executor.submit(self.process, doc, read_pool): doc for doc in documents}
+            for future, doc in futures.items():
+                try:
+                    statuses[doc] = future.result()
+                except Exception as e:
+                    statuses[doc] = "failed"
+                    doc_dir = self.document_dir(doc)
+                    os.makedirs(doc_dir, exist_ok=True)
+                    _write_json(os.path.join(doc_dir, ERROR_MARKER), {
+                        "error": str(e),
+                        "traceback": traceback.format_exc(),
+                    })
+                print(f"{'✅' if statuses[doc] != 'failed' else '❌'} {os.path.basename(doc)} : {statuses[doc]}")
+        return statuses
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse Porter enrichie d'un lot de PDF")
+    parser.add_argument("source", help="Dossier contenant les PDF, ou manifeste (.txt / .json)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--cpu-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Lectures PDF et rendus simultanés")
+    parser.add_argument("--llm-workers", type=int, default=1,
+                        help="Appels Ollama simultanés (voir OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--force", action="store_true", help="Retraiter les documents déjà terminés")
+    parser.add_argument("--map-reduce", action="store_true", help="Analyser le document entier par morceaux")
+    parser.add_argument("--parallel-sections", action="store_true", help="Générer les sections en parallèle")
+    parser.add_argument("--retrieval", action="store_true", help="Passages pertinents via un index local du document")
+    args = parser.parse_args(argv)
+
+    documents = discover_documents(args.source)
+    if not documents:
+        print(f"❌ Aucun PDF trouvé dans : {args.source}")
+        return 1
+
+    print(f"📚 {len(documents)} documents à traiter")
+    warm_up()
+    runner = BatchRunner(
+        output_dir=args.output_dir,
+        cpu_workers=args.cpu_workers,
+        llm_workers=args.llm_workers,
+        force=args.force,
+        analysis_options={"map_reduce": args.map_reduce, "parallel_sections": args.parallel_sections,
+                          "retrieval": args.retrieval},
+    )
+    statuses = runner.run(documents)
+    failed = sum(1 for status in statuses.values() if status == "failed")
+    skipped = sum(1 for status in statuses.values() if status == "skipped")
+    print(f"📂 Terminé : {len(statuses) - failed - skipped} traités, {skipped} déjà faits, {failed} en échec")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from fpdf import FPDF
+
+# === Configuration ===
+DEFAULT_SIZES = [10, 100, 1000]
+# Durées absolues mesurées sur une machine donnée : une référence n'est valable que
+# sur la machine qui l'a enregistrée (--update-baseline sur la machine de CI)
+BASELINE_PATH = "benchmark_baseline.json"
+RESULTS_PATH = os.path.join("output", "benchmarks", "latest.json")
+# Une mesure est une régression si elle dépasse la référence de plus de
+# TOLERANCE (relatif) ET de MIN_REGRESSION_S (absolu, contre le bruit)
+TOLERANCE = 0.20
+MIN_REGRESSION_S = 0.05
+
+PARAGRAPH = (
+    "La société a poursuivi en {year} le développement de ses activités dans l'énergie, "
+    "les services numériques et la logistique. Le chiffre d'affaires progresse de {growth} % "
+    "face aux concurrents A, B et C, dans un marché marqué par la pression des clients sur les prix, "
+    "la concentration des fournisseurs et l'arrivée de nouveaux entrants. "
+)
+
+
+def make_synthetic_pdf(path: str, pages: int) -> str:
+    """Crée un PDF de `pages` pages de texte proche d'un rapport annuel."""
+    pdf = FPDF()
+    pdf.set_font("helvetica", size=10)
+    for page in range(pages):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, f"Rapport annuel - page {page + 1}")
+        pdf.ln(2)
+        for i in range(6):
+            pdf.multi_cell(0, 5, PARAGRAPH.format(year=2000 + (page + i) % 25, growth=(page * 7 + i) % 30))
+            pdf.ln(2)
+    pdf.output(path)
+    return path
+
+
+@contextmanager
+def bench_environment() -> Iterator[str]:
+    """Dossier temporaire pour des mesures à froid : caches PDF, LLM, index et
+    traces isolés, historique séparé. Les modules lisant leur configuration à
+    l'import, le pipeline doit être importé dans ce contexte ; l'environnement
+    et le dossier sont restaurés à la sortie."""
+    directory = tempfile.mkdtemp(prefix="porter-bench-")
+    overrides = {
+        "LLM_CACHE_ENABLED": "0",
+        "PDF_CACHE_DIR": os.path.join(directory, "pdf_cache"),
+        "TRACE_DIR": os.path.join(directory, "traces"),
+        "RETRIEVAL_CACHE_DIR": os.path.join(directory, "retrieval"),
+        "HISTORY_PATH": os.path.join(directory, "history.sqlite"),
+    }
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield directory
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_case(pdf_path: str, analysis_options: Dict, directory: str) -> Dict[str, float]:
+    """Exécute le pipeline complet une fois (avec le modèle enregistré) et retourne la durée de chaque étape."""
+    from complet import run_enhanced_pipeline
+
+    output_path = os.path.join(directory, "rapport.pdf")
+    started = time.perf_counter()
+    result = run_enhanced_pipeline(input_path=pdf_path, output_path=output_path, **analysis_options)
+    timings = {stage["name"]: stage["wall_s"] for stage in result["trace"]["stages"]}
+    timings["end_to_end"] = time.perf_counter() - started
+    return timings
+
+
+def case_name(size: int, analysis_options: Dict) -> str:
+    """Nom d'un cas : taille et options actives, pour ne comparer qu'à une référence mesurée avec les mêmes options."""
+    flags = [key if value is True else f"{key}={value}"
+             for key, value in sorted(analysis_options.items()) if value not in (None, False)]
+    return " ".join([f"{size}_pages"] + flags)
+
+
+def run_benchmarks(sizes: List[int], repeat: int, analysis_options: Dict,
+                   directory: str) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for size in sizes:
+        pdf_path = make_synthetic_pdf(os.path.join(directory, f"synthetic_{size}.pdf"), size)
+        runs = []
+        for _ in range(repeat):
+            # Cache PDF vidé : chaque répétition relit le document
+            shutil.rmtree(os.environ["PDF_CACHE_DIR"], ignore_errors=True)
+            runs.append(run_case(pdf_path, analysis_options, directory))
+        results[case_name(size, analysis_options)] = {
+            stage: statistics.median(run[stage] for run in runs) for stage in runs[0]
+        }
+    return results
+
+
+def compare(results: Dict, baseline: Dict) -> List[str]:
+    """Liste des régressions de `results` par rapport à `baseline`."""
+    regressions = []
+    for case, stages in results.items():
+        for stage, seconds in stages.items():
+            reference = baseline.get(case, {}).get(stage)
+            if reference is None:
+                continue
+            if seconds > reference * (1 + TOLERANCE) and seconds - reference > MIN_REGRESSION_S:
+                regressions.append(f"{case} / {stage} : {seconds:.3f} s (référence {reference:.3f} s, "
+                                   f"+{(seconds / reference - 1) * 100:.0f} %)")
+    return regressions
+
+
+def print_table(results: Dict, baseline: Dict) -> None:
+    for case, stages in results.items():
+        print(f"\n📄 {case}")
+        for stage, seconds in stages.items():
+            reference = baseline.get(case, {}).get(stage)
+            delta = f"  ({(seconds / reference - 1) * 100:+.0f} %)" if reference else ""
+            print(f"   {stage:<36} {seconds:8.3f} s{delta}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline avec un LLM et une recherche simulés")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Nombre de pages des PDF générés")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions par taille (médiane retenue)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Latence simulée par appel LLM (s)")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=500.0, help="Débit de décodage simulé")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Latence simulée par recherche (s)")
+    parser.add_argument("--map-reduce", action="store_true")
+    parser.add_argument("--parallel-sections", action="store_true")
+    parser.add_argument("--retrieval", action="store_true")
+    parser.add_argument("--single-pass", action="store_true", help="Extraction et plan en une seule lecture")
+    parser.add_argument("--tier", help="Niveau d'analyse (fast, standard, deep ; défaut : ANALYSIS_TIER)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Référence propre à cette machine")
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistrer ces mesures comme référence")
+    args = parser.parse_args(argv)
+
+    with bench_environment() as directory:
+        from fakes import FakeLLM, FakeSearchBackend
+        from llm_registry import register_llm
+        from search_backends import set_search_backend
+        from tiers import DEFAULT_TIER, TIERS
+
+        tier = args.tier or DEFAULT_TIER
+        if tier not in TIERS:
+            parser.error(f"niveau inconnu : {tier} (choix : {', '.join(TIERS)})")
+        # Un modèle simulé par modèle de niveau, pour ne jamais joindre un serveur réel
+        for model in {analysis_tier.model for analysis_tier in TIERS.values()}:
+            register_llm(FakeLLM(latency_s=args.llm_latency, tokens_per_s=args.llm_tokens_per_s), model)
+        set_search_backend(FakeSearchBackend(latency_s=args.search_latency))
+        options = {"map_reduce": args.map_reduce, "parallel_sections": args.parallel_sections,
+                   "retrieval": args.retrieval, "single_pass": args.single_pass, "tier": tier}
+        results = run_benchmarks(args.sizes, args.repeat, options, directory)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        # Les cas mesurés avec d'autres options restent dans la référence
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(baseline, **results), f, indent=2)
+        print(f"\n📌 Référence mise à jour : {args.baseline}")
+        return 0
+
+    missing = [case for case in results if case not in baseline]
+    if missing:
+        print(f"\n❌ Aucune référence dans {args.baseline} pour : {', '.join(missing)}")
+        print("   Relancer avec --update-baseline sur cette machine pour l'enregistrer.")
+        return 1
+
+    regressions = compare(results, baseline)
+    if regressions:
+        print("\n❌ RÉGRESSIONS DE PERFORMANCE (référence enregistrée sur cette machine ?) :")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print("\n✅ Aucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
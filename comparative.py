@@ -0,0 +1,293 @@
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+
+from batch import discover_documents
+from complet import (
+    ANALYSIS_SLOT_TOKENS,
+    SEARCH_CONCURRENCY,
+    SEARCH_TIMEOUT,
+    SearchQuery,
+    assemble_collected_data,
+    build_analysis_inputs,
+    extract_company_info,
+    plan_company_queries,
+    read_pdf,
+    run_queries,
+)
+from instrumentation import start_trace, traced
+from langchain_ollama import OllamaLLM
+from llm_cache import invoke_llm
+from llm_registry import MODEL_NAME, get_llm, warm_up
+from map_reduce import MAP_REDUCE_WORKERS, parallel_map
+from pdf_report import render_report
+from porter_sections import format_sources
+from progress import TerminalProgress, listen, task
+from prompt_budget import format_web_table
+
+# === Configuration ===
+DEFAULT_OUTPUT_PATH = os.path.join("output", "rapport_porter_comparatif.pdf")
+# Actualités sectorielles (toutes entreprises confondues) données au contexte commun
+SECTOR_NEWS_TOKENS = 1500
+# Catégories de recherche propres à chaque entreprise ; industry_news va au contexte commun
+COMPANY_CATEGORIES = ("company_official", "company_linkedin", "competitor_news")
+
+SECTOR_TEMPLATE = """
+    Tu es un expert en stratégie d'entreprise et en intelligence économique.
+
+    ## ENTREPRISES COMPARÉES :
+    {companies}
+
+    ## ACTUALITÉS SECTORIELLES COLLECTÉES :
+    {industry_news}
+
+    ---
+
+    Rédige en français le contexte sectoriel commun à ces entreprises : tendances du marché,
+    réglementation, technologies, nouveaux entrants et substituts, dynamique concurrentielle.
+    Commence exactement par le titre "## CONTEXTE SECTORIEL". Pour chaque actualité citée,
+    indique la date et la source. N'analyse pas encore chaque entreprise séparément.
+    """
+
+# Le contexte sectoriel ouvre le prompt : identique pour toutes les entreprises,
+# son cache KV est réutilisé par le serveur d'un profil à l'autre
+PROFILE_TEMPLATE = """
+    Tu es un expert en stratégie d'entreprise et en intelligence économique.
+
+    {sector_context}
+
+    ---
+
+    ## ENTREPRISE ANALYSÉE :
+    {company_info}
+
+    ## DOCUMENT DE L'ENTREPRISE :
+    {original_text}
+
+    ## DONNÉES WEB PROPRES À L'ENTREPRISE :
+    {web_data}
+
+    ---
+
+    Rédige en français le profil Porter de {company_name} dans ce contexte sectoriel.
+    Commence exactement par le titre "### {company_name}" puis, pour chacune des 5 forces
+    (rivalité, nouveaux entrants, substituts, clients, fournisseurs), une ligne "**Force** : note/5"
+    (1 = pression faible, 5 = pression forte) suivie de 2 à 4 puces denses et sourcées.
+    Termine par "**Atouts** :" et "**Vulnérabilités** :" en une puce chacun.
+    """
+
+COMPARISON_TEMPLATE = """
+    Tu es un expert en stratégie d'entreprise et en intelligence économique.
+
+    {sector_context}
+
+    ## PROFILS PORTER DES ENTREPRISES :
+    {profiles}
+
+    ---
+
+    Rédige en français la comparaison de ces {count} entreprises selon les 5 forces de Porter.
+    Commence exactement par le titre "## COMPARAISON DES 5 FORCES" puis, pour chaque force,
+    un titre "### <force>" et une puce par entreprise (note/5 et justification en une phrase),
+    suivie d'une phrase sur l'écart entre les entreprises.
+    Ajoute ensuite "### Positionnement relatif" (classement argumenté) et
+    "### Recommandations par entreprise" (2 à 3 puces par entreprise).
+    N'utilise pas de tableau.
+    """
+
+
+def _query_key(search: SearchQuery) -> str:
+    return " ".join(search.query.casefold().split())
+
+
+def plan_shared_queries(company_infos: List[Dict]) -> Tuple[List[SearchQuery], List[List[SearchQuery]], List[List[int]]]:
+    """Requêtes de toutes les entreprises, dédoublonnées.
+
+    Retourne (requêtes uniques, requêtes de chaque entreprise, indice de chaque
+    requête d'entreprise dans la liste unique). Une requête partagée demande
+    le plus grand nombre de résultats voulu par les entreprises concernées.
+    """
+    unique: List[SearchQuery] = []
+    positions: Dict[str, int] = {}
+    per_company, indexes = [], []
+    for company_info in company_infos:
+        queries = plan_company_queries(company_info) if company_info.get("nom_entreprise") else []
+        per_company.append(queries)
+        company_indexes = []
+        for search in queries:
+            key = _query_key(search)
+            if key not in positions:
+                positions[key] = len(unique)
+                unique.append(search)
+            elif search.num_results > unique[positions[key]].num_results:
+                unique[positions[key]] = unique[positions[key]]._replace(num_results=search.num_results)
+            company_indexes.append(positions[key])
+        indexes.append(company_indexes)
+    return unique, per_company, indexes
+
+
+@traced("collect_comparative_data")
+def collect_shared_data(company_infos: List[Dict], concurrency: int = SEARCH_CONCURRENCY,
+                        timeout: float = SEARCH_TIMEOUT) -> Tuple[List[Dict], Dict[str, int]]:
+    """Données web de chaque entreprise, chaque requête commune n'étant exécutée qu'une fois."""
+    unique, per_company, indexes = plan_shared_queries(company_infos)
+    planned = sum(len(queries) for queries in per_company)
+    with task(f"🌐 Recherche web ({len(unique)} requêtes uniques sur {planned})..."):
+        results = run_queries(unique, concurrency, timeout)
+
+    web_data = []
+    for company_info, queries, company_indexes in zip(company_infos, per_company, indexes):
+        if not queries:
+            web_data.append({})
+            continue
+        company_results = [results[i][:search.num_results] for search, i in zip(queries, company_indexes)]
+        web_data.append(assemble_collected_data(company_info, queries, company_results))
+    return web_data, {"planned_queries": planned, "executed_queries": len(unique)}
+
+
+def _industry_news(web_data: List[Dict]) -> List[Dict]:
+    return [item for data in web_data for item in data.get("industry_news", [])]
+
+
+def generate_sector_context(llm: OllamaLLM, company_infos: List[Dict], web_data: List[Dict],
+                            use_cache: bool = True) -> str:
+    """Contexte sectoriel rédigé une seule fois pour toutes les entreprises."""
+    companies = "\n".join(
+        f"- {info['nom_entreprise']} : {', '.join(info.get('domaines_activite', []))} ({info.get('pays', '')})"
+        for info in company_infos if info.get("nom_entreprise")
+    )
+    prompt = PromptTemplate(template=SECTOR_TEMPLATE, input_variables=["companies", "industry_news"])
+    industry_news = format_web_table({"industry_news": _industry_news(web_data)}, SECTOR_NEWS_TOKENS)
+    with task("🏭 Contexte sectoriel commun..."):
+        return invoke_llm(prompt, llm, {"companies": companies, "industry_news": industry_news}, use_cache=use_cache)
+
+
+def generate_company_profile(llm: OllamaLLM, sector_context: str, company_info: Dict, document: str,
+                             web_data: Dict, use_cache: bool = True) -> str:
+    """Profil Porter court d'une entreprise, sur le contexte sectoriel commun."""
+    company_web = {category: web_data.get(category, []) for category in COMPANY_CATEGORIES}
+    inputs = build_analysis_inputs(company_info, document, company_web, ANALYSIS_SLOT_TOKENS)
+    prompt = PromptTemplate(
+        template=PROFILE_TEMPLATE,
+        input_variables=["sector_context", "company_info", "original_text", "web_data", "company_name"],
+    )
+    values = {key: inputs[key] for key in ("company_info", "original_text", "web_data", "company_name")}
+    return invoke_llm(prompt, llm, dict(values, sector_context=sector_context), use_cache=use_cache)
+
+
+def generate_comparison(llm: OllamaLLM, sector_context: str, profiles: List[str], use_cache: bool = True) -> str:
+    prompt = PromptTemplate(template=COMPARISON_TEMPLATE, input_variables=["sector_context", "profiles", "count"])
+    with task("⚖️  Comparaison des entreprises..."):
+        return invoke_llm(prompt, llm, {"sector_context": sector_context, "profiles": "\n\n".join(profiles),
+                                        "count": len(profiles)}, use_cache=use_cache)
+
+
+def assemble_comparative_report(company_infos: List[Dict], sector_context: str, comparison: str,
+                                profiles: List[str], web_data: List[Dict]) -> str:
+    names = ", ".join(info["nom_entreprise"] for info in company_infos if info.get("nom_entreprise"))
+    merged_web = {category: [item for data in web_data for item in data.get(category, [])]
+                  for category in COMPANY_CATEGORIES + ("industry_news",)}
+    parts = [
+        f"# ANALYSE PORTER COMPARATIVE - {names}",
+        sector_context,
+        comparison,
+        "## PROFILS PAR ENTREPRISE\n\n" + "\n\n".join(profiles),
+        format_sources(merged_web),
+    ]
+    return "\n\n---\n\n".join(parts)
+
+
+def run_comparative_analysis(pdf_paths: List[str], output_path: Optional[str] = DEFAULT_OUTPUT_PATH,
+                             llm: Optional[OllamaLLM] = None, use_cache: bool = True,
+                             max_workers: int = MAP_REDUCE_WORKERS) -> Dict:
+    """Analyse Porter comparée de plusieurs entreprises d'un même secteur.
+
+    Seules l'extraction et le profil court sont faits par entreprise ; la
+    recherche web (requêtes communes dédoublonnées), le contexte sectoriel et
+    la comparaison finale sont partagés, si bien que le coût croît moins vite
+    que le nombre d'entreprises.
+
+    Lève ValueError si moins de deux entreprises distinctes sont identifiées
+    dans les documents : il n'y a alors rien à comparer.
+    """
+    llm = llm or get_llm()
+    with start_trace(inputs=pdf_paths, model=MODEL_NAME, mode="comparative") as trace, \
+            task(f"📊 Analyse Porter comparative : {len(pdf_paths)} documents"):
+        texts = parallel_map(read_pdf, pdf_paths, max_workers)
+        company_infos = parallel_map(lambda text: extract_company_info(text, use_cache=use_cache, llm=llm),
+                                     texts, max_workers)
+        analysed = [i for i, info in enumerate(company_infos) if info.get("nom_entreprise")]
+        for i, path in enumerate(pdf_paths):
+            if i not in analysed:
+                print(f"⚠️  Entreprise non identifiée, document ignoré : {path}")
+        texts = [texts[i] for i in analysed]
+        company_infos = [company_infos[i] for i in analysed]
+        companies = {" ".join(info["nom_entreprise"].casefold().split()) for info in company_infos}
+        if len(companies) < 2:
+            raise ValueError(f"Comparaison impossible : {len(companies)} entreprise(s) distincte(s) identifiée(s) "
+                             f"dans {len(pdf_paths)} documents, il en faut au moins deux")
+
+        web_data, stats = collect_shared_data(company_infos)
+        sector_context = generate_sector_context(llm, company_infos, web_data, use_cache=use_cache)
+
+        with task(f"🧠 Profils Porter ({len(company_infos)} entreprises)..."):
+            profiles = parallel_map(
+                lambda args: generate_company_profile(llm, sector_context, *args, use_cache=use_cache),
+                list(zip(company_infos, texts, web_data)), max_workers,
+            )
+        comparison = generate_comparison(llm, sector_context, profiles, use_cache=use_cache)
+        analysis = assemble_comparative_report(company_infos, sector_context, comparison, profiles, web_data)
+
+        if output_path:
+            render_report(analysis, output_path, company_name=", ".join(
+                info["nom_entreprise"] for info in company_infos))
+
+    return {
+        "company_infos": company_infos,
+        "web_data": web_data,
+        "sector_context": sector_context,
+        "profiles": profiles,
+        "analysis": analysis,
+        "output_path": output_path,
+        "stats": dict(stats, companies=len(company_infos)),
+        "trace": trace.to_dict(),
+        "trace_path": trace.export(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse Porter comparée de plusieurs entreprises")
+    parser.add_argument("sources", nargs="+", help="PDF, dossiers de PDF ou manifestes (.txt / .json)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_PATH)
+    parser.add_argument("--workers", type=int, default=MAP_REDUCE_WORKERS, help="Appels LLM simultanés")
+    args = parser.parse_args(argv)
+
+    pdf_paths = []
+    for source in args.sources:
+        pdf_paths.extend([source] if source.lower().endswith(".pdf") else discover_documents(source))
+    missing = [path for path in pdf_paths if not os.path.exists(path)]
+    if missing:
+        print(f"❌ Fichiers introuvables : {', '.join(missing)}")
+        return 1
+    if len(pdf_paths) < 2:
+        print("❌ Au moins deux documents sont nécessaires pour une comparaison")
+        return 1
+
+    warm_up()
+    try:
+        with listen(TerminalProgress()):
+            result = run_comparative_analysis(pdf_paths, output_path=args.output, max_workers=args.workers)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    stats = result["stats"]
+    print(f"🔎 Requêtes web : {stats['executed_queries']} exécutées pour {stats['planned_queries']} prévues")
+    print(f"📂 Fichier disponible : {result['output_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
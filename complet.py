@@ -1,58 +1,89 @@
+import asyncio
+import hashlib
 import os
 import sys
-import threading
-import time
-import re
-import requests
-from PyPDF2 import PdfReader
-from fpdf import FPDF
 from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
 import itertools
 import json
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
-import unicodedata
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from deadline import Deadline, generate_until
+from history_store import record_analysis
+from instrumentation import start_trace, summarize_trace, traced
+from llm_cache import invoke_llm, stream_llm
+from llm_registry import get_llm, warm_up
+from map_reduce import (
+    estimate_tokens,
+    map_reduce as run_map_reduce,
+    merge_company_infos,
+    parallel_map,
+    split_into_chunks,
+)
+from pdf_cache import file_digest
+from pdf_extraction import extract_text
+from pdf_report import PDFReportRenderer, render_report
+from porter_sections import (
+    DOCUMENT_PREFIX,
+    SECTIONS,
+    assemble_report,
+    format_omitted,
+    format_sources,
+    generate_report_by_sections,
+    keep_complete_sections,
+)
+from progress import TerminalProgress, fraction_listener, listen, task
+from prompt_budget import allocate, count_tokens, fit_text, fit_text_with_offset, format_web_table
+from retrieval import get_document_index
+from schemas import (
+    PartialCompanyInfo,
+    analysis_plan_schema,
+    company_info_schema,
+    validate_analysis_plan,
+    validate_company_info,
+)
+from search_backends import get_search_backend
+from stage_graph import Stage, run_stage_graph
+from tiers import DEADLINE_RESERVE_S, DEADLINE_SEARCH_SHARE, DEADLINE_SECTIONS_SHARE, AnalysisTier, get_tier
 
 # === Configuration ===
 INPUT_PDF_PATH = os.path.join("pdfs", "document.pdf")
 OUTPUT_PDF_PATH = os.path.join("output", "rapport_porter_enrichi.pdf")
-MODEL_NAME = "llama3:instruct"
-SPINNER_RUNNING = True
+# Recherches web simultanées et délai maximal par recherche (secondes)
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "8"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "20"))
 
-# Optionnel : API keys pour des recherches plus avancées
-SERPAPI_KEY = os.getenv("SERPAPI_KEY")  # Pour Google Search API
-NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")  # Pour News API
 
-
-# === Animation spinner ===
-def spinner(message="🔄 Traitement en cours..."):
-    for c in itertools.cycle(["|", "/", "-", "\\"]):
-        if not SPINNER_RUNNING:
-            break
-        sys.stdout.write(f"\r{message} {c}")
-        sys.stdout.flush()
-        time.sleep(0.1)
-    sys.stdout.write(f"\r✅ {message.replace('🔄', '').strip()} terminé !       \n")
+# === Étape 1 : Lire le contenu du PDF ===
+@traced("read_pdf")
+def read_pdf(file_path: str, workers: Optional[int] = None, max_chars: Optional[int] = None,
+             use_cache: bool = True) -> str:
+    """Lit le texte du PDF ; workers > 1 répartit les pages sur un pool de processus
+    et max_chars arrête la lecture dès que suffisamment de texte est disponible.
+    Le texte d'un fichier déjà lu est servi depuis le cache disque."""
+    return extract_text(file_path, workers=workers, max_chars=max_chars, use_cache=use_cache)
 
 
-# === Étape 1 : Lire le contenu du PDF ===
-def read_pdf(file_path: str) -> str:
-    reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text.strip()
+@traced("read_pdf_head")
+def read_pdf_head(file_path: str, use_cache: bool = True) -> str:
+    """Début du document (EXTRACTION_MAX_CHARS) lu page par page pour lancer l'extraction au plus tôt ;
+    tracé à part de la lecture complète qui tourne en parallèle."""
+    return extract_text(file_path, workers=1, max_chars=EXTRACTION_MAX_CHARS, use_cache=use_cache)
 
 
 # === Étape 2 : Extraire les informations de l'entreprise ===
-def extract_company_info(text: str) -> Dict[str, any]:
-    """Extrait le nom de l'entreprise et ses domaines d'activité du PDF"""
+# Le document vient en premier (DOCUMENT_PREFIX) : l'analyse qui suit sur le même
+# document réutilise le cache KV du serveur pour ce préfixe
+COMPANY_INFO_TEMPLATE = DOCUMENT_PREFIX + """{continuation}
 
-    template = """
-    Analyse le texte suivant et extrait uniquement les informations demandées au format JSON :
+    ---
 
-    {text}
+    Analyse le document ci-dessus et extrait uniquement les informations demandées au format JSON.
 
     Retourne UNIQUEMENT un JSON valide avec cette structure exacte :
     {{
@@ -66,183 +97,524 @@ def extract_company_info(text: str) -> Dict[str, any]:
     Assure-toi que le JSON soit valide et sans texte supplémentaire.
     """
 
-    prompt = PromptTemplate(template=template, input_variables=["text"])
-    llm = OllamaLLM(model=MODEL_NAME)
-    runner = prompt | llm
+# Suffixe commun aux prompts de réparation d'une réponse JSON invalide
+REPAIR_INSTRUCTIONS = """
+    Ta réponse précédente ne respecte pas le schéma :
+    {previous}
+
+    Erreurs : {errors}
+
+    Retourne le JSON corrigé.
+    """
+
+COMPANY_INFO_REPAIR_TEMPLATE = COMPANY_INFO_TEMPLATE + REPAIR_INSTRUCTIONS
+
+# Taille du texte envoyée au modèle en une seule requête
+EXTRACTION_MAX_CHARS = 8000
+# Plafond de tokens générés pour le JSON (quelques dizaines suffisent)
+EXTRACTION_MAX_TOKENS = 400
+
+
+def _extraction_llm(llm: OllamaLLM, max_tokens: int = EXTRACTION_MAX_TOKENS) -> OllamaLLM:
+    """Copie du modèle bornée pour l'extraction : sortie courte et déterministe.
+
+    Le client HTTP est partagé avec l'original ; un modèle sans model_copy
+    (doublure de test) est utilisé tel quel.
+    """
+    if not hasattr(llm, "model_copy"):
+        return llm
+    return llm.model_copy(update={"num_predict": max_tokens, "temperature": 0})
+
+
+def _generate_json(template: str, repair_template: str, schema: Dict, validate: Callable, inputs: Dict,
+                   llm: OllamaLLM, use_cache: bool = True,
+                   on_partial: Optional[Callable[[Dict], None]] = None) -> Optional[Dict]:
+    """Réponse JSON contrainte par schema, validée, avec un seul appel de réparation ; None si invalide."""
+    prompt = PromptTemplate(template=template, input_variables=list(inputs))
+    if on_partial is None:
+        result = invoke_llm(prompt, llm, inputs, use_cache=use_cache, format=schema)
+    else:
+        partial = PartialCompanyInfo()
+        for piece in stream_llm(prompt, llm, inputs, use_cache=use_cache, format=schema):
+            if partial.feed(piece):
+                on_partial(dict(partial.info))
+        result = partial.buffer
+    data, errors = validate(result)
+    if data is not None:
+        return data
+
+    inputs = dict(inputs, previous=result[:2000], errors=errors)
+    repair = PromptTemplate(template=repair_template, input_variables=list(inputs))
+    result = invoke_llm(repair, llm, inputs, use_cache=use_cache, format=schema)
+    data, errors = validate(result)
+    if data is None:
+        print(f"⚠️  Réponse d'extraction invalide après réparation : {errors}")
+    return data
+
+
+def extract_partial_company_info(chunk: str, llm: OllamaLLM, use_cache: bool = True,
+                                 continuation: str = "",
+                                 on_partial: Optional[Callable[[Dict], None]] = None) -> Dict[str, any]:
+    """Extraction sur un morceau du document, en sortie JSON contrainte par le schéma CompanyInfo.
+
+    continuation est la suite du texte, placée après le préfixe commun
+    DOCUMENT_PREFIX (qui ne contient que chunk). Une réponse invalide (JSON tronqué, champ manquant) donne lieu à un seul
+    appel de réparation qui reprend le même prompt suivi des erreurs ; {} si
+    elle reste invalide.
+
+    Avec on_partial, la réponse est lue en streaming et on_partial reçoit les
+    champs déjà complets (PartialCompanyInfo.info) à chaque nouvelle valeur.
+    """
+    inputs = {"original_text": chunk, "continuation": continuation}
+    company_info = _generate_json(COMPANY_INFO_TEMPLATE, COMPANY_INFO_REPAIR_TEMPLATE, company_info_schema(),
+                                  validate_company_info, inputs, _extraction_llm(llm), use_cache, on_partial)
+    return company_info or {}
+
+
+def _split_document_head(text: str) -> Tuple[str, str]:
+    """Même début de document que le prompt d'analyse (préfixe réutilisable), puis la suite
+    jusqu'à EXTRACTION_MAX_CHARS."""
+    head, offset = fit_text_with_offset(text, ANALYSIS_SLOT_TOKENS["original_text"])
+    return head, text[offset:EXTRACTION_MAX_CHARS]
 
-    global SPINNER_RUNNING
-    SPINNER_RUNNING = True
-    t = threading.Thread(target=spinner, args=("🔍 Extraction des informations entreprise...",))
-    t.start()
+
+@traced("extract_company_info")
+def extract_company_info(text: str, use_cache: bool = True, map_reduce: bool = False,
+                         llm: Optional[OllamaLLM] = None,
+                         on_partial: Optional[Callable[[Dict], None]] = None) -> Dict[str, any]:
+    """Extrait le nom de l'entreprise et ses domaines d'activité du PDF
+
+    Avec map_reduce=True, un document long est découpé en morceaux analysés en
+    parallèle puis fusionnés, au lieu de n'en lire que les 8000 premiers caractères.
+    on_partial (voir extract_partial_company_info) ne sert qu'à l'extraction
+    en une requête : les résultats par morceau ne sont connus qu'après fusion.
+    """
+
+    llm = llm or get_llm()
 
     try:
-        result = runner.invoke({"text": text[:8000]})
-        SPINNER_RUNNING = False
-        t.join()
-
-        # Nettoyer le résultat et extraire le JSON
-        json_match = re.search(r'\{.*\}', result, re.DOTALL)
-        if json_match:
-            company_info = json.loads(json_match.group())
-            print(company_info)
-            return company_info
-        else:
-            print("⚠️  Impossible d'extraire les informations au format JSON")
-            return {}
+        with task("🔍 Extraction des informations entreprise..."):
+            if map_reduce and len(text) > EXTRACTION_MAX_CHARS:
+                company_info = run_map_reduce(
+                    split_into_chunks(text),
+                    lambda chunk: extract_partial_company_info(chunk, llm, use_cache=use_cache),
+                    merge_company_infos,
+                )
+            else:
+                head, continuation = _split_document_head(text)
+                company_info = extract_partial_company_info(head, llm, use_cache=use_cache,
+                                                            continuation=continuation, on_partial=on_partial)
     except Exception as e:
-        SPINNER_RUNNING = False
-        t.join()
         print(f"❌ Erreur lors de l'extraction : {e}")
         return {}
 
+    if company_info:
+        print(company_info)
+        return company_info
+    else:
+        print("⚠️  Impossible d'extraire les informations au format JSON")
+        return {}
 
-# === Étape 3 : Recherche web enrichie ===
-def web_search_basic(query: str, num_results: int = 5) -> List[Dict]:
-    """Recherche web basique avec requests (sans API payante)"""
+
+# Mode single_pass : informations entreprise et plan de l'analyse en une seule lecture
+ANALYSIS_PLAN_TEMPLATE = DOCUMENT_PREFIX + """{continuation}
+
+    ---
+
+    Lis le document ci-dessus et retourne UNIQUEMENT un JSON valide contenant :
+    - "entreprise" : nom exact de l'entreprise (nom_entreprise), domaines d'activité,
+      secteur principal, pays et concurrents mentionnés ;
+    - "plan" : pour chaque force de Porter (rivalite, nouveaux_entrants, substitution,
+      clients, fournisseurs) et pour chiffres_cles, au plus 4 points factuels tirés du
+      document (chiffres, noms, faits datés), une phrase chacun.
+
+    N'invente rien : une liste reste vide si le document n'aborde pas le sujet.
+    """
+
+ANALYSIS_PLAN_REPAIR_TEMPLATE = ANALYSIS_PLAN_TEMPLATE + REPAIR_INSTRUCTIONS
+
+# Le plan compte jusqu'à 24 phrases en plus des informations entreprise
+ANALYSIS_PLAN_MAX_TOKENS = 1200
+OUTLINE_TITLES = dict(
+    {section.key: section.heading.split(". ", 1)[-1].capitalize() for section in SECTIONS[:5]},
+    chiffres_cles="Chiffres clés",
+)
+
+
+@traced("extract_analysis_plan")
+def extract_analysis_plan(text: str, use_cache: bool = True, llm: Optional[OllamaLLM] = None,
+                          on_partial: Optional[Callable[[Dict], None]] = None) -> Tuple[Dict, Optional[Dict]]:
+    """Informations entreprise et plan d'analyse (points clés par force) en un seul appel.
+
+    Le document n'est lu qu'une fois par le modèle : l'analyse qui suit part
+    du plan (format_outline) au lieu du texte. Retourne (company_info, plan) ;
+    plan vaut None si la réponse est restée invalide, company_info étant
+    alors {} comme pour extract_company_info.
+    """
+    llm = llm or get_llm()
+    head, continuation = _split_document_head(text)
+    inputs = {"original_text": head, "continuation": continuation}
     try:
-        # Simulation d'une recherche - à remplacer par une vraie API
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        with task("🔍 Extraction des informations et du plan d'analyse..."):
+            data = _generate_json(ANALYSIS_PLAN_TEMPLATE, ANALYSIS_PLAN_REPAIR_TEMPLATE, analysis_plan_schema(),
+                                  validate_analysis_plan, inputs, _extraction_llm(llm, ANALYSIS_PLAN_MAX_TOKENS),
+                                  use_cache, on_partial)
+    except Exception as e:
+        print(f"❌ Erreur lors de l'extraction : {e}")
+        return {}, None
+
+    if data is None:
+        print("⚠️  Impossible d'extraire les informations au format JSON")
+        return {}, None
+    print(data["entreprise"])
+    return data["entreprise"], data["plan"]
+
+
+def format_outline(plan: Dict) -> str:
+    """Plan d'analyse en markdown, passé au prompt d'analyse à la place du document."""
+    lines = ["Points clés relevés dans le document, par force de Porter :"]
+    for key, title in OUTLINE_TITLES.items():
+        points = plan.get(key, [])
+        lines.append(f"{title} :")
+        if points:
+            lines.extend(f"- {point}" for point in points)
+        else:
+            lines.append("- Rien dans le document")
+    return "\n".join(lines)
 
-        # Pour une vraie implémentation, utilisez une API comme SerpAPI, Google Custom Search, etc.
-        # Simulation avec dates et sources réalistes pour le template
-        current_date = datetime.now()
-        results = [
-            {
-                "title": f"Dernières actualités - {query}",
-                "snippet": "Informations récentes trouvées sur le web avec contexte détaillé...",
-                "url": "https://example.com/news/article1",
-                "date": current_date.strftime("%Y-%m-%d"),
-                "source": "Les Échos",
-                "published_date": "2025-01-15"
-            },
-            {
-                "title": f"Analyse sectorielle - {query}",
-                "snippet": "Étude approfondie des tendances du marché...",
-                "url": "https://example.com/analysis/sector",
-                "date": current_date.strftime("%Y-%m-%d"),
-                "source": "Reuters",
-                "published_date": "2025-01-10"
-            }
-        ]
 
-        return results[:num_results]
+def summarize_document(text: str, use_cache: bool = True, max_tokens: Optional[int] = None,
+                       llm: Optional[OllamaLLM] = None) -> str:
+    """Résume le document complet par map-reduce pour l'analyse Porter.
+
+    Chaque morceau est résumé en parallèle ; si les résumés réunis dépassent
+    encore max_tokens, ils sont regroupés et résumés à nouveau. max_tokens est
+    le budget de la variable du prompt que le résumé remplit (par défaut
+    ANALYSIS_SLOT_TOKENS["original_text"]), compté comme dans ce prompt.
+    """
+
+    map_template = """
+    Voici un extrait du rapport d'une entreprise :
+
+    {text}
+
+    Résume en français, en quelques phrases factuelles, les informations utiles à une
+    analyse des 5 forces de Porter : concurrents, clients, fournisseurs, produits de
+    substitution, nouveaux entrants, chiffres clés et stratégie. Ignore le reste.
+    """
+
+    reduce_template = """
+    Voici des résumés partiels du rapport d'une entreprise :
+
+    {text}
+
+    Fusionne-les en un seul résumé factuel en français, sans répétitions, en conservant
+    les chiffres, les noms et tout ce qui concerne les 5 forces de Porter.
+    Le résumé ne doit pas dépasser {max_words} mots.
+    """
+
+    llm = llm or get_llm()
+    max_tokens = max_tokens or ANALYSIS_SLOT_TOKENS["original_text"]
+    map_prompt = PromptTemplate(template=map_template, input_variables=["text"])
+    reduce_prompt = PromptTemplate(template=reduce_template, input_variables=["text", "max_words"])
+    # Jusqu'à 2 tokens par mot de français avec count_tokens (ponctuation comprise)
+    max_words = max_tokens // 2
+
+    def reduce(text: str) -> str:
+        return invoke_llm(reduce_prompt, llm, {"text": text, "max_words": max_words}, use_cache=use_cache)
+
+    summaries = parallel_map(
+        lambda chunk: invoke_llm(map_prompt, llm, {"text": chunk}, use_cache=use_cache),
+        split_into_chunks(text),
+    )
+    summary = "\n\n".join(summaries)
+    while estimate_tokens(summary) > max_tokens:
+        if len(summaries) == 1:
+            # Un seul résumé, encore trop long : une dernière réécriture à la taille du budget
+            return reduce(summary)
+        groups = split_into_chunks(summary, overlap_tokens=0)
+        if len(groups) >= len(summaries):
+            # Résumés trop longs pour être regroupés : fusion deux à deux
+            groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+        summaries = parallel_map(reduce, groups)
+        summary = "\n\n".join(summaries)
+    return summary
+
+
+# === Étape 3 : Recherche web enrichie ===
+def web_search_basic(query: str, num_results: int = 5) -> List[Dict]:
+    """Recherche web via le backend configuré (SerpAPI, NewsAPI ou résultats simulés)"""
+    try:
+        return get_search_backend().search(query, num_results)
     except Exception as e:
         print(f"❌ Erreur de recherche web : {e}")
         return []
 
 
-def collect_company_data(company_info: Dict) -> Dict[str, List]:
-    """Collecte des données web sur l'entreprise et ses concurrents"""
+class SearchQuery(NamedTuple):
+    category: str           # clé de collected_data où ranger les résultats
+    query: str
+    num_results: int
+    tags: Dict[str, str]    # métadonnées ajoutées à chaque résultat
 
-    if not company_info.get("nom_entreprise"):
-        return {"error": "Nom d'entreprise non trouvé"}
 
-    company_name = company_info["nom_entreprise"]
-    domains = company_info.get("domaines_activite", [])
-    competitors = company_info.get("concurrents_mentionnes", [])
-
-    collected_data = {
-        "company_official": [],
-        "company_linkedin": [],
-        "industry_news": [],
-        "competitor_news": [],
-        "search_metadata": {
-            "timestamp": datetime.now().isoformat(),
-            "company": company_name,
-            "domains_searched": domains,
-            "competitors_searched": competitors
-        }
-    }
+def plan_company_queries(company_info: Dict) -> List[SearchQuery]:
+    """Liste les recherches à effectuer pour l'entreprise, dans l'ordre du rapport.
 
-    global SPINNER_RUNNING
+    Sans nom d'entreprise (extraction encore en cours), seules les recherches
+    par domaine et par concurrent sont planifiées.
+    """
+    company_name = company_info.get("nom_entreprise")
+    queries = []
+    if company_name:
+        queries += [
+            SearchQuery("company_official", f"{company_name} site officiel actualités 2025", 5, {}),
+            SearchQuery("company_linkedin", f"{company_name} linkedin company news updates", 5, {}),
+        ]
+    for domain in company_info.get("domaines_activite", [])[:3]:  # Limiter à 3 domaines
+        queries.append(SearchQuery(
+            "industry_news", f"actualités {domain} tendances marché janvier 2025", 4,
+            {"domain": domain, "search_type": "industry_news"},
+        ))
+    for competitor in company_info.get("concurrents_mentionnes", [])[:4]:  # Limiter à 4 concurrents
+        queries.append(SearchQuery(
+            "competitor_news", f'"{competitor}" actualités news 2025 stratégie', 10,
+            {"competitor": competitor, "search_type": "competitor_news"},
+        ))
+    return queries
+
+
+async def run_queries_async(queries: List[SearchQuery], concurrency: int = SEARCH_CONCURRENCY,
+                            timeout: float = SEARCH_TIMEOUT) -> List[List[Dict]]:
+    """Exécute les recherches simultanément (au plus `concurrency` à la fois).
+
+    Une recherche en échec ou dépassant `timeout` secondes donne une liste vide
+    sans interrompre les autres. Les résultats suivent l'ordre des requêtes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    # Pool dédié : celui par défaut d'asyncio peut compter moins de threads que `concurrency`
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+
+    async def run(search: SearchQuery) -> List[Dict]:
+        async with semaphore:
+            try:
+                results = await asyncio.wait_for(
+                    loop.run_in_executor(executor, web_search_basic, search.query, search.num_results), timeout
+                )
+            except asyncio.TimeoutError:
+                print(f"⚠️  Recherche expirée : {search.query}")
+                return []
+            except Exception as e:
+                print(f"❌ Erreur de recherche web : {e}")
+                return []
+        return [{**result, **search.tags} for result in results]
 
-    # 1. Site officiel de l'entreprise
-    SPINNER_RUNNING = True
-    t1 = threading.Thread(target=spinner, args=("🌐 Recherche site officiel...",))
-    t1.start()
+    try:
+        return await asyncio.gather(*(run(search) for search in queries))
+    finally:
+        # Ne pas attendre les recherches expirées encore en cours
+        executor.shutdown(wait=False)
 
-    official_query = f"{company_name} site officiel actualités 2025"
-    collected_data["company_official"] = web_search_basic(official_query, 5)
-    print(collected_data["company_official"])
-    SPINNER_RUNNING = False
-    t1.join()
 
-    # 2. LinkedIn de l'entreprise
-    SPINNER_RUNNING = True
-    t2 = threading.Thread(target=spinner, args=("💼 Recherche LinkedIn entreprise...",))
-    t2.start()
+def run_queries(queries: List[SearchQuery], concurrency: int = SEARCH_CONCURRENCY,
+                timeout: float = SEARCH_TIMEOUT) -> List[List[Dict]]:
+    """Version synchrone de run_queries_async, utilisable avec ou sans boucle asyncio active."""
+    coroutine = run_queries_async(queries, concurrency, timeout)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Appel depuis une boucle déjà active : exécuter dans un thread dédié
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
 
-    linkedin_query = f"{company_name} linkedin company news updates"
-    collected_data["company_linkedin"] = web_search_basic(linkedin_query, 5)
-    print(collected_data["company_linkedin"])
-    SPINNER_RUNNING = False
-    t2.join()
 
-    # 3. Actualités du secteur pour chaque domaine
-    for domain in domains[:3]:  # Limiter à 3 domaines
-        SPINNER_RUNNING = True
-        t3 = threading.Thread(target=spinner, args=(f"📰 Actualités {domain}...",))
-        t3.start()
+class SearchPrefetcher:
+    """Recherches lancées dès qu'elles sont connues, avant la fin de l'extraction.
 
-        news_query = f"actualités {domain} tendances marché janvier 2025"
-        domain_news = web_search_basic(news_query, 4)
+    Chaque requête n'est exécutée qu'une fois ; results() attend celles
+    demandées (au plus `timeout` secondes après leur lancement) et lance
+    celles qui ne l'ont pas encore été. Les requêtes devenues inutiles
+    (extraction corrigée entre-temps) sont simplement ignorées.
+    """
 
-        # Ajouter métadonnées pour identifier le domaine
-        for news in domain_news:
-            news["domain"] = domain
-            news["search_type"] = "industry_news"
+    def __init__(self, concurrency: int = SEARCH_CONCURRENCY, timeout: float = SEARCH_TIMEOUT):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="search")
+        self._futures: Dict[str, Tuple[Future, float]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, queries: List[SearchQuery]) -> None:
+        with self._lock:
+            for search in queries:
+                if search.query not in self._futures:
+                    future = self._executor.submit(web_search_basic, search.query, search.num_results)
+                    self._futures[search.query] = (future, time.monotonic())
+
+    def results(self, queries: List[SearchQuery]) -> List[List[Dict]]:
+        self.submit(queries)
+        collected = []
+        for search in queries:
+            future, started = self._futures[search.query]
+            try:
+                results = future.result(timeout=max(0.0, started + self.timeout - time.monotonic()))
+            except FutureTimeoutError:
+                print(f"⚠️  Recherche expirée : {search.query}")
+                results = []
+            collected.append([{**result, **search.tags} for result in results[:search.num_results]])
+        return collected
+
+    def close(self) -> None:
+        # Ne pas attendre les recherches expirées encore en cours
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@traced("collect_company_data")
+def collect_company_data(company_info: Dict, concurrency: int = SEARCH_CONCURRENCY,
+                         timeout: float = SEARCH_TIMEOUT,
+                         prefetcher: Optional[SearchPrefetcher] = None) -> Dict[str, List]:
+    """Collecte des données web sur l'entreprise et ses concurrents
+
+    Toutes les recherches partent en même temps : la durée de la collecte est
+    proche de celle de la recherche la plus lente. Avec prefetcher, les
+    recherches déjà lancées pendant l'extraction sont réutilisées.
+    """
 
-        collected_data["industry_news"].extend(domain_news)
-        print(collected_data["industry_news"])
-        SPINNER_RUNNING = False
-        t3.join()
+    if not company_info.get("nom_entreprise"):
+        return {"error": "Nom d'entreprise non trouvé"}
 
-    # 4. Actualités des concurrents
-    for competitor in competitors[:4]:  # Limiter à 4 concurrents
-        SPINNER_RUNNING = True
-        t4 = threading.Thread(target=spinner, args=(f"🏢 Actualités {competitor}...",))
-        t4.start()
+    queries = plan_company_queries(company_info)
 
-        competitor_query = f'"{competitor}" actualités news 2025 stratégie'
-        competitor_news = web_search_basic(competitor_query, 10)
+    with task(f"🌐 Recherche web ({len(queries)} requêtes)..."):
+        if prefetcher is not None:
+            results = prefetcher.results(queries)
+        else:
+            results = run_queries(queries, concurrency, timeout)
 
-        # Ajouter métadonnées pour identifier le concurrent
-        for news in competitor_news:
-            news["competitor"] = competitor
-            news["search_type"] = "competitor_news"
+    return assemble_collected_data(company_info, queries, results)
 
-        collected_data["competitor_news"].extend(competitor_news)
 
-        SPINNER_RUNNING = False
-        t4.join()
+def assemble_collected_data(company_info: Dict, queries: List[SearchQuery],
+                            results: List[List[Dict]]) -> Dict[str, List]:
+    """Range les résultats de chaque requête dans la structure collected_data."""
+    collected_data = {
+        "company_official": [],
+        "company_linkedin": [],
+        "industry_news": [],
+        "competitor_news": [],
+        "search_metadata": {
+            "timestamp": datetime.now().isoformat(),
+            "company": company_info["nom_entreprise"],
+            "domains_searched": company_info.get("domaines_activite", []),
+            "competitors_searched": company_info.get("concurrents_mentionnes", [])
+        }
+    }
+    for search, search_results in zip(queries, results):
+        collected_data[search.category].extend(search_results)
 
+    for category in ("company_official", "company_linkedin", "industry_news", "competitor_news"):
+        print(f"🔎 {category} : {len(collected_data[category])} résultats")
     return collected_data
 
 
 # === Étape 4 : Générer l'analyse Porter enrichie ===
-def generate_enhanced_porter_analysis(original_text: str, company_info: Dict, web_data: Dict) -> str:
-    """Génère une analyse Porter enrichie avec les données web"""
-
-    template = """
-    Tu es un expert en stratégie d'entreprise et en intelligence économique.
+# Au-delà, le document est résumé ou interrogé par l'index local au lieu d'être inclus tel quel
+ANALYSIS_MAX_CHARS = 4000
+# Budget en tokens de chaque variable du prompt d'analyse ; la part du document
+# non utilisée revient aux données web
+ANALYSIS_SLOT_TOKENS = {"company_info": 150, "original_text": 1000, "web_data": 700}
+# Réponse attendue (rapport d'au moins 10 000 caractères), réservée dans la fenêtre de contexte
+ANALYSIS_OUTPUT_TOKENS = 4000
+# Budget des passages retrouvés par l'index local, par prompt
+RETRIEVAL_TOKENS = ANALYSIS_SLOT_TOKENS["original_text"]
+
+
+def build_analysis_inputs(company_info: Dict, document: str, web_data: Dict,
+                          slot_tokens: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+    """Variables communes aux prompts d'analyse (rapport complet ou par section).
+
+    Chaque variable est ramenée à son budget en tokens sans couper au milieu
+    d'un paragraphe ni d'un résultat web ; les résultats web sont passés en
+    tableau compact dédoublonné plutôt qu'en JSON indenté.
+    """
+    slot_tokens = slot_tokens or ANALYSIS_SLOT_TOKENS
+    document = fit_text(document, slot_tokens["original_text"])
+    spare_tokens = max(0, slot_tokens["original_text"] - count_tokens(document))
+    return {
+        "company_info": fit_text(json.dumps(company_info, ensure_ascii=False), slot_tokens["company_info"]),
+        "original_text": document,
+        "web_data": format_web_table(web_data, slot_tokens["web_data"] + spare_tokens),
+        "company_name": company_info.get("nom_entreprise", "Entreprise"),
+        "domains": ", ".join(company_info.get("domaines_activite", []))
+    }
 
-    Ta mission est de créer un **rapport en francais enrichi d'au moins 10 000 caractères** selon le modèle des **5 forces de Porter**, pour l’entreprise suivante, en exploitant toutes les données fournies :
 
-    ---
+def _output_limited_llm(llm: OllamaLLM, max_tokens: Optional[int]) -> OllamaLLM:
+    """Copie du modèle dont chaque réponse est bornée à max_tokens (num_predict)."""
+    if max_tokens is None or not hasattr(llm, "model_copy"):
+        return llm
+    return llm.model_copy(update={"num_predict": max_tokens})
+
+
+def _interrupted_report(text: str, company_info: Dict, web_data: Dict) -> str:
+    """Rapport complet à partir d'une génération interrompue : sections terminées, limites, sources."""
+    kept = keep_complete_sections(text)
+    omitted = [section.heading for section in SECTIONS if section.heading.casefold() not in kept.casefold()]
+    if not kept:
+        inputs = build_analysis_inputs(company_info, "", {})
+        return assemble_report(inputs["company_name"], inputs["domains"], None, [], web_data, omitted)
+    parts = [kept, format_omitted(omitted)]
+    if "## SOURCES" not in kept:
+        parts.append(format_sources(web_data))
+    return "\n\n---\n\n".join(parts)
+
+
+@traced("generate_enhanced_porter_analysis")
+def generate_enhanced_porter_analysis(original_text: str, company_info: Dict, web_data: Dict,
+                                      use_cache: bool = True, map_reduce: bool = False,
+                                      parallel_sections: bool = False,
+                                      on_token: Optional[Callable[[str], None]] = None,
+                                      llm: Optional[OllamaLLM] = None, retrieval: bool = False,
+                                      tier: Optional[AnalysisTier] = None,
+                                      deadline: Optional[Deadline] = None,
+                                      outline: Optional[Dict] = None) -> str:
+    """Génère une analyse Porter enrichie avec les données web
+
+    Avec map_reduce=True, le document entier est résumé au lieu d'être tronqué
+    à son début (ANALYSIS_SLOT_TOKENS). Avec parallel_sections=True, chaque force,
+    les actualités et les recommandations sont générées en parallèle par des
+    prompts dédiés, puis assemblées dans la même structure markdown.
+
+    on_token reçoit le texte au fil de la génération (section par section en
+    mode parallèle) ; la valeur retournée est identique à celle sans streaming.
+
+    Avec retrieval=True, un index BM25 du document entier fournit à chaque
+    prompt les passages les plus pertinents pour les forces analysées (par
+    section en mode parallèle), dans le même budget en tokens que la troncature.
+
+    tier (tiers.TIERS, par défaut ANALYSIS_TIER) fixe le modèle, les budgets
+    du prompt, le plafond de tokens générés par section et les sections produites ; un
+    sous-ensemble de sections impose le mode par sections. Avec deadline, la
+    génération s'arrête à l'échéance et le rapport ne garde que les parties
+    terminées, les autres étant listées dans « LIMITES DE L'ANALYSE ».
+
+    outline est le plan d'extract_analysis_plan : il remplace le document dans
+    le prompt, qui n'est alors ni résumé ni indexé (map_reduce et retrieval
+    sont sans effet).
+    """
 
+    template = DOCUMENT_PREFIX + """
     ## INFORMATIONS ENTREPRISE :
     {company_info}
 
-    ## DOCUMENT ORIGINAL :
-    {original_text}
-
     ## DONNÉES WEB COLLECTÉES :
     {web_data}
 
     ---
 
+    Ta mission est de créer un **rapport en francais enrichi d'au moins 10 000 caractères** selon le modèle des **5 forces de Porter**, pour l’entreprise ci-dessus, en exploitant toutes les données fournies.
+
     Génère un rapport selon cette structure **exacte** :
 
     # RAPPORT D'ANALYSE PORTER ENRICHI - {company_name}
@@ -367,76 +739,279 @@ def generate_enhanced_porter_analysis(original_text: str, company_info: Dict, we
     - Réponds uniquement avec le rapport structuré ci-dessus. Aucun texte hors-structure. Pas d'introduction ni de conclusion globale hors rapport.
     """
 
-    company_name = company_info.get("nom_entreprise", "Entreprise")
-    domains = ", ".join(company_info.get("domaines_activite", []))
+    tier = tier or get_tier()
+    slot_budget = tier.slot_tokens or ANALYSIS_SLOT_TOKENS
+    sections = [section for section in SECTIONS if section.key in tier.sections]
+    # Le prompt unique produit toujours toutes les sections
+    parallel_sections = parallel_sections or len(sections) < len(SECTIONS)
+    llm = llm or get_llm(tier.model)
+    # Le plafond de tokens du niveau vaut par section : le prompt unique produit le rapport entier
+    output_tokens = tier.output_tokens if parallel_sections else None
+    section_llm = _output_limited_llm(llm, output_tokens)
+
+    if outline is not None:
+        # Budget réduit au plan : la place libérée n'est pas redonnée aux données web
+        slot_budget = dict(slot_budget, original_text=count_tokens(format_outline(outline)))
+    slot_tokens = allocate(template, slot_budget, output_tokens or ANALYSIS_OUTPUT_TOKENS)
+    # Passages retrouvés et résumé sont dimensionnés pour la variable qu'ils remplissent
+    document_tokens = slot_tokens["original_text"]
+
+    section_documents = None
+    if outline is not None:
+        document = format_outline(outline)
+    elif retrieval and len(original_text) > ANALYSIS_MAX_CHARS:
+        index = get_document_index(original_text)
+        document = index.retrieve([section.query for section in SECTIONS[:5]], document_tokens)
+        if parallel_sections:
+            section_documents = {
+                section.key: index.retrieve([section.query], document_tokens) for section in sections
+            }
+    elif map_reduce and len(original_text) > ANALYSIS_MAX_CHARS:
+        document = summarize_document(original_text, use_cache=use_cache, max_tokens=document_tokens, llm=llm)
+    else:
+        document = original_text
 
     prompt = PromptTemplate(
         template=template,
         input_variables=["company_info", "original_text", "web_data", "company_name", "domains"]
     )
 
-    llm = OllamaLLM(model=MODEL_NAME)
-    runner = prompt | llm
+    inputs = build_analysis_inputs(company_info, document, web_data, slot_tokens)
 
-    global SPINNER_RUNNING
-    SPINNER_RUNNING = True
-    t = threading.Thread(target=spinner, args=("🧠 Génération analyse Porter enrichie...",))
-    t.start()
+    def by_sections(on_section: Callable[[str], None]) -> str:
+        # Sous échéance, la synthèse garde une part du temps restant
+        sections_deadline = deadline.share(DEADLINE_SECTIONS_SHARE) if deadline and tier.synthesis else None
+        return generate_report_by_sections(section_llm, inputs, web_data, use_cache=use_cache,
+                                           on_section=on_section, section_documents=section_documents,
+                                           sections=sections, synthesis=tier.synthesis, deadline=deadline,
+                                           sections_deadline=sections_deadline)
 
-    result = runner.invoke({
-        "company_info": json.dumps(company_info, indent=2, ensure_ascii=False),
-        "original_text": original_text[:4000],
-        "web_data": json.dumps(web_data, indent=2, ensure_ascii=False)[:3000],
-        "company_name": company_name,
-        "domains": domains
-    })
+    def single_prompt() -> str:
+        if on_token is None and deadline is None:
+            return invoke_llm(prompt, llm, inputs, use_cache=use_cache)
+        text, complete = generate_until(prompt, llm, inputs, deadline, use_cache=use_cache, on_token=on_token)
+        return text if complete else _interrupted_report(text, company_info, web_data)
 
-    SPINNER_RUNNING = False
-    t.join()
+    if on_token is not None:
+        # Le texte s'affiche au fur et à mesure : pas de tâche animée en plus
+        if parallel_sections:
+            return by_sections(lambda section: on_token(section + "\n\n"))
+        return single_prompt()
 
-    return result
+    with task("🧠 Génération analyse Porter enrichie...") as handle:
+        if parallel_sections:
+            completed = itertools.count(1)
+            return by_sections(lambda section: handle.update(message=(
+                f"🧠 Génération analyse Porter enrichie ({next(completed)}/{len(sections)} sections)...")))
+        return single_prompt()
 
 
 # === Étape 5 : Générer un PDF enrichi ===
-def clean_text(text: str) -> str:
-    """Nettoie les caractères spéciaux pour éviter les erreurs Unicode dans le PDF."""
-    return unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode("ASCII")
-
+@traced("start_enhanced_pdf_report")
+def start_enhanced_pdf_report(company_info: Dict) -> PDFReportRenderer:
+    """Charge les polices et rend l'en-tête : ne dépend pas de l'analyse."""
+    renderer = PDFReportRenderer()
+    renderer.render_header(company_info.get("nom_entreprise", "Entreprise"))
+    return renderer
 
-def create_enhanced_pdf_report(text: str, company_info: Dict, output_path: str):
-    """Crée un PDF enrichi avec métadonnées"""
 
-    pdf = FPDF()
-    pdf.add_page()
+@traced("create_enhanced_pdf_report")
+def create_enhanced_pdf_report(text: str, company_info: Dict, output_path: str,
+                               renderer: Optional[PDFReportRenderer] = None):
+    """Crée un PDF enrichi avec métadonnées
 
-    # En-tête
-    pdf.set_font("Arial", "B", 16)
-    company_name = company_info.get("nom_entreprise", "Entreprise")
-    pdf.cell(0, 10, f"ANALYSE PORTER - {clean_text(company_name)}", ln=True, align="C")
+    renderer est un rapport déjà commencé par start_enhanced_pdf_report.
+    """
+    if renderer is None:
+        render_report(text, output_path, company_name=company_info.get("nom_entreprise", "Entreprise"))
+        return
+    renderer.render_markdown(text)
+    renderer.output(output_path)
 
-    pdf.set_font("Arial", size=10)
-    pdf.cell(0, 5, f"Genere le {datetime.now().strftime('%d/%m/%Y %H:%M')}", ln=True, align="C")
-    pdf.ln(10)
 
-    # Contenu
-    pdf.set_font("Arial", size=10)
-    lines = text.split("\n")
+# === Main enrichi ===
+# Avancement publié au démarrage de chaque étape du graphe
+STAGE_PROGRESS = {
+    "document_head": (0.0, "📥 Lecture du document PDF..."),
+    "extraction": (0.1, "🔍 Extraction des informations et du plan d'analyse..."),
+    "company_info": (0.2, "🔍 Extraction des informations sur l'entreprise..."),
+    "web_data": (0.4, "🌐 Recherche web et collecte d'informations..."),
+    "analysis": (0.6, "🧠 Génération de l'analyse Porter enrichie..."),
+    "report": (0.9, "💾 Création du rapport PDF..."),
+}
+
+
+def build_enhanced_graph(input_path: str, output_path: str, llm: Optional[OllamaLLM],
+                         prefetcher: SearchPrefetcher, on_token: Optional[Callable[[str], None]],
+                         analysis_options: Dict, read_document: bool = True,
+                         tier: Optional[AnalysisTier] = None, deadline: Optional[Deadline] = None) -> List[Stage]:
+    """Les 5 étapes du pipeline sous forme de graphe de dépendances.
+
+    - l'extraction n'attend que le début du document (EXTRACTION_MAX_CHARS),
+      lu pendant que la suite l'est en parallèle ;
+    - les recherches par domaine, concurrent puis entreprise partent dès que
+      l'extraction en streaming produit la valeur correspondante ;
+    - l'en-tête du PDF (polices comprises) est rendu pendant la génération.
+
+    Avec l'option single_pass, l'étape "extraction" lit le document une seule
+    fois pour les informations entreprise et le plan de l'analyse
+    (extract_analysis_plan) ; l'analyse part de ce plan. Si la réponse
+    combinée est invalide, l'extraction et l'analyse reprennent le document.
+
+    Sans read_document, "text" et "document_head" sont des entrées du graphe.
+    """
+    analysis_options = dict(analysis_options)
+    single_pass = analysis_options.pop("single_pass", False)
+    map_reduce = analysis_options.get("map_reduce", False)
+
+    def prefetch(partial: Dict) -> None:
+        prefetcher.submit(plan_company_queries(partial))
+
+    def extract(**documents) -> Dict:
+        if single_pass:
+            company_info, outline = documents["extraction"]
+            if outline is not None:
+                return company_info
+        text = documents["text"] if map_reduce else documents["document_head"]
+        return extract_company_info(text, map_reduce=map_reduce, llm=llm, on_partial=prefetch)
+
+    def extract_plan(document_head: str) -> Tuple[Dict, Optional[Dict]]:
+        return extract_analysis_plan(document_head, llm=llm, on_partial=prefetch)
+
+    def collect(company_info: Dict) -> Dict:
+        return collect_company_data(company_info, prefetcher=prefetcher) if company_info else {}
+
+    def analyse(text: str, company_info: Dict, web_data: Dict, extraction=(None, None)) -> str:
+        return generate_enhanced_porter_analysis(text, company_info, web_data, on_token=on_token, llm=llm,
+                                                 tier=tier, deadline=deadline, outline=extraction[1],
+                                                 **analysis_options)
+
+    def render(analysis: str, company_info: Dict, renderer: PDFReportRenderer) -> str:
+        create_enhanced_pdf_report(analysis, company_info, output_path, renderer=renderer)
+        return output_path
+
+    extract_deps = ("text",) if map_reduce else ("document_head",)
+    analysis_deps = ("text", "company_info", "web_data")
+    if single_pass:
+        extract_deps += ("extraction",)
+        analysis_deps += ("extraction",)
+    stages = [
+        Stage("company_info", extract, extract_deps),
+        Stage("web_data", collect, ("company_info",)),
+        Stage("analysis", analyse, analysis_deps),
+        Stage("renderer", start_enhanced_pdf_report, ("company_info",)),
+        Stage("report", render, ("analysis", "company_info", "renderer")),
+    ]
+    if single_pass:
+        stages.insert(0, Stage("extraction", extract_plan, ("document_head",)))
+    if read_document:
+        stages[:0] = [
+            Stage("document_head", lambda: read_pdf_head(input_path)),
+            Stage("text", lambda: read_pdf(input_path)),
+        ]
+    return stages
+
+
+def run_enhanced_pipeline(input_path: str = INPUT_PDF_PATH, output_path: str = OUTPUT_PDF_PATH,
+                          text: Optional[str] = None, llm: Optional[OllamaLLM] = None,
+                          progress: Optional[Callable[[float, str], None]] = None,
+                          on_token: Optional[Callable[[str], None]] = None,
+                          tier: Optional[str] = None, deadline_s: Optional[float] = None,
+                          **analysis_options) -> Dict:
+    """Exécute les 5 étapes (build_enhanced_graph) et retourne leurs résultats.
+
+    Chaque étape démarre dès que ses entrées sont prêtes. L'avancement est
+    publié sous forme d'événements (progress.task) aux
+    abonnés du contexte appelant (progress.listen) ; progress(fraction, message)
+    en est la forme simplifiée pour une barre de progression. text permet de
+    fournir un document déjà lu, et analysis_options est transmis à
+    generate_enhanced_porter_analysis (map_reduce, parallel_sections...) ;
+    single_pass=True lit le document une seule fois pour l'extraction et
+    l'analyse (voir build_enhanced_graph).
+    Chaque exécution produit une trace JSON des étapes (durée, CPU, mémoire,
+    tokens), exportée dans TRACE_DIR et jointe au résultat. Le résultat est
+    enregistré dans l'historique des analyses (history_store).
+
+    tier choisit le niveau d'analyse (fast, standard, deep : voir tiers.TIERS),
+    dont les options servent de valeurs par défaut à analysis_options (une
+    option à None garde la valeur du niveau). Avec
+    deadline_s, l'analyse rend en au plus deadline_s secondes (hors premier
+    token) le meilleur rapport complet possible : recherches écourtées,
+    sections inachevées omises.
+    """
+    analysis_tier = get_tier(tier)
+    # Une option à None (non précisée) laisse la valeur du niveau
+    analysis_options = dict(analysis_tier.options,
+                            **{key: value for key, value in analysis_options.items() if value is not None})
+    deadline = Deadline(max(0.0, deadline_s - DEADLINE_RESERVE_S)) if deadline_s else None
+    with listen(fraction_listener(progress)) if progress is not None else nullcontext(), \
+            start_trace(input_path=input_path, model=analysis_tier.model, options=analysis_options,
+                        tier=analysis_tier.name, deadline_s=deadline_s) as trace, \
+            task(f"📊 Analyse Porter enrichie : {os.path.basename(input_path)}") as handle:
+        result = _run_enhanced_stages(input_path, output_path, text, llm, handle, on_token, analysis_options,
+                                      analysis_tier, deadline)
+    trace.metadata["text_length"] = result["text_length"]
+    result["trace"] = trace.to_dict()
+    result["trace_path"] = trace.export()
+    if os.path.exists(input_path):
+        document_hash = file_digest(input_path)
+    else:
+        document_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    result["history_id"] = record_analysis(result["company_info"], result["web_data"], result["analysis"],
+                                           document_hash, source=os.path.abspath(input_path),
+                                           output_path=output_path,
+                                           options=dict(analysis_options, tier=analysis_tier.name,
+                                                        deadline_s=deadline_s))
+    return result
 
-    for line in lines:
-        cleaned_line = clean_text(line)
-        if line.startswith("#"):
-            pdf.set_font("Arial", "B", 12)
-        elif line.startswith("##"):
-            pdf.set_font("Arial", "B", 11)
-        else:
-            pdf.set_font("Arial", size=10)
 
-        pdf.multi_cell(0, 6, cleaned_line)
-        pdf.ln(2)
+def _run_enhanced_stages(input_path, output_path, text, llm, handle, on_token, analysis_options,
+                         tier, deadline) -> Dict:
+    # Des étapes parallèles démarrent dans le désordre : la fraction ne recule jamais
+    reached = {"fraction": 0.0}
+    lock = threading.Lock()
+
+    def on_start(name: str) -> None:
+        if name in STAGE_PROGRESS:
+            fraction, message = STAGE_PROGRESS[name]
+            with lock:
+                reached["fraction"] = max(reached["fraction"], fraction)
+                handle.update(reached["fraction"], message)
+
+    search_timeout = SEARCH_TIMEOUT
+    if deadline is not None:
+        search_timeout = min(search_timeout, deadline.remaining() * DEADLINE_SEARCH_SHARE)
+    prefetcher = SearchPrefetcher(timeout=search_timeout)
+    inputs = {} if text is None else {"text": text, "document_head": text}
+    try:
+        results = run_stage_graph(
+            build_enhanced_graph(input_path, output_path, llm, prefetcher, on_token, analysis_options,
+                                 read_document=text is None, tier=tier, deadline=deadline),
+            inputs, on_start=on_start,
+        )
+    finally:
+        prefetcher.close()
+
+    handle.update(1.0, "🎉 Analyse terminée")
+    return {
+        "text_length": len(results["text"]),
+        "company_info": results["company_info"],
+        "web_data": results["web_data"],
+        "analysis": results["analysis"],
+        "output_path": results["report"],
+    }
 
-    # Créer le dossier output s'il n'existe pas
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    pdf.output(output_path)
 
+if __name__ == "__main__":
+    if not os.path.exists(INPUT_PDF_PATH):
+        print(f"❌ Fichier introuvable : {INPUT_PDF_PATH}")
+        sys.exit(1)
 
-# === Main enrichi ===
+    # Le modèle se charge côté serveur pendant la lecture du PDF
+    warm_up()
+    with listen(TerminalProgress()):
+        result = run_enhanced_pipeline()
+    for row in summarize_trace(result["trace"]):
+        print(" | ".join(f"{key} : {value}" for key, value in row.items()))
+    print(f"📂 Fichier disponible : {result['output_path']}")
+    print(f"⏱️  Trace : {result['trace_path']}")
@@ -0,0 +1,48 @@
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain.prompts import PromptTemplate
+
+from llm_cache import stream_llm
+
+
+class Deadline:
+    """Échéance en temps réel (horloge monotone), partagée par les étapes d'une analyse."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def share(self, fraction: float) -> "Deadline":
+        """Échéance plus proche : fraction du temps restant."""
+        return Deadline(self.remaining() * fraction)
+
+
+def generate_until(prompt: PromptTemplate, llm: Any, inputs: Dict[str, Any], deadline: Optional[Deadline] = None,
+                   use_cache: bool = True, on_token: Optional[Callable[[str], None]] = None,
+                   **call_options) -> Tuple[str, bool]:
+    """Génère en streaming jusqu'à la fin de la réponse ou jusqu'à l'échéance.
+
+    Retourne (texte, complet). À l'échéance, le flux est fermé : le serveur
+    arrête la génération et la réponse partielle n'est pas mise en cache.
+    L'échéance n'est vérifiée qu'à la réception d'un morceau, donc après le
+    premier token au plus tôt.
+    """
+    chunks = []
+    stream = stream_llm(prompt, llm, inputs, use_cache=use_cache, **call_options)
+    try:
+        for chunk in stream:
+            if deadline is not None and deadline.expired():
+                return "".join(chunks), False
+            chunks.append(chunk)
+            if on_token is not None:
+                on_token(chunk)
+    finally:
+        stream.close()
+    return "".join(chunks), True
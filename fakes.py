@@ -0,0 +1,96 @@
+import hashlib
+import json
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
+from search_backends import SearchBackend
+
+# Réponse d'extraction retournée pour tout prompt demandant du JSON
+FAKE_COMPANY_INFO = {
+    "nom_entreprise": "Société Exemple",
+    "domaines_activite": ["énergie", "services numériques", "logistique"],
+    "secteur_principal": "énergie",
+    "pays": "France",
+    "concurrents_mentionnes": ["Concurrent A", "Concurrent B", "Concurrent C"],
+}
+
+# Plan retourné avec FAKE_COMPANY_INFO au prompt combiné d'extract_analysis_plan
+FAKE_OUTLINE = {
+    "rivalite": ["Trois concurrents directs cités dans le document."],
+    "nouveaux_entrants": [],
+    "substitution": ["Offres numériques présentées comme alternatives."],
+    "clients": ["Clients industriels et collectivités."],
+    "fournisseurs": [],
+    "chiffres_cles": ["Chiffre d'affaires en hausse de 5 %."],
+}
+
+
+class FakeLLM:
+    """Doublure déterministe d'OllamaLLM, sans serveur.
+
+    Simule une latence fixe (chargement, prefill) puis un débit de décodage
+    en tokens/s ; le texte produit ne dépend que du prompt.
+    """
+
+    def __init__(self, latency_s: float = 0.05, tokens_per_s: float = 500.0,
+                 output_tokens: int = 400, model: str = "fake-llm"):
+        self.model = model
+        self.latency_s = latency_s
+        self.tokens_per_s = tokens_per_s
+        self.output_tokens = output_tokens
+
+    def _response(self, prompt: str) -> str:
+        if "JSON" in prompt and '"plan"' in prompt:
+            return json.dumps({"entreprise": FAKE_COMPANY_INFO, "plan": FAKE_OUTLINE}, ensure_ascii=False)
+        if "JSON" in prompt:
+            return json.dumps(FAKE_COMPANY_INFO, ensure_ascii=False)
+
+        seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        headings = [line.strip() for line in prompt.splitlines() if re.match(r"\s*#{1,3} [^\s]", line)]
+        lines: List[str] = []
+        words_per_heading = max(10, self.output_tokens // max(1, len(headings)))
+        for heading in headings or ["## Analyse"]:
+            lines.append(heading)
+            lines.append(" ".join(f"analyse-{seed}-{i}" for i in range(words_per_heading)))
+        return "\n".join(lines)
+
+    def _pace(self, tokens: int) -> None:
+        if self.tokens_per_s > 0:
+            time.sleep(tokens / self.tokens_per_s)
+
+    def invoke(self, prompt: str, config: Optional[Dict] = None, **kwargs) -> str:
+        time.sleep(self.latency_s)
+        response = self._response(prompt)
+        self._pace(len(response.split()))
+        return response
+
+    def stream(self, prompt: str, config: Optional[Dict] = None, **kwargs) -> Iterator[str]:
+        time.sleep(self.latency_s)
+        for word in re.findall(r"\S+\s*", self._response(prompt)):
+            self._pace(1)
+            yield word
+
+
+class FakeSearchBackend(SearchBackend):
+    """Backend de recherche déterministe avec latence simulée."""
+
+    name = "fake"
+
+    def __init__(self, latency_s: float = 0.05):
+        self.latency_s = latency_s
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        time.sleep(self.latency_s)
+        digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:8]
+        return [
+            {
+                "title": f"Résultat {i + 1} - {query}",
+                "snippet": f"Extrait simulé {digest}-{i} pour la requête.",
+                "url": f"https://example.com/{digest}/{i}",
+                "date": "2025-01-15",
+                "source": "Source simulée",
+                "published_date": "2025-01-15",
+            }
+            for i in range(num_results)
+        ]
@@ -0,0 +1,194 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# === Configuration ===
+HISTORY_PATH = os.getenv("HISTORY_PATH", os.path.join(".cache", "history.sqlite"))
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "1") != "0"
+
+# Colonnes renvoyées par les listes : le rapport et les données web ne sont lus que par load()
+SUMMARY_COLUMNS = ("id", "created_at", "company", "sector", "country", "document_hash", "source", "output_path")
+
+_default_history: Optional["AnalysisHistory"] = None
+_default_history_lock = threading.Lock()
+
+
+def _key(value: Optional[str]) -> str:
+    """Forme de recherche d'un nom : casse et espaces ignorés."""
+    return " ".join((value or "").casefold().split())
+
+
+class AnalysisHistory:
+    """Historique persistant des analyses : faits extraits, données web et rapports.
+
+    Les métadonnées (entreprise, secteur, document, date) sont indexées et
+    séparées des contenus volumineux, chargés seulement à la demande ; les
+    concurrents mentionnés ont leur propre table, indexée par secteur.
+    """
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                company TEXT NOT NULL,
+                company_key TEXT NOT NULL,
+                sector TEXT NOT NULL,
+                sector_key TEXT NOT NULL,
+                country TEXT NOT NULL,
+                document_hash TEXT NOT NULL,
+                source TEXT,
+                output_path TEXT,
+                options TEXT NOT NULL,
+                company_info TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analyses_company ON analyses(company_key, created_at);
+            CREATE INDEX IF NOT EXISTS idx_analyses_sector ON analyses(sector_key, created_at);
+            CREATE INDEX IF NOT EXISTS idx_analyses_document ON analyses(document_hash, created_at);
+            CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_at);
+
+            CREATE TABLE IF NOT EXISTS analysis_contents (
+                analysis_id INTEGER PRIMARY KEY REFERENCES analyses(id) ON DELETE CASCADE,
+                analysis TEXT NOT NULL,
+                web_data TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS competitors (
+                analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+                sector_key TEXT NOT NULL,
+                competitor TEXT NOT NULL,
+                competitor_key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_competitors_sector ON competitors(sector_key, competitor_key);
+            CREATE INDEX IF NOT EXISTS idx_competitors_analysis ON competitors(analysis_id);
+            """
+        )
+        self._conn.commit()
+
+    def record(self, company_info: Dict, web_data: Dict, analysis: str, document_hash: str,
+               source: Optional[str] = None, output_path: Optional[str] = None,
+               options: Optional[Dict] = None) -> int:
+        """Enregistre une analyse terminée et retourne son identifiant."""
+        company = company_info.get("nom_entreprise", "")
+        sector = company_info.get("secteur_principal", "")
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO analyses (created_at, company, company_key, sector, sector_key, country, "
+                "document_hash, source, output_path, options, company_info) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(), company, _key(company), sector, _key(sector),
+                 company_info.get("pays", ""), document_hash, source, output_path,
+                 json.dumps(options or {}, sort_keys=True), json.dumps(company_info, ensure_ascii=False)),
+            )
+            analysis_id = cursor.lastrowid
+            self._conn.execute(
+                "INSERT INTO analysis_contents (analysis_id, analysis, web_data) VALUES (?, ?, ?)",
+                (analysis_id, analysis, json.dumps(web_data, ensure_ascii=False)),
+            )
+            self._conn.executemany(
+                "INSERT INTO competitors (analysis_id, sector_key, competitor, competitor_key) VALUES (?, ?, ?, ?)",
+                [(analysis_id, _key(sector), competitor, _key(competitor))
+                 for competitor in company_info.get("concurrents_mentionnes", [])],
+            )
+        return analysis_id
+
+    def _summaries(self, where: str = "", params: Tuple = (), limit: Optional[int] = None,
+                   offset: int = 0) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM analyses {where} ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += (limit, offset)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params)]
+
+    def list_analyses(self, limit: int = 20, offset: int = 0, company: Optional[str] = None,
+                      sector: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Page d'analyses, des plus récentes aux plus anciennes (métadonnées seulement)."""
+        conditions, params = [], ()
+        if company:
+            conditions.append("company_key = ?")
+            params += (_key(company),)
+        if sector:
+            conditions.append("sector_key = ?")
+            params += (_key(sector),)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._summaries(where, params, limit, offset)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def latest_for_company(self, company: str) -> Optional[Dict[str, Any]]:
+        rows = self._summaries("WHERE company_key = ?", (_key(company),), limit=1)
+        return rows[0] if rows else None
+
+    def find_by_document(self, document_hash: str) -> List[Dict[str, Any]]:
+        return self._summaries("WHERE document_hash = ?", (document_hash,))
+
+    def competitors_in_sector(self, sector: str) -> List[Dict[str, Any]]:
+        """Concurrents cités dans les analyses du secteur, du plus au moins fréquent."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT MIN(competitor) AS competitor, COUNT(DISTINCT analysis_id) AS mentions "
+                "FROM competitors WHERE sector_key = ? GROUP BY competitor_key "
+                "ORDER BY mentions DESC, competitor_key",
+                (_key(sector),),
+            )
+            return [dict(row) for row in rows]
+
+    def load(self, analysis_id: int) -> Optional[Dict[str, Any]]:
+        """Analyse complète : métadonnées, faits extraits, données web et rapport."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join('a.' + column for column in SUMMARY_COLUMNS)}, a.options, a.company_info, "
+                "c.analysis, c.web_data FROM analyses a JOIN analysis_contents c ON c.analysis_id = a.id "
+                "WHERE a.id = ?",
+                (analysis_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        for column in ("options", "company_info", "web_data"):
+            entry[column] = json.loads(entry[column])
+        return entry
+
+    def delete(self, analysis_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM analyses WHERE id = ?", (analysis_id,))
+
+
+def get_history() -> AnalysisHistory:
+    global _default_history
+    with _default_history_lock:
+        if _default_history is None:
+            _default_history = AnalysisHistory(HISTORY_PATH)
+        return _default_history
+
+
+def record_analysis(company_info: Dict, web_data: Dict, analysis: str, document_hash: str,
+                    **metadata) -> Optional[int]:
+    """Enregistre l'analyse dans l'historique par défaut.
+
+    Ne fait rien si HISTORY_ENABLED=0 ou si aucune entreprise n'a été
+    identifiée ; une erreur d'écriture est signalée sans interrompre l'analyse.
+    """
+    if not HISTORY_ENABLED or not company_info.get("nom_entreprise"):
+        return None
+    try:
+        return get_history().record(company_info, web_data, analysis, document_hash, **metadata)
+    except sqlite3.Error as e:
+        print(f"⚠️  Historique non enregistré : {e}")
+        return None
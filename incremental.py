@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from complet import (
+    ANALYSIS_SLOT_TOKENS,
+    RETRIEVAL_TOKENS,
+    build_analysis_inputs,
+    collect_company_data,
+    create_enhanced_pdf_report,
+    extract_partial_company_info,
+)
+from langchain_ollama import OllamaLLM
+from llm_registry import get_llm, warm_up
+from map_reduce import CHUNK_TOKENS, estimate_tokens, merge_company_infos, parallel_map
+from pdf_extraction import load_pages
+from porter_sections import (
+    FORCES,
+    SECTION_WORKERS,
+    SECTIONS,
+    assemble_report,
+    generate_sections,
+    generate_synthesis,
+    section_inputs_for,
+)
+from retrieval import build_passages, retrieve_stable
+
+# === Configuration ===
+MANIFEST_DIR = os.getenv("INCREMENTAL_DIR", os.path.join(".cache", "incremental"))
+MANIFEST_VERSION = 2
+# Catégories web citées par chaque section (les autres sections les reçoivent toutes)
+SECTION_WEB_CATEGORIES = {
+    "rivalite": ("competitor_news", "industry_news"),
+    "nouveaux_entrants": ("industry_news",),
+    "substitution": ("industry_news",),
+    "clients": ("company_official", "industry_news"),
+    "fournisseurs": ("company_official", "industry_news"),
+}
+
+
+def _hash(value) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def section_web_data(section, web_data: Dict) -> Dict:
+    """Données web utiles au prompt d'une section."""
+    categories = SECTION_WEB_CATEGORIES.get(section.key)
+    if categories is None:
+        return web_data
+    return {category: items for category, items in web_data.items() if category in categories}
+
+
+def manifest_path(doc_id: str) -> str:
+    return os.path.join(MANIFEST_DIR, f"{doc_id}.json")
+
+
+def load_manifest(doc_id: str) -> Dict:
+    try:
+        with open(manifest_path(doc_id), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def save_manifest(doc_id: str, manifest: Dict) -> None:
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    path = manifest_path(doc_id)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def plan_chunks(pages: Sequence[str], page_hashes: List[str], pages_per_chunk: int) -> List[Dict]:
+    """Morceaux de pages consécutives à taille fixe.
+
+    Des limites fixes (plutôt que calculées sur la longueur du texte) garantissent
+    qu'une page modifiée n'invalide que le morceau qui la contient.
+    """
+    chunks = []
+    for start in range(0, len(pages), pages_per_chunk):
+        stop = min(start + pages_per_chunk, len(pages))
+        chunks.append({"pages": [start, stop], "hash": _hash("".join(page_hashes[start:stop]))})
+    return chunks
+
+
+def run_incremental_analysis(pdf_path: str, doc_id: Optional[str] = None, output_path: Optional[str] = None,
+                             llm: Optional[OllamaLLM] = None, use_cache: bool = True) -> Dict:
+    """Analyse Porter (mode par sections) qui ne recalcule que ce qu'une révision a changé.
+
+    Les dépendances suivies sont : pages → morceaux → faits extraits → données
+    web → sections → synthèse. Le manifeste de la version précédente (même
+    doc_id, par défaut le nom du fichier) indique ce qui peut être réutilisé.
+    """
+    doc_id = doc_id or os.path.splitext(os.path.basename(pdf_path))[0]
+    llm = llm or get_llm()
+    previous = load_manifest(doc_id)
+
+    pages = load_pages(pdf_path)
+    page_hashes = [_hash(page) for page in pages]
+    old_hashes = previous.get("page_hashes", [])
+    changed_pages = [i for i, h in enumerate(page_hashes) if i >= len(old_hashes) or old_hashes[i] != h]
+
+    pages_per_chunk = previous.get("pages_per_chunk")
+    if not pages_per_chunk:
+        average_page_tokens = max(1, sum(estimate_tokens(page) for page in pages) // max(1, len(pages)))
+        pages_per_chunk = max(1, CHUNK_TOKENS // average_page_tokens)
+
+    # 1. Faits extraits par morceau : seuls les morceaux modifiés repassent par le modèle
+    chunks = plan_chunks(pages, page_hashes, pages_per_chunk)
+    old_facts = previous.get("facts", {})
+    dirty_chunks = [chunk for chunk in chunks if chunk["hash"] not in old_facts]
+    new_facts = parallel_map(
+        lambda chunk: extract_partial_company_info(
+            "".join(pages[chunk["pages"][0]:chunk["pages"][1]]), llm, use_cache=use_cache),
+        dirty_chunks,
+    )
+    facts = {chunk["hash"]: old_facts[chunk["hash"]] for chunk in chunks if chunk["hash"] in old_facts}
+    facts.update({chunk["hash"]: partial for chunk, partial in zip(dirty_chunks, new_facts)})
+    company_info = merge_company_infos([facts[chunk["hash"]] for chunk in chunks])
+
+    # 2. Données web : réutilisées tant que les faits fusionnés sont identiques
+    company_hash = _hash(company_info)
+    if previous.get("company_hash") == company_hash and "web_data" in previous:
+        web_data = previous["web_data"]
+    else:
+        web_data = collect_company_data(company_info) if company_info else {}
+
+    # 3. Sections : une section n'est régénérée que si son prompt a changé.
+    # Passages découpés morceau par morceau et classés sans statistique globale :
+    # une page modifiée ne déplace ni les limites ni le score des autres passages
+    passages = [passage for chunk in chunks
+                for passage in build_passages("".join(pages[chunk["pages"][0]:chunk["pages"][1]]))]
+    section_documents = {section.key: retrieve_stable(passages, [section.query], RETRIEVAL_TOKENS)
+                         for section in SECTIONS}
+    # Chaque section ne reçoit que ses propres passages et ses catégories web
+    slot_tokens = dict(ANALYSIS_SLOT_TOKENS, original_text=0)
+    section_inputs = {section.key: build_analysis_inputs(company_info, "", section_web_data(section, web_data),
+                                                         slot_tokens)
+                      for section in SECTIONS}
+    section_deps = {
+        section.key: _hash([getattr(llm, "model", None),
+                            section_inputs_for(section, section_inputs[section.key], section_documents)])
+        for section in SECTIONS
+    }
+    old_sections = previous.get("sections", {})
+    dirty_sections = [s for s in SECTIONS if old_sections.get(s.key, {}).get("deps") != section_deps[s.key]]
+    regenerated = parallel_map(
+        lambda section: generate_sections(llm, section_inputs[section.key], [section], use_cache=use_cache,
+                                          section_documents=section_documents)[0],
+        dirty_sections,
+        max_workers=SECTION_WORKERS,
+    )
+    section_texts = {key: entry["text"] for key, entry in old_sections.items()}
+    section_texts.update({section.key: text for section, text in zip(dirty_sections, regenerated)})
+    ordered_sections = [section_texts[section.key] for section in SECTIONS]
+
+    # 4. Synthèse : dépend des cinq forces uniquement
+    company_name, domains = (section_inputs[SECTIONS[0].key][name] for name in ("company_name", "domains"))
+    synthesis_deps = _hash([section_texts[key] for key in FORCES])
+    old_synthesis = previous.get("synthesis", {})
+    if old_synthesis.get("deps") == synthesis_deps:
+        synthesis = old_synthesis["text"]
+    else:
+        synthesis = generate_synthesis(llm, company_name, section_texts, use_cache=use_cache)
+
+    analysis = assemble_report(company_name, domains, synthesis, ordered_sections, web_data)
+    if output_path:
+        create_enhanced_pdf_report(analysis, company_info, output_path)
+
+    save_manifest(doc_id, {
+        "version": MANIFEST_VERSION,
+        "source": os.path.abspath(pdf_path),
+        "pages_per_chunk": pages_per_chunk,
+        "page_hashes": page_hashes,
+        "chunks": chunks,
+        "facts": facts,
+        "company_hash": company_hash,
+        "web_data": web_data,
+        "sections": {key: {"deps": section_deps[key], "text": section_texts[key]} for key in section_deps},
+        "synthesis": {"deps": synthesis_deps, "text": synthesis},
+    })
+
+    return {
+        "company_info": company_info,
+        "web_data": web_data,
+        "analysis": analysis,
+        "output_path": output_path,
+        "changes": {
+            "changed_pages": changed_pages,
+            "reextracted_chunks": len(dirty_chunks),
+            "total_chunks": len(chunks),
+            "regenerated_sections": [section.key for section in dirty_sections],
+            "synthesis_regenerated": old_synthesis.get("deps") != synthesis_deps,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse Porter incrémentale d'un document révisé")
+    parser.add_argument("pdf", help="Chemin du PDF (nouvelle version)")
+    parser.add_argument("--doc-id", help="Identifiant du document (par défaut : nom du fichier)")
+    parser.add_argument("--output", default=os.path.join("output", "rapport_porter_enrichi.pdf"))
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.pdf):
+        print(f"❌ Fichier introuvable : {args.pdf}")
+        return 1
+
+    warm_up()
+    result = run_incremental_analysis(args.pdf, doc_id=args.doc_id, output_path=args.output)
+    changes = result["changes"]
+    print(f"📄 Pages modifiées : {len(changes['changed_pages'])}")
+    print(f"🔍 Morceaux ré-extraits : {changes['reextracted_chunks']}/{changes['total_chunks']}")
+    print(f"🧠 Sections régénérées : {', '.join(changes['regenerated_sections']) or 'aucune'}")
+    print(f"📂 Fichier disponible : {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
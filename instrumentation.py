@@ -0,0 +1,224 @@
+import contextvars
+import functools
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# === Configuration ===
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join("output", "traces"))
+# tracemalloc donne le pic mémoire Python de chaque étape mais ralentit les allocations
+TRACE_PYTHON_MEMORY = os.getenv("TRACE_PYTHON_MEMORY", "0") == "1"
+
+
+@dataclass
+class StageRecord:
+    name: str
+    started_at: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    process_peak_rss_mb: Optional[float] = None     # pic du processus depuis son démarrage
+    rss_growth_mb: Optional[float] = None           # hausse de ce pic pendant l'étape
+    python_peak_mb: Optional[float] = None
+    llm_calls: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    generation_s: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def tokens_per_s(self) -> Optional[float]:
+        if not self.generation_s:
+            return None
+        return self.completion_tokens / self.generation_s
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["tokens_per_s"] = self.tokens_per_s
+        return data
+
+
+@dataclass
+class RunTrace:
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    stages: List[StageRecord] = field(default_factory=list)
+    wall_s: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "metadata": self.metadata,
+            "stages": [stage.to_dict() for stage in self.stages],
+        }
+
+    def export(self, directory: str = TRACE_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.run_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+_current_trace: contextvars.ContextVar[Optional[RunTrace]] = contextvars.ContextVar("current_trace", default=None)
+_current_stage: contextvars.ContextVar[Optional[StageRecord]] = contextvars.ContextVar("current_stage", default=None)
+
+
+def current_stage() -> Optional[StageRecord]:
+    return _current_stage.get()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss est en Ko sous Linux (en octets sous macOS)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _cpu_seconds() -> float:
+    # Inclut les processus enfants (pool de lecture PDF)
+    cpu = time.process_time()
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += usage.ru_utime + usage.ru_stime
+    return cpu
+
+
+@contextmanager
+def start_trace(**metadata) -> Iterator[RunTrace]:
+    """Active une trace pour le contexte courant ; les étapes exécutées dedans y sont enregistrées."""
+    trace = RunTrace(metadata=metadata)
+    token = _current_trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.wall_s = time.perf_counter() - started
+        _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Optional[StageRecord]]:
+    """Mesure une étape (temps réel, CPU, mémoire, tokens) si une trace est active.
+
+    Le temps CPU est celui du processus entier : il inclut les threads de
+    l'étape, mais aussi ceux d'autres analyses exécutées en même temps.
+    De même, ru_maxrss ne donne que le pic du processus depuis son démarrage
+    (process_peak_rss_mb) : rss_growth_mb est la hausse de ce pic pendant
+    l'étape, nulle si elle n'a pas dépassé le pic atteint avant elle. Le pic
+    propre à l'étape est python_peak_mb (TRACE_PYTHON_MEMORY=1).
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    record = StageRecord(name=name, started_at=datetime.now().isoformat())
+    trace.stages.append(record)
+    token = _current_stage.set(record)
+    if TRACE_PYTHON_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    wall_start, cpu_start, rss_start = time.perf_counter(), _cpu_seconds(), _peak_rss_mb()
+    try:
+        yield record
+    except Exception as e:
+        record.error = repr(e)
+        raise
+    finally:
+        record.wall_s = time.perf_counter() - wall_start
+        record.cpu_s = _cpu_seconds() - cpu_start
+        record.process_peak_rss_mb = _peak_rss_mb()
+        if rss_start is not None:
+            record.rss_growth_mb = record.process_peak_rss_mb - rss_start
+        if TRACE_PYTHON_MEMORY:
+            record.python_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        _current_stage.reset(token)
+
+
+def traced(name: str):
+    """Décorateur : exécute la fonction dans stage(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_call(prompt_tokens: int = 0, completion_tokens: int = 0,
+                    generation_s: float = 0.0, cache_hit: bool = False) -> None:
+    record = _current_stage.get()
+    if record is None:
+        return
+    record.llm_calls += 1
+    record.cache_hits += int(cache_hit)
+    record.prompt_tokens += prompt_tokens
+    record.completion_tokens += completion_tokens
+    record.generation_s += generation_s
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Relève les compteurs de tokens renvoyés par Ollama à la fin d'une génération.
+
+    L'étape est capturée à la création : le callback peut être appelé depuis
+    un autre thread que celui qui a lancé l'appel.
+    """
+
+    def __init__(self):
+        self.stage = _current_stage.get()
+        self.reported = False
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                info = generation.generation_info or {}
+                if "eval_count" not in info:
+                    continue
+                token = _current_stage.set(self.stage)
+                try:
+                    record_llm_call(
+                        prompt_tokens=info.get("prompt_eval_count") or 0,
+                        completion_tokens=info.get("eval_count") or 0,
+                        generation_s=(info.get("eval_duration") or 0) / 1e9,
+                    )
+                finally:
+                    _current_stage.reset(token)
+                self.reported = True
+
+
+def summarize_trace(trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Lignes d'un tableau récapitulatif (une par étape) pour l'affichage."""
+    rows = []
+    for record in trace["stages"]:
+        rows.append({
+            "Étape": record["name"],
+            "Durée (s)": round(record["wall_s"], 2),
+            "CPU (s)": round(record["cpu_s"], 2),
+            "Hausse pic RSS (Mo)": (round(record["rss_growth_mb"], 1)
+                                    if record["rss_growth_mb"] is not None else None),
+            "Appels LLM": record["llm_calls"],
+            "Cache": record["cache_hits"],
+            "Tokens prompt": record["prompt_tokens"],
+            "Tokens générés": record["completion_tokens"],
+            "Tokens/s": round(record["tokens_per_s"], 1) if record["tokens_per_s"] else None,
+        })
+    return rows
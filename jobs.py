@@ -0,0 +1,102 @@
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# États possibles d'une tâche
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    status: str = PENDING
+    progress: float = 0.0
+    message: str = "En attente de démarrage..."
+    partial_text: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    finished_at: Optional[str] = None
+
+
+class JobHandle:
+    """Passé à la fonction exécutée pour publier son avancement."""
+
+    def __init__(self, manager: "JobManager", job_id: str):
+        self._manager = manager
+        self.job_id = job_id
+
+    def update(self, progress: float, message: str) -> None:
+        self._manager._update(self.job_id, progress=progress, message=message)
+
+    def append_text(self, chunk: str) -> None:
+        self._manager._append_text(self.job_id, chunk)
+
+
+class JobManager:
+    """Exécute des tâches longues en arrière-plan et expose leur état.
+
+    Les instances sont partagées entre sessions Streamlit : chaque session ne
+    garde que l'identifiant de sa tâche et interroge get() à chaque rerun.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._order: List[str] = []
+        self._max_finished = max_finished
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> str:
+        """Planifie fn(handle, *args, **kwargs) et retourne l'identifiant de la tâche."""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._jobs[job_id] = Job(id=job_id)
+            self._order.append(job_id)
+            self._prune()
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Copie de l'état courant (sans risque de lecture pendant une mise à jour)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return replace(job) if job is not None else None
+
+    def _run(self, job_id: str, fn: Callable[..., Any], args, kwargs) -> None:
+        self._update(job_id, status=RUNNING)
+        try:
+            result = fn(JobHandle(self, job_id), *args, **kwargs)
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=f"{e}\n{traceback.format_exc()}",
+                         finished_at=datetime.now().isoformat())
+        else:
+            self._update(job_id, status=DONE, progress=1.0, result=result,
+                         finished_at=datetime.now().isoformat())
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                for name, value in changes.items():
+                    setattr(job, name, value)
+
+    def _append_text(self, job_id: str, chunk: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.partial_text += chunk
+
+    def _prune(self) -> None:
+        """Oublie les plus anciennes tâches terminées au-delà de max_finished."""
+        finished = [job_id for job_id in self._order if self._jobs[job_id].status in (DONE, FAILED)]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self._jobs[job_id]
+            self._order.remove(job_id)
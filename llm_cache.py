@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from langchain.prompts import PromptTemplate
+
+from cache_store import SQLiteCache
+from instrumentation import TokenUsageCallback, current_stage, record_llm_call
+from map_reduce import estimate_tokens
+
+# === Configuration ===
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+
+# Paramètres d'OllamaLLM qui influencent le texte généré
+GENERATION_OPTIONS = (
+    "temperature", "top_k", "top_p", "num_predict", "num_ctx", "seed", "stop",
+    "format", "repeat_penalty", "repeat_last_n", "mirostat", "mirostat_eta",
+    "mirostat_tau", "tfs_z",
+)
+
+_default_cache: Optional[SQLiteCache] = None
+
+
+def get_llm_cache() -> SQLiteCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SQLiteCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES)
+    return _default_cache
+
+
+def generation_options(llm: Any) -> Dict[str, Any]:
+    return {name: getattr(llm, name, None) for name in GENERATION_OPTIONS}
+
+
+def cache_key(rendered_prompt: str, llm: Any, call_options: Optional[Dict[str, Any]] = None) -> str:
+    key = {
+        "prompt": hashlib.sha256(rendered_prompt.encode("utf-8")).hexdigest(),
+        "model": getattr(llm, "model", None),
+        "options": generation_options(llm),
+    }
+    if call_options:
+        key["call_options"] = call_options
+    payload = json.dumps(key, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _tracking_config():
+    """Callbacks de comptage de tokens, uniquement si une étape est mesurée."""
+    if current_stage() is None:
+        return None, None
+    callback = TokenUsageCallback()
+    return callback, {"callbacks": [callback]}
+
+
+def _record_fallback(callback, rendered: str, result: str, started: float) -> None:
+    # Sans compteurs Ollama (autre backend, doublure de test), on estime
+    if callback is not None and not callback.reported:
+        record_llm_call(estimate_tokens(rendered), estimate_tokens(result), time.perf_counter() - started)
+
+
+def _invoke(llm: Any, rendered: str, **call_options) -> str:
+    callback, config = _tracking_config()
+    started = time.perf_counter()
+    result = llm.invoke(rendered, config=config, **call_options)
+    _record_fallback(callback, rendered, result, started)
+    return result
+
+
+def _stream(llm: Any, rendered: str, **call_options) -> Iterator[str]:
+    callback, config = _tracking_config()
+    started = time.perf_counter()
+    chunks = []
+    for chunk in llm.stream(rendered, config=config, **call_options):
+        chunks.append(chunk)
+        yield chunk
+    _record_fallback(callback, rendered, "".join(chunks), started)
+
+
+def invoke_llm(prompt: PromptTemplate, llm: Any, inputs: Dict[str, Any], use_cache: bool = True,
+               **call_options) -> str:
+    """Équivalent de (prompt | llm).invoke(inputs), avec cache des réponses.
+
+    use_cache=False force un nouvel appel au modèle sans lire ni écrire le cache.
+    call_options est transmis à llm.invoke (par exemple format=<schéma JSON>)
+    et fait partie de la clé de cache.
+    """
+    rendered = prompt.format(**inputs)
+    if not (use_cache and LLM_CACHE_ENABLED):
+        return _invoke(llm, rendered, **call_options)
+
+    cache = get_llm_cache()
+    key = cache_key(rendered, llm, call_options)
+    cached = cache.get(key)
+    if cached is not None:
+        record_llm_call(cache_hit=True)
+        return cached
+
+    result = _invoke(llm, rendered, **call_options)
+    cache.set(key, result)
+    return result
+
+
+def stream_llm(prompt: PromptTemplate, llm: Any, inputs: Dict[str, Any], use_cache: bool = True,
+               **call_options) -> Iterator[str]:
+    """Version streaming d'invoke_llm : génère les morceaux de texte au fil du décodage.
+
+    Une réponse en cache est rendue en un seul morceau ; une réponse générée
+    n'est mise en cache que si le flux a été consommé jusqu'au bout. La clé
+    de cache est la même que celle d'invoke_llm pour le même appel.
+    """
+    rendered = prompt.format(**inputs)
+    if not (use_cache and LLM_CACHE_ENABLED):
+        yield from _stream(llm, rendered, **call_options)
+        return
+
+    cache = get_llm_cache()
+    key = cache_key(rendered, llm, call_options)
+    cached = cache.get(key)
+    if cached is not None:
+        record_llm_call(cache_hit=True)
+        yield cached
+        return
+
+    chunks = []
+    for chunk in _stream(llm, rendered, **call_options):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, "".join(chunks))
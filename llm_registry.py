@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_ollama import OllamaLLM
+
+from prompt_budget import PROMPT_CONTEXT_TOKENS
+
+# === Configuration ===
+MODEL_NAME = os.getenv("OLLAMA_MODEL", "llama3:instruct")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
+# Durée pendant laquelle le serveur garde le modèle chargé après le dernier appel
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Même fenêtre pour tous les appels : un num_ctx différent force le rechargement
+# du modèle et vide le cache KV du préfixe commun
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", str(PROMPT_CONTEXT_TOKENS)))
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") != "0"
+
+_llms: Dict[str, Any] = {}
+_llms_lock = threading.Lock()
+
+
+def get_llm(model: str = MODEL_NAME) -> OllamaLLM:
+    """Client partagé par tout le processus pour `model`.
+
+    Une seule instance par modèle : son client HTTP (et ses connexions
+    keep-alive) sert à toutes les étapes et à tous les threads.
+    """
+    with _llms_lock:
+        llm = _llms.get(model)
+        if llm is None:
+            llm = _llms[model] = OllamaLLM(model=model, base_url=OLLAMA_BASE_URL,
+                                           keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=OLLAMA_NUM_CTX)
+        return llm
+
+
+def register_llm(llm: Any, model: str = MODEL_NAME) -> None:
+    """Remplace le client de `model` (doublure de test, benchmark, service)."""
+    with _llms_lock:
+        _llms[model] = llm
+
+
+def reset_llms() -> None:
+    with _llms_lock:
+        _llms.clear()
+
+
+def warm_up(model: str = MODEL_NAME, background: bool = True) -> Optional[threading.Thread]:
+    """Charge le modèle côté serveur avant le premier vrai appel.
+
+    Un prompt vide ne génère rien : Ollama charge seulement le modèle, avec
+    le num_ctx et le keep_alive du client partagé. Sans effet si OLLAMA_WARMUP=0
+    ou si le client enregistré n'est pas un OllamaLLM.
+    """
+    if not OLLAMA_WARMUP:
+        return None
+
+    def run():
+        llm = get_llm(model)
+        if not isinstance(llm, OllamaLLM):
+            return
+        started = time.perf_counter()
+        try:
+            llm.invoke("")
+        except Exception as e:
+            print(f"⚠️  Préchargement du modèle {model} impossible : {e}")
+            return
+        print(f"🔥 Modèle {model} chargé en {time.perf_counter() - started:.1f} s")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name=f"warm-up-{model}", daemon=True)
+    thread.start()
+    return thread
@@ -1,16 +1,15 @@
 from complet import (
-    read_pdf,
-    extract_company_info,
-    collect_company_data,
-    generate_enhanced_porter_analysis,
-    create_enhanced_pdf_report,
-    INPUT_PDF_PATH,
-    OUTPUT_PDF_PATH
+    run_enhanced_pipeline,
+    INPUT_PDF_PATH
 )
+from history_store import get_history
+from instrumentation import summarize_trace
+from jobs import JobManager, DONE, FAILED
+from llm_registry import get_llm as get_shared_llm, warm_up
+from tiers import DEFAULT_TIER, TIERS, get_tier
 import streamlit as st
 
 import os
-from datetime import datetime
 import time
 
 # === Configuration de la page ===
@@ -18,6 +17,76 @@ st.set_page_config(page_title="Analyse Porter Enrichie", layout="wide")
 st.title("📊 Analyse Porter Enrichie par IA")
 st.caption("Utilise un PDF statique situé dans `pdfs/document.pdf`")
 
+
+# === Ressources partagées entre sessions ===
+@st.cache_resource
+def get_job_manager():
+    return JobManager(max_workers=int(os.getenv("STREAMLIT_JOB_WORKERS", "2")))
+
+
+@st.cache_resource
+def get_llm(model):
+    # Préchargé au premier choix du modèle, pendant que l'utilisateur lit la page
+    warm_up(model)
+    return get_shared_llm(model)
+
+
+TIER_LABELS = {"fast": "⚡ Rapide (aperçu)", "standard": "📄 Standard", "deep": "🔬 Approfondi"}
+
+
+def run_analysis_job(job, input_path, llm, tier, deadline_s):
+    # Un fichier de sortie par tâche : plusieurs analystes peuvent lancer des analyses en parallèle
+    output_path = os.path.join("output", "jobs", job.job_id, "rapport_porter_enrichi.pdf")
+    # La lecture du PDF fait partie du pipeline : l'extraction démarre dès les premières pages
+    return run_enhanced_pipeline(
+        input_path=input_path,
+        output_path=output_path,
+        llm=llm,
+        progress=job.update,
+        on_token=job.append_text,
+        tier=tier,
+        deadline_s=deadline_s,
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_history_entry(analysis_id):
+    # Une analyse enregistrée ne change plus : son contenu n'est lu qu'une fois
+    return get_history().load(analysis_id)
+
+
+# === Historique des analyses ===
+HISTORY_PAGE_SIZE = 20
+
+with st.sidebar:
+    st.header("🗂️ Historique")
+    history = get_history()
+    company_filter = st.text_input("Entreprise", key="history_company")
+    pages = st.session_state.setdefault("history_pages", 1)
+    # Seules les métadonnées sont lues ici, une page à la fois
+    entries = history.list_analyses(limit=pages * HISTORY_PAGE_SIZE, company=company_filter or None)
+    if not entries:
+        st.caption("Aucune analyse enregistrée.")
+    else:
+        labels = {entry["id"]: f"{entry['company']} — {entry['created_at'][:16].replace('T', ' ')}"
+                  for entry in entries}
+        selected = st.selectbox("Analyse", [None] + list(labels),
+                                format_func=lambda analysis_id: "—" if analysis_id is None else labels[analysis_id])
+        if len(entries) == pages * HISTORY_PAGE_SIZE and st.button("Charger plus"):
+            st.session_state.history_pages = pages + 1
+            st.rerun()
+        if selected is not None:
+            entry = load_history_entry(selected)
+            st.markdown(f"**Secteur** : {entry['sector'] or 'N/A'} — **Pays** : {entry['country'] or 'N/A'}")
+            st.markdown("**Concurrents** : " + ", ".join(entry["company_info"].get("concurrents_mentionnes", [])))
+            if entry["sector"]:
+                competitors = history.competitors_in_sector(entry["sector"])
+                st.caption("Concurrents vus dans ce secteur : " + ", ".join(
+                    f"{row['competitor']} ({row['mentions']})" for row in competitors[:10]))
+            with st.expander("📝 Rapport enregistré"):
+                st.markdown(entry["analysis"])
+
+
 # === Vérification du fichier ===
 if not os.path.exists(INPUT_PDF_PATH):
     st.error("❌ Fichier `document.pdf` introuvable dans le dossier `pdfs/`.")
@@ -26,74 +95,79 @@ if not os.path.exists(INPUT_PDF_PATH):
 
 st.success("📁 Fichier détecté : prêt pour l'analyse !")
 
-# === Initialisation de la session ===
-if "progress" not in st.session_state:
-    st.session_state.progress = 0
+manager = get_job_manager()
+job_id = st.session_state.get("job_id")
+job = manager.get(job_id) if job_id else None
+running = job is not None and job.status not in (DONE, FAILED)
 
-def update_progress(step, total_steps):
-    st.session_state.progress = int((step / total_steps) * 100)
-    progress_bar.progress(st.session_state.progress)
+# === Lancement de l'analyse ===
+tier_column, deadline_column = st.columns(2)
+tier = tier_column.selectbox("Niveau d'analyse", list(TIERS), index=list(TIERS).index(DEFAULT_TIER),
+                             format_func=lambda name: TIER_LABELS.get(name, name), disabled=running)
+deadline_s = deadline_column.number_input("Délai maximal en secondes (0 : aucun)", min_value=0, value=0,
+                                          step=10, disabled=running)
+llm = get_llm(get_tier(tier).model)
+
+if st.button("🚀 Démarrer l'analyse enrichie", disabled=running):
+    st.session_state.job_id = manager.submit(run_analysis_job, INPUT_PDF_PATH, llm, tier, deadline_s or None)
+    st.rerun()
+
+if job is None:
+    st.progress(0, text="En attente de démarrage...")
+    st.stop()
 
-# === Barre de progression ===
-progress_bar = st.progress(0, text="En attente de démarrage...")
+# === Suivi de la tâche en arrière-plan ===
+st.progress(job.progress, text=job.message)
 
-# === Lancement de l'analyse ===
-if st.button("🚀 Démarrer l'analyse enrichie"):
-
-    total_steps = 5
-    step = 1
-
-    with st.spinner("📥 Lecture du document PDF..."):
-        time.sleep(0.8)
-        original_text = read_pdf(INPUT_PDF_PATH)
-        st.success(f"✅ Document lu ({len(original_text)} caractères)")
-        update_progress(step, total_steps)
-        step += 1
-
-    with st.spinner("🔍 Extraction des informations sur l’entreprise..."):
-        time.sleep(0.8)
-        company_info = extract_company_info(original_text)
-        if company_info:
-            st.success(f"🏢 Entreprise détectée : {company_info.get('nom_entreprise', 'N/A')}")
-            st.markdown("**Domaines d'activité** : " + ", ".join(company_info.get("domaines_activite", [])))
-            with st.expander("📄 Détails JSON"):
-                st.json(company_info)
-        else:
-            st.warning("⚠️ Aucune donnée extraite, on continue malgré tout.")
-        update_progress(step, total_steps)
-        step += 1
-
-    with st.spinner("🌐 Recherche web et collecte d'informations..."):
-        time.sleep(0.8)
-        web_data = collect_company_data(company_info) if company_info else {}
-        total_sources = sum(len(v) for v in web_data.values() if isinstance(v, list))
-        st.info(f"🔎 {total_sources} sources web collectées.")
-        if total_sources > 0:
-            with st.expander("📚 Aperçu des données collectées"):
-                st.json(web_data)
-        update_progress(step, total_steps)
-        step += 1
-
-    with st.spinner("🧠 Génération de l’analyse Porter enrichie... (cela peut prendre quelques minutes)"):
-        analysis = generate_enhanced_porter_analysis(original_text, company_info, web_data)
-        st.success("✅ Analyse stratégique générée avec succès.")
-        with st.expander("📝 Aperçu du rapport généré"):
-            st.text_area("Contenu partiel du rapport", analysis[:5000], height=400)
-        update_progress(step, total_steps)
-        step += 1
-
-    with st.spinner("💾 Création du rapport PDF..."):
-        create_enhanced_pdf_report(analysis, company_info, OUTPUT_PDF_PATH)
-        st.success("📄 Rapport PDF généré avec succès !")
-        update_progress(step, total_steps)
-
-        with open(OUTPUT_PDF_PATH, "rb") as f:
-            st.download_button(
-                label="📥 Télécharger le rapport PDF",
-                data=f,
-                file_name="rapport_porter_enrichi.pdf",
-                mime="application/pdf"
-            )
+if job.status == FAILED:
+    st.error("❌ L'analyse a échoué.")
+    with st.expander("Détails de l'erreur"):
+        st.code(job.error)
+    st.stop()
 
+if job.status != DONE:
+    st.info("🧠 Analyse en cours... (le rapport s'affiche au fur et à mesure)")
+    if job.partial_text:
+        st.markdown(job.partial_text)
+    time.sleep(1)
+    st.rerun()
+
+result = job.result
+st.success(f"✅ Document lu ({result['text_length']} caractères)")
+company_info = result["company_info"]
+web_data = result["web_data"]
+
+if company_info:
+    st.success(f"🏢 Entreprise détectée : {company_info.get('nom_entreprise', 'N/A')}")
+    st.markdown("**Domaines d'activité** : " + ", ".join(company_info.get("domaines_activite", [])))
+    with st.expander("📄 Détails JSON"):
+        st.json(company_info)
+else:
+    st.warning("⚠️ Aucune donnée extraite, on continue malgré tout.")
+
+total_sources = sum(len(v) for v in web_data.values() if isinstance(v, list))
+st.info(f"🔎 {total_sources} sources web collectées.")
+if total_sources > 0:
+    with st.expander("📚 Aperçu des données collectées"):
+        st.json(web_data)
+
+with st.expander("📝 Rapport généré", expanded=True):
+    st.markdown(result["analysis"])
+
+with st.expander("⏱️ Performance de l'exécution"):
+    trace = result["trace"]
+    st.caption(f"Exécution `{trace['run_id']}` — {trace['wall_s']:.1f} s au total — trace : `{result['trace_path']}`")
+    st.dataframe(summarize_trace(trace), use_container_width=True)
+
+with open(result["output_path"], "rb") as f:
+    st.download_button(
+        label="📥 Télécharger le rapport PDF",
+        data=f,
+        file_name="rapport_porter_enrichi.pdf",
+        mime="application/pdf"
+    )
+
+if st.session_state.get("celebrated_job") != job.id:
+    st.session_state.celebrated_job = job.id
     st.balloons()
-    st.success("🎉 Analyse terminée avec succès !")
\ No newline at end of file
+st.success("🎉 Analyse terminée avec succès !")
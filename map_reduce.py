@@ -0,0 +1,138 @@
+import contextvars
+import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+from prompt_budget import count_tokens
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# === Configuration ===
+# Nombre d'appels simultanés vers Ollama : le serveur doit être lancé avec
+# OLLAMA_NUM_PARALLEL >= MAP_REDUCE_WORKERS pour en tirer parti.
+MAP_REDUCE_WORKERS = int(os.getenv("MAP_REDUCE_WORKERS", "4"))
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "2000"))
+CHUNK_OVERLAP_TOKENS = 100
+
+
+def estimate_tokens(text: str) -> int:
+    """Nombre de tokens, avec le décompte des budgets de prompt (prompt_budget.count_tokens) :
+    un morceau ou un résumé dimensionné ici tient dans le même budget une fois dans le prompt."""
+    return count_tokens(text)
+
+
+def _split_long_paragraph(paragraph: str, max_tokens: int) -> List[str]:
+    # Les tokens d'une suite de mots sont la somme de ceux de chaque mot
+    parts, current, current_tokens = [], [], 0
+    for word in paragraph.split(" "):
+        tokens = estimate_tokens(word)
+        if current and current_tokens + tokens > max_tokens:
+            parts.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def split_into_chunks(text: str, max_tokens: int = CHUNK_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[str]:
+    """Découpe le texte en morceaux d'au plus max_tokens, aux limites de paragraphes.
+
+    Chaque morceau reprend la fin du précédent (overlap_tokens) pour ne pas
+    perdre une information coupée à la frontière.
+    """
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > max_tokens:
+            paragraphs.extend(_split_long_paragraph(paragraph, max_tokens))
+        else:
+            paragraphs.append(paragraph)
+
+    chunks, current, current_tokens = [], [], 0
+    for paragraph in paragraphs:
+        tokens = estimate_tokens(paragraph) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            # Conserver la fin du morceau précédent comme contexte
+            overlap, overlap_size = [], 0
+            for previous in reversed(current):
+                size = estimate_tokens(previous) + 1
+                if overlap_size + size > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += size
+            current, current_tokens = overlap, overlap_size
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def parallel_map(fn: Callable[[T], R], items: Sequence[T], max_workers: int = MAP_REDUCE_WORKERS,
+                 on_result: Optional[Callable[[R], None]] = None) -> List[R]:
+    """Applique fn à chaque élément avec au plus max_workers appels simultanés.
+
+    L'ordre des résultats suit celui des entrées. on_result est appelé dans le
+    thread appelant pour chaque résultat, dans cet ordre, dès qu'il est disponible.
+    """
+    if len(items) <= 1 or max_workers <= 1:
+        results = (fn(item) for item in items)
+        return [_notify(result, on_result) for result in results]
+    # Chaque appel s'exécute dans une copie du contexte appelant (trace en cours...)
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        results = executor.map(lambda context, item: context.run(fn, item), contexts, items)
+        return [_notify(result, on_result) for result in results]
+
+
+def _notify(result: R, on_result: Optional[Callable[[R], None]]) -> R:
+    if on_result is not None:
+        on_result(result)
+    return result
+
+
+def map_reduce(items: Sequence[T], map_fn: Callable[[T], R], reduce_fn: Callable[[List[R]], R],
+               max_workers: int = MAP_REDUCE_WORKERS) -> R:
+    return reduce_fn(parallel_map(map_fn, items, max_workers))
+
+
+def merge_company_infos(partials: List[Dict]) -> Dict:
+    """Fusionne les extractions partielles faites sur chaque morceau du document.
+
+    Les champs texte prennent la valeur la plus fréquente (la première vue en
+    cas d'égalité) ; les listes sont réunies sans doublons, dans l'ordre d'apparition.
+    """
+    merged: Dict = {}
+    keys = []
+    for partial in partials:
+        for key in partial:
+            if key not in keys:
+                keys.append(key)
+
+    for key in keys:
+        values = [p[key] for p in partials if p.get(key)]
+        if not values:
+            continue
+        if any(isinstance(v, list) for v in values):
+            seen, union = set(), []
+            for value in values:
+                for item in value if isinstance(value, list) else [value]:
+                    marker = str(item).strip().lower()
+                    if marker and marker not in seen:
+                        seen.add(marker)
+                        union.append(item)
+            merged[key] = union
+        else:
+            counts = Counter(str(v).strip() for v in values)
+            best = max(counts.values())
+            merged[key] = next(v for v in values if counts[str(v).strip()] == best)
+    return merged
@@ -0,0 +1,151 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+# === Configuration ===
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(".cache", "pdf_text"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Format d'un fichier de cache :
+#   MAGIC | nombre de pages (u32) | offsets (u64 * (n + 1)) | pages compressées zlib
+MAGIC = b"PGC1"
+_HEADER = struct.Struct("<4sI")
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 du contenu du fichier, lu par blocs."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class CachedPages(Sequence[str]):
+    """Pages d'un document, lues à la demande depuis un fichier mappé en mémoire."""
+
+    def __init__(self, buffer: mmap.mmap):
+        self._buffer = buffer
+        magic, count = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Fichier de cache PDF invalide")
+        self._count = count
+        self._offsets = struct.unpack_from(f"<{count + 1}Q", buffer, _HEADER.size)
+        self._data_start = _HEADER.size + 8 * (count + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start = self._data_start + self._offsets[index]
+        stop = self._data_start + self._offsets[index + 1]
+        return zlib.decompress(self._buffer[start:stop]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self[i]
+
+
+class PageCache:
+    """Cache disque du texte extrait, adressé par le contenu du PDF.
+
+    La clé combine le hash du fichier et la version de l'extracteur ; la date
+    d'accès des fichiers sert d'ordre LRU pour l'éviction au-delà de max_bytes.
+    """
+
+    def __init__(self, directory: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (chemin, taille, mtime) -> hash, pour éviter de relire le PDF à chaque appel
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+
+    def key_for(self, file_path: str, extractor_version: str) -> str:
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            digest = file_digest(file_path)
+            self._digests[memo_key] = digest
+        return f"{digest}-{extractor_version}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pages")
+
+    def get(self, key: str) -> Optional[CachedPages]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)  # marque l'entrée comme récemment utilisée
+            return CachedPages(buffer)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def put(self, key: str, pages: Iterable[str]) -> None:
+        blobs = [zlib.compress(page.encode("utf-8"), 6) for page in pages]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, len(blobs)))
+                f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+                for blob in blobs:
+                    f.write(blob)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes."""
+        with self._lock:
+            try:
+                names = [n for n in os.listdir(self.directory) if n.endswith(".pages")]
+            except FileNotFoundError:
+                return
+            entries = []
+            for name in names:
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+
+_default_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> PageCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PageCache()
+    return _default_cache
@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import PyPDF2
+from PyPDF2 import PdfReader
+
+from pdf_cache import get_page_cache
+
+# === Configuration ===
+# Nombre de pages extraites par tâche envoyée au pool de processus
+PAGES_PER_TASK = 16
+# En dessous de ce nombre de pages, le coût de démarrage du pool dépasse le gain
+PARALLEL_MIN_PAGES = 64
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))  # 0 = automatique
+# À incrémenter dès que le texte produit par l'extraction change
+EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}-1"
+
+
+def _extract_page_range(args: Tuple[str, int, int]) -> List[str]:
+    """Extrait le texte des pages [start, stop) dans un processus du pool."""
+    file_path, start, stop = args
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def count_pages(file_path: str) -> int:
+    return len(PdfReader(file_path).pages)
+
+
+def _resolve_workers(workers: Optional[int], num_pages: int) -> int:
+    if workers is None:
+        workers = PDF_WORKERS
+    if workers <= 0:
+        if num_pages < PARALLEL_MIN_PAGES:
+            return 1
+        workers = os.cpu_count() or 1
+    # Inutile d'avoir plus de processus que de tâches
+    return max(1, min(workers, -(-num_pages // PAGES_PER_TASK)))
+
+
+def iter_pages(file_path: str, workers: Optional[int] = None) -> Iterator[str]:
+    """Génère le texte de chaque page, dans l'ordre du document.
+
+    Avec plusieurs workers, les plages de pages sont extraites en parallèle
+    mais restituées dans l'ordre. Le générateur peut être abandonné à tout
+    moment : les tâches non démarrées sont alors annulées.
+    """
+    reader = PdfReader(file_path)
+    num_pages = len(reader.pages)
+    workers = _resolve_workers(workers, num_pages)
+
+    if workers == 1:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    ranges = [
+        (file_path, start, min(start + PAGES_PER_TASK, num_pages))
+        for start in range(0, num_pages, PAGES_PER_TASK)
+    ]
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # Fenêtre glissante : on ne garde en vol que 2 tâches par worker pour
+        # borner la mémoire et pouvoir s'arrêter tôt sans tout extraire.
+        window = workers * 2
+        pending = [executor.submit(_extract_page_range, r) for r in ranges[:window]]
+        next_range = len(pending)
+        while pending:
+            future = pending.pop(0)
+            if next_range < len(ranges):
+                pending.append(executor.submit(_extract_page_range, ranges[next_range]))
+                next_range += 1
+            yield from future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_document_pages(file_path: str, workers: Optional[int] = None,
+                        use_cache: bool = True) -> Iterator[str]:
+    """Comme iter_pages, mais sert les pages depuis le cache disque si le PDF
+    a déjà été extrait. Le cache n'est alimenté qu'après une lecture complète."""
+    if not use_cache:
+        yield from iter_pages(file_path, workers=workers)
+        return
+
+    cache = get_page_cache()
+    key = cache.key_for(file_path, EXTRACTOR_VERSION)
+    cached = cache.get(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    pages = []
+    for page_text in iter_pages(file_path, workers=workers):
+        pages.append(page_text)
+        yield page_text
+    cache.put(key, pages)
+
+
+def load_pages(file_path: str, workers: Optional[int] = None,
+               use_cache: bool = True) -> Sequence[str]:
+    """Retourne toutes les pages du document (mappées depuis le cache si possible)."""
+    if use_cache:
+        cache = get_page_cache()
+        key = cache.key_for(file_path, EXTRACTOR_VERSION)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    return list(iter_document_pages(file_path, workers=workers, use_cache=use_cache))
+
+
+def extract_text(file_path: str, workers: Optional[int] = None,
+                 max_chars: Optional[int] = None, use_cache: bool = True) -> str:
+    """Assemble le texte du document, en s'arrêtant dès que max_chars est atteint.
+
+    L'arrêt se fait en fin de page : le texte retourné peut donc dépasser
+    légèrement max_chars, mais aucune page n'est coupée.
+    """
+    pages = []
+    total = 0
+    for page_text in iter_document_pages(file_path, workers=workers, use_cache=use_cache):
+        pages.append(page_text)
+        total += len(page_text)
+        if max_chars is not None and total >= max_chars:
+            break
+    return "".join(pages).strip()
@@ -0,0 +1,276 @@
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from fpdf import FPDF
+
+# === Configuration ===
+# Police TrueType Unicode (sous-ensemble embarqué par fpdf2) ; la première trouvée est utilisée
+REPORT_FONT_PATH = os.getenv("REPORT_FONT_PATH")
+REPORT_FONT_BOLD_PATH = os.getenv("REPORT_FONT_BOLD_PATH")
+FONT_CANDIDATES = [
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/TTF/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf", "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+     "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf"),
+    ("/Library/Fonts/Arial Unicode.ttf", None),
+    ("/System/Library/Fonts/Supplemental/Arial.ttf", "/System/Library/Fonts/Supplemental/Arial Bold.ttf"),
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+]
+FONT_FAMILY = "ReportSans"
+BODY_SIZE = 10
+LINE_HEIGHT = 5.5
+HEADING_SIZES = {1: 15, 2: 13, 3: 11.5}
+LIST_INDENT = 5
+
+# Équivalents Latin-1 pour la police de secours (Helvetica intégrée)
+LATIN1_REPLACEMENTS = str.maketrans({
+    "’": "'", "‘": "'", "“": '"', "”": '"', "–": "-", "—": "-", "…": "...",
+    "•": "-", "€": "EUR", "œ": "oe", "Œ": "OE", "\u00a0": " ", "\u202f": " ",
+})
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+BULLET_RE = re.compile(r"^(\s*)[-*•]\s+(.*)$")
+NUMBERED_RE = re.compile(r"^(\s*)(\d+[.)])\s+(.*)$")
+RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+
+
+class Segment(NamedTuple):
+    text: str
+    bold: bool
+    width: float
+
+
+class Block(NamedTuple):
+    kind: str  # heading, paragraph, bullet, numbered, rule
+    text: str
+    level: int = 0
+    marker: str = ""
+
+
+def find_unicode_font() -> Optional[Tuple[str, Optional[str]]]:
+    """(régulière, grasse) de la première police TrueType disponible, ou None."""
+    if REPORT_FONT_PATH and os.path.exists(REPORT_FONT_PATH):
+        return REPORT_FONT_PATH, REPORT_FONT_BOLD_PATH
+    for regular, bold in FONT_CANDIDATES:
+        if os.path.exists(regular):
+            return regular, bold
+    return None
+
+
+def parse_markdown(text: str) -> Iterator[Block]:
+    """Découpe le rapport en blocs au fil de la lecture (titres, paragraphes, listes, séparateurs).
+
+    Les lignes consécutives d'un paragraphe sont réunies en un seul bloc,
+    recoupé ensuite à la largeur de la page par le renderer.
+    """
+    paragraph = []
+
+    def flush():
+        if paragraph:
+            block = Block("paragraph", " ".join(paragraph))
+            paragraph.clear()
+            return block
+        return None
+
+    for match in re.finditer(r"[^\n]*", text):
+        line = match.group(0).rstrip()
+        if not line.strip():
+            block = flush()
+            if block:
+                yield block
+            continue
+
+        heading = HEADING_RE.match(line)
+        rule = RULE_RE.match(line) if not heading else None
+        bullet = BULLET_RE.match(line) if not (heading or rule) else None
+        numbered = NUMBERED_RE.match(line) if not (heading or rule or bullet) else None
+        if not (heading or rule or bullet or numbered):
+            paragraph.append(line.strip())
+            continue
+
+        block = flush()
+        if block:
+            yield block
+        if heading:
+            yield Block("heading", heading.group(2).replace("**", ""), len(heading.group(1)))
+        elif rule:
+            yield Block("rule", "")
+        elif bullet:
+            yield Block("bullet", bullet.group(2), len(bullet.group(1).expandtabs(4)) // 2)
+        else:
+            yield Block("numbered", numbered.group(3), len(numbered.group(1).expandtabs(4)) // 2,
+                        numbered.group(2))
+
+    block = flush()
+    if block:
+        yield block
+
+
+class PDFReportRenderer:
+    """Rendu PDF des rapports markdown produits par le pipeline.
+
+    L'en-tête peut être rendu dès que le nom de l'entreprise est connu, avant
+    que l'analyse ne soit disponible ; le contenu est ajouté ensuite bloc par
+    bloc avec render_markdown, puis output écrit le fichier.
+    """
+
+    def __init__(self, font: Optional[Tuple[str, Optional[str]]] = None):
+        self.pdf = FPDF()
+        self.pdf.set_auto_page_break(auto=True, margin=15)
+        self.pdf.add_page()
+
+        font = font or find_unicode_font()
+        self.unicode = font is not None
+        if self.unicode:
+            regular, bold = font
+            self.pdf.add_font(FONT_FAMILY, "", regular)
+            # Sans variante grasse, la police régulière sert aussi pour le gras
+            self.pdf.add_font(FONT_FAMILY, "B", bold if bold and os.path.exists(bold) else regular)
+            self.family = FONT_FAMILY
+        else:
+            self.family = "helvetica"
+        self.pdf.set_font(self.family, size=BODY_SIZE)
+        # Cellules sans marge interne : les segments d'une ligne se suivent exactement
+        self.pdf.c_margin = 0
+        self._widths: Dict[Tuple[str, bool, float], float] = {}
+
+    def _text(self, text: str) -> str:
+        if self.unicode:
+            return text
+        text = text.translate(LATIN1_REPLACEMENTS)
+        if all(ord(ch) < 256 for ch in text):
+            return text
+        # Dernier recours : lettre de base des caractères hors Latin-1, le reste est ignoré
+        return "".join(ch if ord(ch) < 256 else
+                       unicodedata.normalize("NFKD", ch).encode("latin-1", "ignore").decode("latin-1")
+                       for ch in text)
+
+    def _width(self, text: str, bold: bool, size: float) -> float:
+        key = (text, bold, size)
+        width = self._widths.get(key)
+        if width is None:
+            self.pdf.set_font(self.family, "B" if bold else "", size)
+            width = self._widths[key] = self.pdf.get_string_width(text)
+        return width
+
+    @staticmethod
+    def _words(text: str, bold: bool) -> Iterator[Tuple[str, bool, bool]]:
+        """(mot, gras, espace avant) ; chaque ** bascule le gras."""
+        parts = text.split("**")
+        if len(parts) % 2 == 0:  # ** non refermé : conservé tel quel
+            parts[-2:] = ["**".join(parts[-2:])]
+        pending_space = False
+        for i, part in enumerate(parts):
+            for match in re.finditer(r"(\s*)(\S+)", part):
+                yield match.group(2), bold != (i % 2 == 1), bool(match.group(1)) or pending_space
+                pending_space = False
+            pending_space = pending_space or part[-1:].isspace()
+
+    def _wrap(self, text: str, width: float, bold: bool, size: float) -> List[List[Segment]]:
+        """Coupe le texte en lignes de largeur <= width.
+
+        fpdf2 (multi_cell) remesure toute la ligne à chaque caractère ajouté ;
+        ici chaque mot n'est mesuré qu'une fois (cache par mot et par style).
+        """
+        lines, line, line_width = [], [], 0.0
+        for word, word_bold, space in self._words(text, bold):
+            word_width = self._width(word, word_bold, size)
+            space_width = self._width(" ", word_bold, size) if space and line else 0.0
+            if line and line_width + space_width + word_width > width:
+                lines.append(line)
+                line, line_width, space_width = [], 0.0, 0.0
+            while not line and word_width > width:
+                # Mot plus large que la ligne (URL...) : coupé au caractère
+                cut = 1
+                while cut < len(word) and self._width(word[:cut + 1], word_bold, size) <= width:
+                    cut += 1
+                lines.append([Segment(word[:cut], word_bold, self._width(word[:cut], word_bold, size))])
+                word = word[cut:]
+                word_width = self._width(word, word_bold, size)
+            if not word:
+                continue
+            text_part = (" " if space_width else "") + word
+            if line and line[-1].bold == word_bold:
+                last = line[-1]
+                line[-1] = Segment(last.text + text_part, word_bold, last.width + space_width + word_width)
+            else:
+                line.append(Segment(text_part, word_bold, space_width + word_width))
+            line_width += space_width + word_width
+        if line:
+            lines.append(line)
+        return lines
+
+    def _write(self, text: str, size: float = BODY_SIZE, bold: bool = False,
+               height: float = LINE_HEIGHT, align: str = "L", indent: Optional[float] = None,
+               marker: Optional[str] = None) -> None:
+        """marker (puce, numéro) est placé devant la première ligne, après le saut
+        de page éventuel : il n'est jamais séparé de son texte."""
+        pdf = self.pdf
+        left = pdf.l_margin if indent is None else indent
+        width = pdf.w - pdf.r_margin - left
+        lines = self._wrap(self._text(text), width, bold, size)
+        if marker is not None and not lines:
+            lines = [[]]
+        for line in lines:
+            if pdf.will_page_break(height):
+                pdf.add_page()
+            if marker is not None:
+                pdf.set_x(left - LIST_INDENT)
+                pdf.set_font(self.family, size=size)
+                pdf.cell(LIST_INDENT, height, marker)
+                marker = None
+            line_width = sum(segment.width for segment in line)
+            pdf.set_x(left + (width - line_width) / 2 if align == "C" else left)
+            for segment in line:
+                pdf.set_font(self.family, "B" if segment.bold else "", size)
+                pdf.cell(segment.width, height, segment.text)
+            pdf.ln(height)
+
+    def render_header(self, company_name: str, generated_at: Optional[datetime] = None) -> None:
+        generated_at = generated_at or datetime.now()
+        self._write(f"ANALYSE PORTER - {company_name}", size=16, bold=True, height=10, align="C")
+        self._write(f"Généré le {generated_at.strftime('%d/%m/%Y %H:%M')}", align="C")
+        self.pdf.ln(8)
+
+    def render_blocks(self, blocks: Iterable[Block]) -> None:
+        pdf = self.pdf
+        for block in blocks:
+            if block.kind == "heading":
+                size = HEADING_SIZES.get(block.level, BODY_SIZE + 0.5)
+                pdf.ln(3 if block.level <= 2 else 1.5)
+                self._write(block.text, size=size, bold=True, height=size * 0.6)
+                pdf.ln(1)
+            elif block.kind == "rule":
+                pdf.ln(2)
+                pdf.line(pdf.l_margin, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
+                pdf.ln(3)
+            elif block.kind in ("bullet", "numbered"):
+                indent = pdf.l_margin + LIST_INDENT * (block.level + 1)
+                marker = block.marker or ("•" if self.unicode else "-")
+                self._write(block.text, indent=indent, marker=self._text(marker))
+                pdf.ln(0.8)
+            else:
+                self._write(block.text)
+                pdf.ln(2)
+
+    def render_markdown(self, text: str) -> None:
+        self.render_blocks(parse_markdown(text))
+
+    def output(self, output_path: str) -> None:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.pdf.output(output_path)
+
+
+def render_report(text: str, output_path: str, company_name: Optional[str] = None) -> None:
+    """Rend un rapport markdown complet en PDF (en-tête facultatif)."""
+    renderer = PDFReportRenderer()
+    if company_name is not None:
+        renderer.render_header(company_name)
+    renderer.render_markdown(text)
+    renderer.output(output_path)
@@ -1,40 +1,23 @@
 import os
-import sys
-import threading
-import time
-from PyPDF2 import PdfReader
-from fpdf import FPDF
 
-from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
-import itertools
+
+from llm_cache import invoke_llm, stream_llm
+from llm_registry import MODEL_NAME, get_llm, warm_up
+from pdf_extraction import extract_text
+from pdf_report import render_report
+from progress import task
 
 # === Configuration ===
 INPUT_PDF_PATH = os.path.join("pdfs", "document.pdf")
 OUTPUT_PDF_PATH = os.path.join("output", "rapport_porter.pdf")
-MODEL_NAME = "llama3:instruct"
-SPINNER_RUNNING = True
-
-# === Animation spinner ===
-def spinner(message="🔄 Génération du rapport..."):
-    for c in itertools.cycle(["|", "/", "-", "\\"]):
-        if not SPINNER_RUNNING:
-            break
-        sys.stdout.write(f"\r{message} {c}")
-        sys.stdout.flush()
-        time.sleep(0.1)
-    sys.stdout.write("\r✅ Rapport généré avec succès !       \n")
 
 # === Étape 1 : Lire le contenu du PDF ===
-def read_pdf(file_path):
-    reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text.strip()
+def read_pdf(file_path, workers=None, max_chars=None, use_cache=True):
+    return extract_text(file_path, workers=workers, max_chars=max_chars, use_cache=use_cache)
 
 # === Étape 2 : Générer l’analyse Porter ===
-def generate_porter_analysis(text, model=MODEL_NAME):
+def generate_porter_analysis(text, model=MODEL_NAME, use_cache=True, on_token=None):
     template = """
     Tu es un expert en stratégie d'entreprise. À partir de l'analyse suivante :
 
@@ -104,39 +87,25 @@ def generate_porter_analysis(text, model=MODEL_NAME):
     """
 
     prompt = PromptTemplate(template=template, input_variables=["text"])
-    llm = OllamaLLM(model=model)
-    runner = prompt | llm
-
-    global SPINNER_RUNNING
-    SPINNER_RUNNING = True
-    t = threading.Thread(target=spinner)
-    t.start()
+    llm = get_llm(model)
 
-    result = runner.invoke({"text": text[:8000]})
+    if on_token is not None:
+        # Streaming : chaque morceau est transmis dès qu'il est décodé
+        chunks = []
+        for chunk in stream_llm(prompt, llm, {"text": text[:8000]}, use_cache=use_cache):
+            chunks.append(chunk)
+            on_token(chunk)
+        return "".join(chunks)
 
-    SPINNER_RUNNING = False
-    t.join()
+    with task("📝 Génération du rapport..."):
+        result = invoke_llm(prompt, llm, {"text": text[:8000]}, use_cache=use_cache)
 
     return result  # ← ici le texte est directement retourné
 
 # === Étape 3 : Générer un PDF ===
 
-import unicodedata
-
-def clean_text(text):
-    """Nettoie les caractères spéciaux pour éviter les erreurs Unicode dans le PDF."""
-    return unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode("ASCII")
-
 def create_pdf_report(text, output_path):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-
-    lines = text.split("\n")
-    for line in lines:
-        pdf.multi_cell(0, 10, clean_text(line))
-
-    pdf.output(output_path)
+    render_report(text, output_path)
 
 
 # === Main ===
@@ -145,11 +114,13 @@ if __name__ == "__main__":
         print(f"❌ Fichier introuvable : {INPUT_PDF_PATH}")
         exit(1)
 
+    warm_up()
     print("📥 Lecture du PDF...")
     text = read_pdf(INPUT_PDF_PATH)
 
     print("🧠 Analyse stratégique en cours...")
-    analysis = generate_porter_analysis(text)
+    analysis = generate_porter_analysis(text, on_token=lambda chunk: print(chunk, end="", flush=True))
+    print()
 
     print("📄 Création du fichier PDF...")
     create_pdf_report(analysis, OUTPUT_PDF_PATH)
@@ -0,0 +1,318 @@
+import os
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from langchain.prompts import PromptTemplate
+
+from deadline import Deadline, generate_until
+from llm_cache import invoke_llm
+from map_reduce import parallel_map
+
+# === Configuration ===
+SECTION_WORKERS = int(os.getenv("SECTION_WORKERS", "7"))
+# Ajouté à une section coupée à l'échéance (generate_sections avec deadline)
+INTERRUPTED_NOTE = "_Section interrompue : délai d'analyse atteint._"
+
+
+class Section(NamedTuple):
+    key: str
+    heading: str
+    instructions: str
+    query: str = ""     # requête de recherche des passages pertinents du document
+
+
+# Sections générées indépendamment, dans l'ordre du rapport final
+SECTIONS: List[Section] = [
+    Section("rivalite", "## 1. RIVALITÉ ENTRE CONCURRENTS EXISTANTS", """
+    ### Données du marché récentes
+    [Inclure au minimum une actualité récente sur un concurrent direct avec date et source]
+
+    ### Analyse stratégique
+    - Nombre et taille des concurrents
+    - Intensité concurrentielle actuelle
+    - Innovations ou différenciations identifiées
+    - Parts de marché estimées
+    - Barrières de sortie
+    """, "concurrents concurrence concurrentiel part de marché leader rival prix différenciation innovation"),
+    Section("nouveaux_entrants", "## 2. MENACE DES NOUVEAUX ENTRANTS", """
+    ### Tendances du secteur
+    [Inclure au minimum une actualité sur les nouvelles entreprises ou innovations entrantes]
+
+    ### Analyse
+    - Barrières à l'entrée actuelles
+    - Évolution réglementaire récente
+    - Besoins en capital / technologie
+    - Nouveaux entrants identifiés
+    """, "nouveaux entrants barrières entrée réglementation licence investissement capital technologie start-up"),
+    Section("substitution", "## 3. MENACE DES PRODUITS DE SUBSTITUTION", """
+    ### Innovations / Disruptions identifiées
+    [Utiliser les données web pour citer au moins une technologie ou alternative crédible]
+
+    ### Analyse
+    - Substituts viables et en développement
+    - Facilité de substitution pour les clients
+    - Niveau de menace pour le modèle économique actuel
+    """, "substitution alternative substitut technologie disruption nouveaux produits innovation remplacement"),
+    Section("clients", "## 4. POUVOIR DE NÉGOCIATION DES CLIENTS", """
+    ### Évolution du marché client
+    [Basé sur les tendances web avec source]
+
+    ### Analyse
+    - Volume et diversité de la clientèle
+    - Sensibilité prix et comportement d'achat
+    - Possibilités de substitution côté client
+    - Tendances comportementales récentes
+    """, "clients clientèle consommateurs demande contrats commandes prix tarifs fidélisation segments"),
+    Section("fournisseurs", "## 5. POUVOIR DE NÉGOCIATION DES FOURNISSEURS", """
+    ### Informations sur la chaîne d'approvisionnement
+    [Basé sur les données ou actualités récentes si présentes]
+
+    ### Analyse
+    - Concentration des fournisseurs
+    - Spécificité des intrants
+    - Risques d'approvisionnement
+    - Négociation et dépendance
+    """, "fournisseurs approvisionnement achats matières premières sous-traitance coûts dépendance chaîne"),
+    Section("actualites", "## DERNIÈRES ACTUALITÉS SECTORIELLES", """
+    **Inclure obligatoirement au moins 3 actualités pertinentes** pour **les domaines d'activité de l'entreprise**, et **au moins 3 pour ses concurrents directs**.
+
+    ### Actualités des domaines d'activité
+    Pour chaque actualité : **Titre**, **Date de publication**, **Source**,
+    **Résumé** (au moins 500 caractères) et **Impact stratégique**.
+
+    ### Actualités des concurrents identifiés
+    Pour chaque actualité : **Concurrent concerné**, **Titre de l'actualité**,
+    **Date de publication**, **Source**, **Résumé** (au moins 500 caractères)
+    et **Analyse stratégique**.
+    """, "activités événements faits marquants acquisitions partenariats lancement annonce"),
+    Section("recommandations", "## RECOMMANDATIONS STRATÉGIQUES ENRICHIES", """
+    ### Actions prioritaires
+    1. **Court terme (0-6 mois)** : décisions opérationnelles rapides basées sur les dernières actualités
+    2. **Moyen terme (6-18 mois)** : alignement stratégique basé sur les tendances sectorielles
+    3. **Long terme (18+ mois)** : anticipation et vision stratégique durable
+
+    ### Opportunités identifiées
+    [Basé sur les actualités et données avec sources]
+
+    ### Menaces à surveiller
+    [Basé sur l'analyse concurrentielle ou environnementale]
+
+    ### Veille continue
+    [Indicateurs à suivre, fréquence et outils recommandés]
+    """, "stratégie objectifs perspectives risques opportunités plan investissements priorités"),
+]
+# Clés des cinq forces, seules résumées par la synthèse exécutive
+FORCES = tuple(section.key for section in SECTIONS[:5])
+SECTION_VARIABLES = ["company_info", "original_text", "web_data", "company_name", "domains", "heading", "instructions"]
+
+# Début commun à tous les prompts portant sur un document (extraction, analyse,
+# sections) : le serveur réutilise le cache KV de ce préfixe d'un appel à l'autre
+# tant que le document est identique, et seule la suite du prompt est recalculée
+DOCUMENT_PREFIX = """
+    Tu es un expert en stratégie d'entreprise et en intelligence économique.
+
+    ## DOCUMENT ORIGINAL :
+    {original_text}
+"""
+
+# Document, puis données communes aux sections, puis consigne propre à la section
+SECTION_TEMPLATE = DOCUMENT_PREFIX + """
+    ## INFORMATIONS ENTREPRISE :
+    {company_info}
+
+    ## DONNÉES WEB COLLECTÉES :
+    {web_data}
+
+    ---
+
+    Rédige en français, pour l'entreprise {company_name} (secteurs : {domains}),
+    uniquement la section suivante d'un rapport d'analyse selon les 5 forces de Porter.
+    Commence exactement par le titre ci-dessous et respecte cette structure :
+
+    {heading}
+    {instructions}
+
+    Sois dense et précis ; pour chaque actualité citée, indique la date de publication,
+    le nom de la source et le lien si disponible. N'ajoute aucun texte hors de cette section.
+    """
+
+SYNTHESIS_TEMPLATE = """
+    Tu es un expert en stratégie d'entreprise. Voici les sections d'un rapport
+    d'analyse Porter sur l'entreprise {company_name} :
+
+    {sections}
+
+    Rédige en français une synthèse exécutive dense, percutante et stratégique
+    (10 à 15 lignes) des forces en présence et de la position concurrentielle
+    globale de l'entreprise. Réponds uniquement avec le texte de la synthèse, sans titre.
+    """
+
+
+def _ensure_heading(text: str, heading: str) -> str:
+    """Impose le titre attendu en tête de section, que le modèle l'ait reformulé ou omis."""
+    text = text.strip()
+    first_line, _, rest = text.partition("\n")
+    if re.match(r"#{1,2}\s", first_line):
+        return f"{heading}\n{rest.strip()}"
+    return f"{heading}\n{text}"
+
+
+def format_sources(web_data: Dict) -> str:
+    """Liste des sources collectées, construite sans appel au modèle."""
+    groups = [
+        ("Sources officielles", web_data.get("company_official", []) + web_data.get("company_linkedin", [])),
+        ("Actualités sectorielles analysées", web_data.get("industry_news", [])),
+        ("Sources concurrentielles", web_data.get("competitor_news", [])),
+    ]
+    lines = ["## SOURCES ET VEILLE STRATÉGIQUE"]
+    for title, items in groups:
+        lines.append(f"### {title}")
+        seen = set()
+        for item in items:
+            url = item.get("url", "")
+            if url in seen:
+                continue
+            seen.add(url)
+            date = item.get("published_date") or item.get("date", "")
+            lines.append(f"- {item.get('title', '')} ({date}, {item.get('source', '')}) {url}".rstrip())
+        if not seen:
+            lines.append("- Aucune source collectée")
+    return "\n".join(lines)
+
+
+def generate_report_by_sections(llm: Any, inputs: Dict[str, str], web_data: Dict,
+                                use_cache: bool = True, max_workers: int = SECTION_WORKERS,
+                                on_section: Optional[Callable[[str], None]] = None,
+                                section_documents: Optional[Dict[str, str]] = None,
+                                sections: Optional[List[Section]] = None, synthesis: bool = True,
+                                deadline: Optional[Deadline] = None,
+                                sections_deadline: Optional[Deadline] = None) -> str:
+    """Génère chaque section du rapport en parallèle puis assemble le markdown final.
+
+    inputs contient les variables du prompt d'analyse enrichie (company_info,
+    original_text, web_data, company_name, domains). La durée totale est celle
+    de la section la plus longue, plus une courte passe de synthèse.
+
+    on_section reçoit chaque section dès qu'elle est prête, dans l'ordre du
+    rapport ; la synthèse n'est connue qu'à la fin, dans le texte retourné.
+    section_documents remplace, pour chaque clé de section, l'extrait du
+    document par les passages propres à cette section.
+
+    sections (par défaut SECTIONS, les cinq forces en tête) et synthesis
+    choisissent les parties produites. Les sections non terminées à
+    sections_deadline (à défaut deadline), puis la synthèse à deadline, sont
+    omises et listées dans « LIMITES DE L'ANALYSE ».
+    """
+    sections = SECTIONS if sections is None else sections
+    texts = generate_sections(llm, inputs, sections, use_cache=use_cache, max_workers=max_workers,
+                              on_section=on_section, section_documents=section_documents,
+                              deadline=sections_deadline or deadline)
+    completed = {section.key: text for section, text in zip(sections, texts) if text is not None}
+    omitted = [section.heading for section, text in zip(sections, texts) if text is None]
+    summary = None
+    if synthesis and completed and not (deadline is not None and deadline.expired()):
+        summary = generate_synthesis(llm, inputs["company_name"], completed, use_cache=use_cache, deadline=deadline)
+        if summary is None:
+            omitted.append("## SYNTHÈSE EXÉCUTIVE")
+    return assemble_report(inputs["company_name"], inputs["domains"], summary, list(completed.values()),
+                           web_data, omitted)
+
+
+def section_inputs_for(section: Section, inputs: Dict[str, str],
+                       section_documents: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Variables du prompt d'une section (extrait du document propre à la section si fourni)."""
+    values = dict(inputs, heading=section.heading, instructions=section.instructions)
+    if section_documents and section.key in section_documents:
+        values["original_text"] = section_documents[section.key]
+    return {name: values[name] for name in SECTION_VARIABLES}
+
+
+def generate_sections(llm: Any, inputs: Dict[str, str], sections: List[Section], use_cache: bool = True,
+                      max_workers: int = SECTION_WORKERS, on_section: Optional[Callable[[str], None]] = None,
+                      section_documents: Optional[Dict[str, str]] = None,
+                      deadline: Optional[Deadline] = None) -> List[Optional[str]]:
+    """Génère les sections demandées en parallèle ; le résultat suit l'ordre de `sections`.
+
+    Avec deadline, une section inachevée à l'échéance est interrompue : elle
+    garde ses lignes terminées, suivies d'INTERRUPTED_NOTE, ou vaut None si
+    rien ne suit son titre (on_section n'est alors pas appelé).
+    """
+    section_prompt = PromptTemplate(
+        template=SECTION_TEMPLATE,
+        input_variables=SECTION_VARIABLES,
+    )
+
+    def generate_section(section: Section) -> Optional[str]:
+        values = section_inputs_for(section, inputs, section_documents)
+        if deadline is None:
+            text = invoke_llm(section_prompt, llm, values, use_cache=use_cache)
+        else:
+            text, complete = generate_until(section_prompt, llm, values, deadline, use_cache=use_cache)
+            if not complete:
+                partial = _ensure_heading(text[:text.rfind("\n") + 1], section.heading)
+                if not partial.partition("\n")[2].strip():
+                    return None
+                return f"{partial}\n\n{INTERRUPTED_NOTE}"
+        return _ensure_heading(text, section.heading)
+
+    def notify(text: Optional[str]) -> None:
+        if text is not None and on_section is not None:
+            on_section(text)
+
+    return parallel_map(generate_section, sections, max_workers, on_result=notify)
+
+
+def generate_synthesis(llm: Any, company_name: str, sections: Dict[str, str], use_cache: bool = True,
+                       deadline: Optional[Deadline] = None) -> Optional[str]:
+    """Synthèse exécutive rédigée à partir des sections des cinq forces (None si interrompue à deadline).
+
+    sections associe la clé de chaque section générée à son texte ; seules les
+    forces (FORCES) présentes sont résumées, dans l'ordre du rapport.
+    """
+    synthesis_prompt = PromptTemplate(template=SYNTHESIS_TEMPLATE, input_variables=["company_name", "sections"])
+    forces = [sections[key] for key in FORCES if key in sections]
+    inputs = {"company_name": company_name, "sections": "\n\n".join(forces)}
+    if deadline is None:
+        return invoke_llm(synthesis_prompt, llm, inputs, use_cache=use_cache).strip()
+    text, complete = generate_until(synthesis_prompt, llm, inputs, deadline, use_cache=use_cache)
+    return text.strip() if complete else None
+
+
+def format_omitted(omitted: List[str]) -> str:
+    lines = ["## LIMITES DE L'ANALYSE",
+             "Délai d'analyse atteint : les parties suivantes n'ont pas été générées."]
+    lines.extend(f"- {heading.lstrip('#').strip()}" for heading in omitted)
+    return "\n".join(lines)
+
+
+def keep_complete_sections(text: str) -> str:
+    """Rapport interrompu en cours de génération, réduit à ses sections « ## » terminées.
+
+    La section en cours au moment de l'interruption (après le dernier titre)
+    est retirée, ainsi que le séparateur qui la précède.
+    """
+    cut = text.rfind("\n## ")
+    kept = text[:cut] if cut >= 0 else ""
+    return kept.rstrip().removesuffix("---").rstrip()
+
+
+def assemble_report(company_name: str, domains: str, synthesis: Optional[str], sections: List[str],
+                    web_data: Dict, omitted: Optional[List[str]] = None) -> str:
+    """Assemble les sections dans la structure attendue par create_enhanced_pdf_report.
+
+    Sans synthèse (niveau rapide, délai atteint), la section est absente ;
+    omitted liste les titres des parties non générées.
+    """
+    parts = [f"# RAPPORT D'ANALYSE PORTER ENRICHI - {company_name}"]
+    if synthesis is not None:
+        parts.append(f"## SYNTHÈSE EXÉCUTIVE\n{synthesis}")
+    parts.append(
+        "## INFORMATIONS ENTREPRISE\n"
+        f"- **Nom** : {company_name}\n"
+        f"- **Secteurs d'activité** : {domains}"
+    )
+    parts.extend(sections)
+    if omitted:
+        parts.append(format_omitted(omitted))
+    parts.append(format_sources(web_data))
+    return "\n\n---\n\n".join(parts)
@@ -0,0 +1,198 @@
+import asyncio
+import contextvars
+import itertools
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, Optional, TextIO, Tuple
+
+# États publiés pour chaque tâche
+START = "start"
+UPDATE = "update"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    task_id: str
+    parent_id: Optional[str]
+    kind: str
+    message: str
+    fraction: Optional[float] = None
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+Listener = Callable[[ProgressEvent], None]
+
+# Les abonnés et la tâche courante suivent le contexte : parallel_map copie le
+# contexte dans ses threads et asyncio dans ses tâches, si bien que deux analyses
+# exécutées en même temps dans un processus ne voient que leurs propres événements
+_listeners: contextvars.ContextVar[Tuple[Listener, ...]] = contextvars.ContextVar("progress_listeners", default=())
+_current_task: contextvars.ContextVar[Optional["TaskHandle"]] = contextvars.ContextVar("progress_task", default=None)
+
+
+class TaskHandle:
+    """Avancement d'une tâche ; utilisable depuis n'importe quel thread.
+
+    Les abonnés sont ceux du contexte de création : un callback appelé depuis
+    un autre thread publie toujours vers les bons destinataires.
+    """
+
+    def __init__(self, message: str, parent: Optional["TaskHandle"], listeners: Tuple[Listener, ...]):
+        self.task_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.task_id if parent is not None else None
+        self.message = message
+        self.fraction: Optional[float] = None
+        self._listeners = listeners
+        self._lock = threading.Lock()
+
+    def _emit(self, kind: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            event = ProgressEvent(self.task_id, self.parent_id, kind, self.message, self.fraction, error)
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                # Un affichage défaillant ne doit pas interrompre l'analyse
+                pass
+
+    def update(self, fraction: Optional[float] = None, message: Optional[str] = None) -> None:
+        with self._lock:
+            if fraction is not None:
+                self.fraction = fraction
+            if message is not None:
+                self.message = message
+        self._emit(UPDATE)
+
+
+@contextmanager
+def listen(listener: Listener) -> Iterator[None]:
+    """Abonne listener aux tâches démarrées dans ce contexte (et ses threads/tâches dérivés)."""
+    token = _listeners.set(_listeners.get() + (listener,))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
+
+
+@contextmanager
+def task(message: str) -> Iterator[TaskHandle]:
+    """Déclare une tâche : start à l'entrée, done ou failed à la sortie.
+
+    Une tâche ouverte dans une autre devient sa sous-tâche (parent_id).
+    """
+    handle = TaskHandle(message, _current_task.get(), _listeners.get())
+    handle._emit(START)
+    token = _current_task.set(handle)
+    try:
+        yield handle
+    except BaseException as e:
+        handle._emit(FAILED, error=str(e) or repr(e))
+        raise
+    else:
+        handle._emit(DONE)
+    finally:
+        _current_task.reset(token)
+
+
+def fraction_listener(callback: Callable[[float, str], None]) -> Listener:
+    """Adapte les événements à un callback(fraction, message) (barre de progression).
+
+    La fraction est celle de la tâche racine ; le message est celui de la
+    dernière tâche démarrée ou mise à jour.
+    """
+    state = {"fraction": 0.0}
+    lock = threading.Lock()
+
+    def listener(event: ProgressEvent) -> None:
+        if event.kind not in (START, UPDATE):
+            return
+        with lock:
+            if event.parent_id is None and event.fraction is not None:
+                state["fraction"] = event.fraction
+            fraction = state["fraction"]
+        callback(fraction, event.message)
+
+    return listener
+
+
+def queue_listener(queue: "asyncio.Queue[ProgressEvent]", loop: Optional[asyncio.AbstractEventLoop] = None) -> Listener:
+    """Transmet les événements (publiés depuis n'importe quel thread) à une file asyncio."""
+    loop = loop or asyncio.get_running_loop()
+
+    def listener(event: ProgressEvent) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    return listener
+
+
+class TerminalProgress:
+    """Affichage terminal : une ligne animée listant les tâches en cours.
+
+    Les messages des tâches racines s'impriment sur leur propre ligne ; la fin
+    d'une sous-tâche affiche « ✅ ... terminé ! ». Hors terminal interactif,
+    aucune animation n'est écrite.
+    """
+
+    FRAMES = ["|", "/", "-", "\\"]
+
+    def __init__(self, stream: TextIO = sys.stdout, interval: float = 0.1):
+        self.stream = stream
+        self.interval = interval
+        self.animated = getattr(stream, "isatty", lambda: False)()
+        self._active: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._line_width = 0
+
+    def __call__(self, event: ProgressEvent) -> None:
+        with self._lock:
+            if event.parent_id is None:
+                if event.kind in (START, UPDATE):
+                    self._println(event.message)
+                elif event.kind == FAILED:
+                    self._println(f"❌ Échec : {event.error}")
+                return
+
+            if event.kind in (START, UPDATE):
+                self._active[event.task_id] = event.message
+            else:
+                message = self._active.pop(event.task_id, event.message)
+                if event.kind == DONE:
+                    self._println(f"✅ {message} terminé !")
+                else:
+                    self._println(f"❌ {message} : {event.error}")
+
+            if self.animated and self._active and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._animate, name="terminal-progress", daemon=True)
+                self._thread.start()
+
+    def _println(self, text: str) -> None:
+        # Appelé sous self._lock
+        self._clear()
+        self.stream.write(f"{text}\n")
+        self.stream.flush()
+
+    def _clear(self) -> None:
+        if self._line_width:
+            self.stream.write("\r" + " " * self._line_width + "\r")
+            self._line_width = 0
+
+    def _animate(self) -> None:
+        for frame in itertools.cycle(self.FRAMES):
+            with self._lock:
+                if not self._active:
+                    self._clear()
+                    self.stream.flush()
+                    return
+                line = f"{frame} " + " · ".join(self._active.values())
+                self._clear()
+                self.stream.write(line)
+                self._line_width = len(line)
+                self.stream.flush()
+            time.sleep(self.interval)
@@ -0,0 +1,164 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # dépendance facultative
+    Tokenizer = None
+
+# === Configuration ===
+# tokenizer.json du modèle servi par Ollama (MODEL_NAME) pour un décompte exact ;
+# sans lui, le décompte est une estimation proche d'un tokenizer BPE
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH")
+# Fenêtre de contexte du modèle (num_ctx) à partager entre prompt et réponse
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "8192"))
+WEB_SNIPPET_CHARS = 200
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+# Découpes successives de fit_text : paragraphes, phrases, mots
+_SPLITS = (("\n", r"\n"), (" ", r"(?<=[.!?])\s+"), (" ", r"\s+"))
+# En dessous, le reste du budget n'est pas complété par un paragraphe partiel
+MIN_PARTIAL_TOKENS = 32
+_tokenizer = None
+
+
+def _get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None and Tokenizer is not None and TOKENIZER_PATH and os.path.exists(TOKENIZER_PATH):
+        _tokenizer = Tokenizer.from_file(TOKENIZER_PATH)
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Nombre de tokens de text pour le modèle.
+
+    Sans tokenizer, chaque mot compte pour un token par tranche de 5
+    caractères et chaque signe de ponctuation pour un token : bien plus proche
+    d'un BPE que len/4 sur du français accentué ou des URL.
+    """
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return sum(1 + (len(piece) - 1) // 5 for piece in _PIECE_RE.findall(text))
+
+
+def fit_text(text: str, max_tokens: int) -> str:
+    """Début de text tenant dans max_tokens, coupé entre paragraphes.
+
+    Le budget restant est complété par les phrases entières du paragraphe
+    suivant ; une phrase n'est coupée entre deux mots que si elle ne tient
+    pas seule dans le budget.
+    """
+    return fit_text_with_offset(text, max_tokens)[0]
+
+
+def fit_text_with_offset(text: str, max_tokens: int, _level: int = 0) -> Tuple[str, int]:
+    """Comme fit_text, avec la position dans text où s'arrête l'extrait.
+
+    L'extrait recolle ses morceaux avec un séparateur simple : ce n'est pas un
+    préfixe de text quand les espaces sont irréguliers, la suite du document
+    commence donc à la position renvoyée et non à len(extrait).
+    """
+    if len(text) <= max_tokens:  # jamais plus d'un token par caractère
+        return text, len(text)
+    separator, pattern = _SPLITS[_level]
+    pieces = re.split(pattern, text)
+    kept = fit_records(pieces, max_tokens)
+    if len(kept) == len(pieces):
+        return text, len(text)
+    starts = [0] + [match.end() for match in re.finditer(pattern, text)]
+    offset = starts[len(kept) - 1] + len(kept[-1]) if kept else 0
+    remaining = max_tokens - sum(count_tokens(piece) + 1 for piece in kept)
+    next_level = _level + 1
+    if next_level < len(_SPLITS) and (not kept or (next_level == 1 and remaining >= MIN_PARTIAL_TOKENS)):
+        partial, partial_offset = fit_text_with_offset(pieces[len(kept)], remaining - 1, next_level)
+        if partial:
+            kept.append(partial)
+            offset = starts[len(kept) - 1] + partial_offset
+    return separator.join(kept).rstrip(), offset
+
+
+def fit_records(records: Iterable[str], max_tokens: int) -> List[str]:
+    """Plus longue suite d'enregistrements complets tenant dans max_tokens."""
+    kept, used = [], 0
+    for record in records:
+        tokens = count_tokens(record) + 1
+        if used + tokens > max_tokens:
+            break
+        kept.append(record)
+        used += tokens
+    return kept
+
+
+def allocate(template: str, slots: Dict[str, int], output_tokens: int,
+             context_tokens: int = PROMPT_CONTEXT_TOKENS) -> Dict[str, int]:
+    """Budgets des variables d'un prompt.
+
+    Les budgets demandés sont réduits proportionnellement si le gabarit, les
+    variables et la réponse attendue ne tiennent pas dans la fenêtre de contexte.
+    """
+    fixed = count_tokens(re.sub(r"\{\w+\}", "", template))
+    available = max(0, context_tokens - output_tokens - fixed)
+    requested = sum(slots.values())
+    if requested <= available:
+        return dict(slots)
+    return {name: budget * available // requested for name, budget in slots.items()}
+
+
+WEB_CATEGORIES = [
+    ("company_official", "Sources officielles"),
+    ("company_linkedin", "LinkedIn"),
+    ("industry_news", "Actualités sectorielles"),
+    ("competitor_news", "Actualités concurrents"),
+]
+
+
+def _cell(value: Optional[str], limit: Optional[int] = None) -> str:
+    value = re.sub(r"\s+", " ", str(value or "")).replace("|", "/").strip()
+    if limit and len(value) > limit:
+        value = value[:limit].rsplit(" ", 1)[0] + "…"
+    return value
+
+
+def format_web_table(web_data: Dict, max_tokens: int) -> str:
+    """Résultats web en tableau compact (titre | date | source | url | extrait), sans doublons.
+
+    Les catégories sont servies à tour de rôle pour que chacune soit
+    représentée, et la coupe se fait toujours entre deux lignes.
+    """
+    seen = set()
+    rows_by_category = {}
+    for category, _ in WEB_CATEGORIES:
+        rows = []
+        for item in web_data.get(category, []):
+            key = item.get("url") or _cell(item.get("title")).lower()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            rows.append(" | ".join([
+                _cell(item.get("title")),
+                _cell(item.get("published_date") or item.get("date")),
+                _cell(item.get("source")),
+                _cell(item.get("url")),
+                _cell(item.get("snippet"), WEB_SNIPPET_CHARS),
+            ]))
+        rows_by_category[category] = rows
+
+    header = "titre | date | source | url | extrait"
+    budget = max_tokens - count_tokens(header) - sum(count_tokens(label) + 2 for _, label in WEB_CATEGORIES)
+    interleaved = []
+    for rank in range(max((len(rows) for rows in rows_by_category.values()), default=0)):
+        for category, _ in WEB_CATEGORIES:
+            if rank < len(rows_by_category[category]):
+                interleaved.append((category, rows_by_category[category][rank]))
+    kept = fit_records((row for _, row in interleaved), budget)
+    selected = interleaved[:len(kept)]
+
+    lines = [header]
+    for category, label in WEB_CATEGORIES:
+        rows = [row for row_category, row in selected if row_category == category]
+        if rows:
+            lines.append(f"[{label}]")
+            lines.extend(rows)
+    return "\n".join(lines) if len(lines) > 1 else "Aucune donnée web collectée."
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+from map_reduce import estimate_tokens
+
+# === Configuration ===
+RETRIEVAL_CACHE_DIR = os.getenv("RETRIEVAL_CACHE_DIR", os.path.join(".cache", "retrieval"))
+PASSAGE_TOKENS = 200
+INDEX_VERSION = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Longueur de référence (en mots indexés) d'un passage pour retrieve_stable
+STABLE_REFERENCE_TERMS = PASSAGE_TOKENS // 2
+
+STOPWORDS = set("""
+au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me meme mes moi
+mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos
+votre vous est sont ete etre avoir ont a plus cette cet comme tout tous entre ainsi dont sans the of and
+to in for on with by is are be this that from at as an or
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots normalisés : minuscules, sans accents, sans mots vides, pluriels simples retirés."""
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ASCII", "ignore").decode("ASCII")
+    terms = []
+    for word in re.findall(r"[a-z0-9]{2,}", text):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith(("s", "x")):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def build_passages(text: str, max_tokens: int = PASSAGE_TOKENS) -> List[str]:
+    """Regroupe les paragraphes du document en passages d'environ max_tokens."""
+    passages, current, size = [], [], 0
+    for paragraph in re.split(r"\n+", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if current and size + tokens > max_tokens:
+            passages.append(" ".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class BM25Index:
+    """Index BM25 en mémoire sur les passages d'un document."""
+
+    def __init__(self, passages: List[str], postings: Dict[str, List[Tuple[int, int]]], lengths: List[int]):
+        self.passages = passages
+        self.postings = postings
+        self.lengths = lengths
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, text: str) -> "BM25Index":
+        passages = build_passages(text)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        for doc_id, passage in enumerate(passages):
+            terms = Counter(tokenize(passage))
+            lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+        return cls(passages, postings, lengths)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, int]]:
+        """Les k meilleurs passages pour la requête, sous forme (score, indice)."""
+        n = len(self.passages)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = 1 - BM25_B + BM25_B * self.lengths[doc_id] / (self.avg_length or 1)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, doc_id) for doc_id, score in ranked[:k]]
+
+    def retrieve(self, queries: Sequence[str], token_budget: int, k: int = 8) -> str:
+        """Meilleurs passages pour une ou plusieurs requêtes, dans la limite de token_budget.
+
+        Les requêtes sont servies à tour de rôle pour que chacune soit représentée ;
+        les passages retenus sont restitués dans l'ordre du document.
+        """
+        return select_passages(self.passages, [self.search(query, k) for query in queries], token_budget, k)
+
+    def to_dict(self) -> Dict:
+        return {"version": INDEX_VERSION, "passages": self.passages, "postings": self.postings,
+                "lengths": self.lengths}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BM25Index":
+        postings = {term: [tuple(p) for p in entries] for term, entries in data["postings"].items()}
+        return cls(data["passages"], postings, data["lengths"])
+
+
+def select_passages(passages: Sequence[str], rankings: Sequence[List[Tuple[float, int]]],
+                    token_budget: int, k: int) -> str:
+    """Passages classés, servis requête par requête à tour de rôle dans la limite de
+    token_budget, puis restitués dans l'ordre du document."""
+    selected, used = [], 0
+    for rank in range(k):
+        for ranking in rankings:
+            if rank >= len(ranking):
+                continue
+            doc_id = ranking[rank][1]
+            if doc_id in selected:
+                continue
+            tokens = estimate_tokens(passages[doc_id])
+            if used + tokens > token_budget:
+                continue
+            selected.append(doc_id)
+            used += tokens
+    return "\n[...]\n".join(passages[doc_id] for doc_id in sorted(selected))
+
+
+def retrieve_stable(passages: Sequence[str], queries: Sequence[str], token_budget: int, k: int = 8) -> str:
+    """Comme BM25Index.retrieve, mais le score d'un passage ne dépend que du passage.
+
+    BM25 pondère par l'IDF et la longueur moyenne de tout le document : la
+    moindre modification déplace alors le classement de passages inchangés.
+    Ici (IDF constant, longueur de référence fixe), modifier une page ne change
+    que le score de ses propres passages.
+    """
+    counts = [Counter(tokenize(passage)) for passage in passages]
+    rankings = []
+    for query in queries:
+        terms = set(tokenize(query))
+        scores = []
+        for doc_id, passage_terms in enumerate(counts):
+            norm = 1 - BM25_B + BM25_B * sum(passage_terms.values()) / STABLE_REFERENCE_TERMS
+            score = sum(tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+                        for tf in (passage_terms[term] for term in terms) if tf)
+            if score:
+                scores.append((score, doc_id))
+        rankings.append(sorted(scores, key=lambda item: (-item[0], item[1]))[:k])
+    return select_passages(passages, rankings, token_budget, k)
+
+
+_indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+_indexes_lock = threading.Lock()
+_MAX_INDEXES_IN_MEMORY = 8
+
+
+def get_document_index(text: str) -> BM25Index:
+    """Index du document, construit une fois puis conservé en mémoire et sur disque
+    (clé : hash du texte issu de read_pdf)."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _indexes_lock:
+        if digest in _indexes:
+            _indexes.move_to_end(digest)
+            return _indexes[digest]
+
+    path = os.path.join(RETRIEVAL_CACHE_DIR, f"{digest}-v{INDEX_VERSION}.json")
+    index = None
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                index = BM25Index.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            index = None
+    if index is None:
+        index = BM25Index.build(text)
+        os.makedirs(RETRIEVAL_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    with _indexes_lock:
+        _indexes[digest] = index
+        while len(_indexes) > _MAX_INDEXES_IN_MEMORY:
+            _indexes.popitem(last=False)
+    return index
@@ -0,0 +1,139 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+# Bornes du schéma : transmises au décodage contraint d'Ollama, elles limitent
+# aussi le nombre de tokens générés
+MAX_NAME_CHARS = 120
+MAX_DOMAINS = 6
+MAX_COMPETITORS = 10
+MAX_ITEM_CHARS = 80
+MAX_OUTLINE_POINTS = 4
+MAX_POINT_CHARS = 240
+
+
+class CompanyInfo(BaseModel):
+    """Informations extraites du document sur l'entreprise analysée."""
+
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    nom_entreprise: str = Field(min_length=1, max_length=MAX_NAME_CHARS)
+    domaines_activite: List[str] = Field(default_factory=list, max_length=MAX_DOMAINS)
+    secteur_principal: str = Field(default="", max_length=MAX_NAME_CHARS)
+    pays: str = Field(default="", max_length=MAX_ITEM_CHARS)
+    concurrents_mentionnes: List[str] = Field(default_factory=list, max_length=MAX_COMPETITORS)
+
+    @field_validator("domaines_activite", "concurrents_mentionnes", mode="before")
+    @classmethod
+    def _clean_items(cls, value: Any) -> Any:
+        # Une chaîne seule est acceptée comme liste d'un élément ; doublons et vides retirés
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return value
+        items, seen = [], set()
+        for item in value:
+            item = str(item).strip()[:MAX_ITEM_CHARS]
+            if item and item.lower() not in seen:
+                seen.add(item.lower())
+                items.append(item)
+        return items
+
+
+class DocumentOutline(BaseModel):
+    """Points clés du document pour chaque force de Porter : plan de l'analyse."""
+
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    rivalite: List[str] = Field(default_factory=list, max_length=MAX_OUTLINE_POINTS)
+    nouveaux_entrants: List[str] = Field(default_factory=list, max_length=MAX_OUTLINE_POINTS)
+    substitution: List[str] = Field(default_factory=list, max_length=MAX_OUTLINE_POINTS)
+    clients: List[str] = Field(default_factory=list, max_length=MAX_OUTLINE_POINTS)
+    fournisseurs: List[str] = Field(default_factory=list, max_length=MAX_OUTLINE_POINTS)
+    chiffres_cles: List[str] = Field(default_factory=list, max_length=MAX_OUTLINE_POINTS)
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _clean_points(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return value
+        return [point for point in (str(item).strip()[:MAX_POINT_CHARS] for item in value) if point]
+
+
+class DocumentAnalysisPlan(BaseModel):
+    """Réponse de l'extraction en une passe : informations entreprise et plan."""
+
+    entreprise: CompanyInfo
+    plan: DocumentOutline
+
+
+def company_info_schema() -> Dict[str, Any]:
+    """Schéma JSON transmis au paramètre `format` d'Ollama."""
+    return CompanyInfo.model_json_schema()
+
+
+def analysis_plan_schema() -> Dict[str, Any]:
+    """Schéma JSON de la réponse d'extraction en une passe."""
+    return DocumentAnalysisPlan.model_json_schema()
+
+
+def _validate(model: type, raw: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        return None, f"JSON invalide ou tronqué : {e}"
+    try:
+        return model.model_validate(data).model_dump(), None
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'racine'} : {err['msg']}"
+                           for err in e.errors())
+        return None, errors
+
+
+def validate_company_info(raw: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(informations, None) si la réponse respecte le schéma, sinon (None, erreurs lisibles)."""
+    return _validate(CompanyInfo, raw)
+
+
+def validate_analysis_plan(raw: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """({"entreprise": ..., "plan": ...}, None) si la réponse respecte le schéma, sinon (None, erreurs)."""
+    return _validate(DocumentAnalysisPlan, raw)
+
+
+_STRING = r'"((?:[^"\\]|\\.)*)"'
+# Clé suivie d'une chaîne ou d'une liste, éventuellement encore incomplète
+_FIELD = re.compile(r'"(\w+)"\s*:\s*(\[[^\]]*\]?|"(?:[^"\\]|\\.)*"?)')
+_LIST_ITEM = re.compile(_STRING + r"\s*[,\]]")
+
+
+class PartialCompanyInfo:
+    """Informations lisibles dans une réponse JSON encore en cours de génération.
+
+    feed() reçoit les morceaux du flux ; une valeur n'est retenue que lorsque
+    sa chaîne est refermée (élément de liste suivi de « , » ou « ] »).
+    info ne contient que les champs de CompanyInfo déjà connus.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.info: Dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> bool:
+        """Ajoute chunk ; True si de nouvelles valeurs sont complètes."""
+        self.buffer += chunk
+        info: Dict[str, Any] = {}
+        for key, value in _FIELD.findall(self.buffer):
+            if key not in CompanyInfo.model_fields:
+                continue
+            if value.startswith("["):
+                items = [json.loads(f'"{item}"').strip() for item in _LIST_ITEM.findall(value)]
+                info[key] = [item for item in items if item]
+            elif re.fullmatch(_STRING, value):
+                info[key] = json.loads(value).strip()
+        changed = info != self.info
+        self.info = info
+        return changed
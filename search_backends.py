@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache_store import SQLiteCache
+
+# === Configuration ===
+SERPAPI_KEY = os.getenv("SERPAPI_KEY")  # Pour Google Search API
+NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")  # Pour News API
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", "https://serpapi.com")
+NEWSAPI_BASE_URL = os.getenv("NEWSAPI_BASE_URL", "https://newsapi.org")
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")  # auto | serpapi | newsapi | stub
+
+# Requêtes par seconde autorisées pour chaque fournisseur
+RATE_LIMITS = {
+    "serpapi": float(os.getenv("SERPAPI_RATE_PER_SEC", "5")),
+    "newsapi": float(os.getenv("NEWSAPI_RATE_PER_SEC", "1")),
+}
+HTTP_TIMEOUT = float(os.getenv("SEARCH_HTTP_TIMEOUT", "10"))
+HTTP_POOL_SIZE = int(os.getenv("SEARCH_HTTP_POOL_SIZE", "16"))
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(".cache", "search_results.sqlite"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24")) * 3600
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+
+# === Limitation de débit ===
+class TokenBucket:
+    """Seau à jetons thread-safe : au plus `rate` requêtes par seconde en régime
+    établi, avec des rafales jusqu'à `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"Débit de requêtes invalide : {rate} (doit être > 0 requête par seconde)")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# === Session HTTP partagée ===
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Session unique (connexions keep-alive réutilisées) avec reprise exponentielle
+    sur les erreurs transitoires et respect de l'en-tête Retry-After."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+            _session = session
+        return _session
+
+
+# === Backends de recherche ===
+class SearchBackend(ABC):
+    """Un fournisseur de recherche : retourne des résultats au format
+    {title, snippet, url, date, source, published_date}."""
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        ...
+
+
+class HTTPSearchBackend(SearchBackend):
+    def __init__(self, api_key: str, base_url: str, session: Optional[requests.Session] = None,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.session = session or get_http_session()
+        self.rate_limiter = rate_limiter or TokenBucket(RATE_LIMITS.get(self.name, 1.0))
+
+    def _get(self, path: str, params: Dict) -> Dict:
+        self.rate_limiter.acquire()
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+
+class SerpApiBackend(HTTPSearchBackend):
+    name = "serpapi"
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        data = self._get("/search.json", {
+            "engine": "google",
+            "q": query,
+            "num": num_results,
+            "hl": "fr",
+            "api_key": self.api_key,
+        })
+        today = datetime.now().strftime("%Y-%m-%d")
+        return [
+            {
+                "title": item.get("title", ""),
+                "snippet": item.get("snippet", ""),
+                "url": item.get("link", ""),
+                "date": today,
+                "source": item.get("source") or item.get("displayed_link", ""),
+                "published_date": item.get("date", ""),
+            }
+            for item in data.get("organic_results", [])[:num_results]
+        ]
+
+
+class NewsApiBackend(HTTPSearchBackend):
+    name = "newsapi"
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        data = self._get("/v2/everything", {
+            "q": query,
+            "pageSize": num_results,
+            "sortBy": "publishedAt",
+            "apiKey": self.api_key,
+        })
+        today = datetime.now().strftime("%Y-%m-%d")
+        return [
+            {
+                "title": article.get("title", ""),
+                "snippet": article.get("description") or "",
+                "url": article.get("url", ""),
+                "date": today,
+                "source": (article.get("source") or {}).get("name", ""),
+                "published_date": (article.get("publishedAt") or "")[:10],
+            }
+            for article in data.get("articles", [])[:num_results]
+        ]
+
+
+class StubBackend(SearchBackend):
+    """Résultats simulés, utilisés quand aucune clé d'API n'est configurée."""
+
+    name = "stub"
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        current_date = datetime.now()
+        results = [
+            {
+                "title": f"Dernières actualités - {query}",
+                "snippet": "Informations récentes trouvées sur le web avec contexte détaillé...",
+                "url": "https://example.com/news/article1",
+                "date": current_date.strftime("%Y-%m-%d"),
+                "source": "Les Échos",
+                "published_date": "2025-01-15"
+            },
+            {
+                "title": f"Analyse sectorielle - {query}",
+                "snippet": "Étude approfondie des tendances du marché...",
+                "url": "https://example.com/analysis/sector",
+                "date": current_date.strftime("%Y-%m-%d"),
+                "source": "Reuters",
+                "published_date": "2025-01-10"
+            }
+        ]
+        return results[:num_results]
+
+
+class CachedSearchBackend(SearchBackend):
+    """Ajoute un cache disque requête → résultats (avec TTL) devant un backend."""
+
+    def __init__(self, backend: SearchBackend, cache: SQLiteCache):
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        key = hashlib.sha256(f"{self.backend.name}\n{num_results}\n{query}".encode("utf-8")).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        results = self.backend.search(query, num_results)
+        self.cache.set(key, json.dumps(results, ensure_ascii=False))
+        return results
+
+
+_backend: Optional[SearchBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_search_backend(kind: str = SEARCH_BACKEND) -> SearchBackend:
+    if kind == "auto":
+        kind = "serpapi" if SERPAPI_KEY else "newsapi" if NEWSAPI_KEY else "stub"
+    if kind == "stub":
+        return StubBackend()
+    if kind == "serpapi":
+        backend = SerpApiBackend(SERPAPI_KEY or "", SERPAPI_BASE_URL)
+    elif kind == "newsapi":
+        backend = NewsApiBackend(NEWSAPI_KEY or "", NEWSAPI_BASE_URL)
+    else:
+        raise ValueError(f"Backend de recherche inconnu : {kind}")
+    cache = SQLiteCache(SEARCH_CACHE_PATH, SEARCH_CACHE_TTL_SECONDS, SEARCH_CACHE_MAX_BYTES)
+    return CachedSearchBackend(backend, cache)
+
+
+def get_search_backend() -> SearchBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_search_backend()
+        return _backend
+
+
+def set_search_backend(backend: Optional[SearchBackend]) -> None:
+    """Remplace le backend du processus (None revient à la configuration par défaut)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+
+from complet import run_enhanced_pipeline
+from jobs import DONE, FAILED, JobManager
+from llm_registry import warm_up
+from tiers import DEFAULT_TIER, TIERS
+
+# === Configuration ===
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8000"))
+# Analyses exécutées en même temps (appels LLM simultanés) ; les autres attendent dans la file
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "2"))
+SERVICE_DIR = os.getenv("SERVICE_DIR", os.path.join("output", "service"))
+MAX_UPLOAD_MB = int(os.getenv("SERVICE_MAX_UPLOAD_MB", "50"))
+# Taille des morceaux lus dans le fichier envoyé
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def request_key(document_hash: str, options: Dict) -> str:
+    return f"{document_hash}:{json.dumps(options, sort_keys=True)}"
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Contenu du fichier envoyé, lu par morceaux : HTTP 413 dès que max_bytes est dépassé,
+    sans garder le reste du fichier en mémoire."""
+    content = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        content += chunk
+        if len(content) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"PDF limité à {MAX_UPLOAD_MB} Mo")
+    return bytes(content)
+
+
+class AnalysisService:
+    """File d'analyses partagée par les requêtes HTTP.
+
+    Deux soumissions identiques (même contenu de PDF, mêmes options) tant que
+    la première est en attente ou en cours renvoient la même tâche au lieu de
+    relancer le calcul. Le modèle utilisé est celui de llm_registry :
+    register_llm permet d'y substituer une doublure (tests, démonstrations).
+    """
+
+    def __init__(self, max_workers: int = SERVICE_WORKERS, directory: str = SERVICE_DIR):
+        self.manager = JobManager(max_workers=max_workers)
+        self.directory = directory
+        self._inflight: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _store_upload(self, content: bytes, document_hash: str) -> str:
+        upload_dir = os.path.join(self.directory, "uploads")
+        os.makedirs(upload_dir, exist_ok=True)
+        path = os.path.join(upload_dir, f"{document_hash}.pdf")
+        if not os.path.exists(path):
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+        return path
+
+    def submit(self, content: bytes, options: Dict) -> Dict:
+        """Retourne {"job_id", "coalesced"} ; coalesced si une tâche identique était déjà en file."""
+        document_hash = hashlib.sha256(content).hexdigest()
+        key = request_key(document_hash, options)
+        with self._lock:
+            job_id = self._inflight.get(key)
+            job = self.manager.get(job_id) if job_id else None
+            if job is not None and job.status not in (DONE, FAILED):
+                return {"job_id": job_id, "coalesced": True}
+
+            input_path = self._store_upload(content, document_hash)
+            job_id = self.manager.submit(self._run, input_path, options, key)
+            self._inflight[key] = job_id
+        return {"job_id": job_id, "coalesced": False}
+
+    def _run(self, handle, input_path: str, options: Dict, key: str) -> Dict:
+        output_path = os.path.join(self.directory, "jobs", handle.job_id, "rapport_porter_enrichi.pdf")
+        try:
+            return run_enhanced_pipeline(input_path=input_path, output_path=output_path,
+                                         progress=handle.update, on_token=handle.append_text, **options)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) == handle.job_id:
+                    del self._inflight[key]
+
+
+def create_app(service: Optional[AnalysisService] = None) -> FastAPI:
+    service = service or AnalysisService()
+    app = FastAPI(title="Analyse Porter Enrichie")
+    app.state.service = service
+
+    def get_job(job_id: str):
+        job = service.manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Tâche inconnue")
+        return job
+
+    def get_result(job_id: str) -> Dict:
+        job = get_job(job_id)
+        if job.status != DONE:
+            raise HTTPException(status_code=409, detail=f"Analyse non terminée ({job.status})")
+        return job.result
+
+    @app.post("/analyses", status_code=202)
+    async def submit_analysis(file: UploadFile = File(...), map_reduce: Optional[bool] = Form(None),
+                              parallel_sections: Optional[bool] = Form(None), retrieval: Optional[bool] = Form(None),
+                              single_pass: Optional[bool] = Form(None),
+                              tier: str = Form(DEFAULT_TIER), deadline_s: Optional[float] = Form(None)):
+        if tier not in TIERS:
+            raise HTTPException(status_code=400, detail=f"Niveau inconnu : {tier} (choix : {', '.join(TIERS)})")
+        if deadline_s is not None and deadline_s <= 0:
+            raise HTTPException(status_code=400, detail="deadline_s doit être positif")
+        # Taille connue une fois le fichier reçu (mis en attente sur disque) : refus sans le lire
+        if file.size is not None and file.size > MAX_UPLOAD_MB * 1024 * 1024:
+            raise HTTPException(status_code=413, detail=f"PDF limité à {MAX_UPLOAD_MB} Mo")
+        content = await read_upload(file, MAX_UPLOAD_MB * 1024 * 1024)
+        if not content.startswith(b"%PDF"):
+            raise HTTPException(status_code=400, detail="Le fichier envoyé n'est pas un PDF")
+        # Options non envoyées : celles du niveau d'analyse s'appliquent
+        flags = {"map_reduce": map_reduce, "parallel_sections": parallel_sections, "retrieval": retrieval,
+                 "single_pass": single_pass}
+        options = dict({key: value for key, value in flags.items() if value is not None},
+                       tier=tier, deadline_s=deadline_s)
+        # Hachage et écriture du fichier hors de la boucle asyncio
+        submitted = await asyncio.to_thread(service.submit, content, options)
+        return dict(submitted, status_url=f"/analyses/{submitted['job_id']}")
+
+    @app.get("/analyses/{job_id}")
+    async def analysis_status(job_id: str):
+        job = get_job(job_id)
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "progress": job.progress,
+            "message": job.message,
+            "error": job.error.splitlines()[0] if job.error else None,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+        }
+
+    @app.get("/analyses/{job_id}/report")
+    async def analysis_report(job_id: str):
+        result = get_result(job_id)
+        return {key: result[key] for key in ("company_info", "web_data", "analysis")}
+
+    @app.get("/analyses/{job_id}/pdf")
+    async def analysis_pdf(job_id: str):
+        result = get_result(job_id)
+        return FileResponse(result["output_path"], media_type="application/pdf",
+                            filename="rapport_porter_enrichi.pdf")
+
+    return app
+
+
+if __name__ == "__main__":
+    warm_up()
+    uvicorn.run(create_app(), host=SERVICE_HOST, port=SERVICE_PORT)
@@ -0,0 +1,74 @@
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[..., Any]     # reçoit le résultat de chaque dépendance en argument nommé
+    deps: Tuple[str, ...] = ()
+
+
+def check_graph(stages: Iterable[Stage], inputs: Iterable[str] = ()) -> List[Stage]:
+    """Vérifie le graphe (noms uniques, dépendances connues, pas de cycle) et
+    retourne les étapes dans un ordre topologique."""
+    stages = list(stages)
+    known = set(inputs)
+    by_name: Dict[str, Stage] = {}
+    for stage in stages:
+        if stage.name in by_name or stage.name in known:
+            raise ValueError(f"Étape définie deux fois : {stage.name}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name and dep not in known]
+        if missing:
+            raise ValueError(f"Dépendances inconnues pour {stage.name} : {', '.join(missing)}")
+
+    ordered, done = [], set(known)
+    pending = list(stages)
+    while pending:
+        ready = [stage for stage in pending if all(dep in done for dep in stage.deps)]
+        if not ready:
+            raise ValueError(f"Cycle entre les étapes : {', '.join(stage.name for stage in pending)}")
+        for stage in ready:
+            ordered.append(stage)
+            done.add(stage.name)
+        pending = [stage for stage in pending if stage.name not in done]
+    return ordered
+
+
+def run_stage_graph(stages: Iterable[Stage], inputs: Optional[Dict[str, Any]] = None,
+                    on_start: Optional[Callable[[str], None]] = None,
+                    max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Exécute chaque étape dès que ses dépendances sont terminées.
+
+    Les étapes indépendantes tournent en parallèle dans des threads qui
+    héritent du contexte appelant (trace, abonnés de progression). Retourne
+    inputs complété du résultat de chaque étape. La première erreur annule
+    les étapes pas encore démarrées et est relevée telle quelle.
+    """
+    results = dict(inputs or {})
+    pending = check_graph(stages, results)
+    running: Dict[Future, Stage] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(pending)),
+                            thread_name_prefix="stage") as executor:
+        try:
+            while pending or running:
+                ready = [stage for stage in pending if all(dep in results for dep in stage.deps)]
+                for stage in ready:
+                    pending.remove(stage)
+                    if on_start is not None:
+                        on_start(stage.name)
+                    kwargs = {dep: results[dep] for dep in stage.deps}
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, stage.run, **kwargs)] = stage
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    results[stage.name] = future.result()
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    return results
@@ -0,0 +1,52 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Les modules du projet sont à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Les modules lisent leur configuration à l'import : caches, traces et historique
+# des tests sont isolés avant tout import, pour toute la session
+_SESSION_DIR = tempfile.mkdtemp(prefix="porter-tests-")
+os.environ.update({
+    "LLM_CACHE_ENABLED": "0",
+    "OLLAMA_WARMUP": "0",
+    "PDF_CACHE_DIR": os.path.join(_SESSION_DIR, "pdf_cache"),
+    "TRACE_DIR": os.path.join(_SESSION_DIR, "traces"),
+    "RETRIEVAL_CACHE_DIR": os.path.join(_SESSION_DIR, "retrieval"),
+    "HISTORY_PATH": os.path.join(_SESSION_DIR, "history.sqlite"),
+    "SEARCH_CACHE_PATH": os.path.join(_SESSION_DIR, "search.sqlite"),
+    "SERVICE_DIR": os.path.join(_SESSION_DIR, "service"),
+})
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_SESSION_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def fake_models():
+    """FakeLLM pour chaque modèle de niveau et recherche simulée ; retirés après le test."""
+    from fakes import FakeLLM, FakeSearchBackend
+    from llm_registry import register_llm, reset_llms
+    from search_backends import set_search_backend
+    from tiers import TIERS
+
+    llm = FakeLLM(latency_s=0, tokens_per_s=0, output_tokens=120)
+    for model in {tier.model for tier in TIERS.values()}:
+        register_llm(llm, model)
+    set_search_backend(FakeSearchBackend(latency_s=0))
+    yield llm
+    reset_llms()
+    set_search_backend(None)
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    """PDF de 20 pages, au-delà d'ANALYSIS_MAX_CHARS."""
+    from benchmark import make_synthetic_pdf
+
+    return make_synthetic_pdf(str(tmp_path / "rapport.pdf"), 20)
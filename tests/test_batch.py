@@ -0,0 +1,30 @@
+import json
+import os
+import shutil
+
+import batch
+
+
+def test_same_basename_in_two_folders_gets_two_directories(fake_models, sample_pdf, tmp_path):
+    for folder in ("a", "b"):
+        os.makedirs(tmp_path / folder)
+        shutil.copy(sample_pdf, tmp_path / folder / "report.pdf")
+    manifest = tmp_path / "lot.json"
+    manifest.write_text(json.dumps(["a/report.pdf", "b/report.pdf"]), encoding="utf-8")
+
+    documents = batch.discover_documents(str(manifest))
+    runner = batch.BatchRunner(output_dir=str(tmp_path / "sorties"), cpu_workers=1)
+    statuses = runner.run(documents)
+
+    assert list(statuses.values()) == ["done", "done"]
+    assert len({runner.document_dir(document) for document in documents}) == 2
+    for document in documents:
+        with open(os.path.join(runner.document_dir(document), batch.DONE_MARKER), encoding="utf-8") as f:
+            assert json.load(f)["source"] == os.path.abspath(document)
+
+
+def test_document_dir_is_stable_for_the_same_path(tmp_path):
+    runner = batch.BatchRunner(output_dir=str(tmp_path))
+
+    assert runner.document_dir("x/report.pdf") == runner.document_dir(os.path.abspath("x/report.pdf"))
+    assert os.path.basename(runner.document_dir("x/report.pdf")).startswith("report-")
@@ -0,0 +1,76 @@
+import json
+import os
+
+import benchmark
+import llm_registry
+import search_backends
+from fakes import FAKE_COMPANY_INFO, FAKE_OUTLINE, FakeLLM, FakeSearchBackend
+
+
+def test_compare_flags_slower_stage_only():
+    baseline = {"10_pages": {"read_pdf": 1.0, "analysis": 1.0}}
+    results = {"10_pages": {"read_pdf": 1.5, "analysis": 1.1}}
+    regressions = benchmark.compare(results, baseline)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("10_pages / read_pdf")
+
+
+def test_compare_ignores_noise_below_absolute_threshold():
+    baseline = {"10_pages": {"read_pdf": 0.01}}
+    results = {"10_pages": {"read_pdf": 0.05}}
+    assert benchmark.compare(results, baseline) == []
+
+
+def test_case_name_includes_active_options():
+    options = {"map_reduce": True, "parallel_sections": False, "tier": "fast", "single_pass": None}
+    assert benchmark.case_name(10, options) == "10_pages map_reduce tier=fast"
+    assert benchmark.case_name(10, {"tier": "standard"}) != benchmark.case_name(10, options)
+
+
+def test_main_fails_without_reference(tmp_path, monkeypatch):
+    monkeypatch.setattr(benchmark, "RESULTS_PATH", str(tmp_path / "latest.json"))
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda sizes, repeat, options, directory: {
+        benchmark.case_name(size, options): {"end_to_end": 1.0} for size in sizes})
+    # Le modèle et la recherche simulés ne restent pas enregistrés pour les autres tests
+    monkeypatch.setattr(llm_registry, "register_llm", lambda llm, model=None: None)
+    monkeypatch.setattr(search_backends, "set_search_backend", lambda backend: None)
+    baseline = tmp_path / "baseline.json"
+    assert benchmark.main(["--sizes", "1", "--baseline", str(baseline)]) == 1
+
+    assert benchmark.main(["--sizes", "1", "--baseline", str(baseline), "--update-baseline"]) == 0
+    assert benchmark.main(["--sizes", "1", "--baseline", str(baseline)]) == 0
+    # Une autre combinaison d'options n'est pas comparée à cette référence
+    assert benchmark.main(["--sizes", "1", "--baseline", str(baseline), "--map-reduce"]) == 1
+    assert list(json.loads(baseline.read_text())) == ["1_pages tier=standard"]
+
+
+def test_fake_llm_answers_json_prompts():
+    llm = FakeLLM(latency_s=0, tokens_per_s=0)
+    assert json.loads(llm.invoke("Retourne un JSON")) == FAKE_COMPANY_INFO
+    combined = json.loads(llm.invoke('Retourne un JSON avec "entreprise" et "plan"'))
+    assert combined == {"entreprise": FAKE_COMPANY_INFO, "plan": FAKE_OUTLINE}
+
+
+def test_fake_llm_stream_matches_invoke():
+    llm = FakeLLM(latency_s=0, tokens_per_s=0)
+    prompt = "## 1. RIVALITÉ\n## 2. NOUVEAUX ENTRANTS"
+    assert "".join(llm.stream(prompt)) == llm.invoke(prompt)
+    assert llm.invoke(prompt).count("## ") == 2
+
+
+def test_fake_search_backend_is_deterministic():
+    backend = FakeSearchBackend(latency_s=0)
+    first = backend.search("énergie France", num_results=3)
+    assert len(first) == 3
+    assert first == backend.search("énergie France", num_results=3)
+
+
+def test_bench_environment_is_restored(monkeypatch):
+    monkeypatch.setenv("TRACE_DIR", "traces-de-test")
+    monkeypatch.delenv("PDF_CACHE_DIR", raising=False)
+    with benchmark.bench_environment() as directory:
+        assert os.environ["TRACE_DIR"].startswith(directory)
+        assert os.environ["LLM_CACHE_ENABLED"] == "0"
+    assert os.environ["TRACE_DIR"] == "traces-de-test"
+    assert "PDF_CACHE_DIR" not in os.environ
+    assert not os.path.exists(directory)
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+import comparative
+from fakes import FAKE_COMPANY_INFO, FakeLLM, FakeSearchBackend
+from search_backends import set_search_backend
+
+
+class CountingSearchBackend(FakeSearchBackend):
+    """FakeSearchBackend qui note chaque requête exécutée."""
+
+    def __init__(self):
+        super().__init__(latency_s=0)
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def search(self, query, num_results=5):
+        with self._lock:
+            self.queries.append(query)
+        return super().search(query, num_results)
+
+
+@pytest.fixture
+def counting_backend():
+    backend = CountingSearchBackend()
+    set_search_backend(backend)
+    yield backend
+    set_search_backend(None)
+
+
+NAMES = ["Société A", "Société B", "Société C"]
+
+
+def _run(monkeypatch, tmp_path, names):
+    infos = iter([dict(FAKE_COMPANY_INFO, nom_entreprise=name) if name else {} for name in names])
+    monkeypatch.setattr(comparative, "read_pdf", lambda path: f"texte de {path}")
+    monkeypatch.setattr(comparative, "extract_company_info", lambda text, **kwargs: next(infos))
+    paths = [str(tmp_path / f"{i}.pdf") for i in range(len(names))]
+    return comparative.run_comparative_analysis(paths, output_path=None, llm=FakeLLM(latency_s=0, tokens_per_s=0),
+                                                use_cache=False, max_workers=1)
+
+
+@pytest.mark.parametrize("names", [["Société A", ""], ["Société A", " société  a "]])
+def test_fewer_than_two_companies_is_an_error(monkeypatch, tmp_path, names):
+    with pytest.raises(ValueError, match="au moins deux"):
+        _run(monkeypatch, tmp_path, names)
+
+
+def test_main_reports_missing_comparison(monkeypatch, tmp_path, capsys):
+    paths = [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+    for path in paths:
+        path.write_bytes(b"%PDF")
+
+    def fail(*args, **kwargs):
+        raise ValueError("Comparaison impossible : 1 entreprise(s) distincte(s)")
+
+    monkeypatch.setattr(comparative, "warm_up", lambda: None)
+    monkeypatch.setattr(comparative, "run_comparative_analysis", fail)
+    assert comparative.main([str(path) for path in paths]) == 1
+    assert "Comparaison impossible" in capsys.readouterr().out
+
+
+def test_shared_queries_are_planned_once():
+    infos = [dict(FAKE_COMPANY_INFO, nom_entreprise=name) for name in NAMES] + [{}]
+    unique, per_company, indexes = comparative.plan_shared_queries(infos)
+
+    # Par entreprise : site officiel, LinkedIn, 3 domaines et 3 concurrents communs
+    assert [len(queries) for queries in per_company] == [8, 8, 8, 0]
+    assert len(unique) == 12
+    for queries, company_indexes in zip(per_company, indexes):
+        assert [unique[i].query for i in company_indexes] == [search.query for search in queries]
+
+
+def test_collect_shared_data_runs_each_query_once(counting_backend):
+    infos = [dict(FAKE_COMPANY_INFO, nom_entreprise=name) for name in NAMES] + [{}]
+    web_data, stats = comparative.collect_shared_data(infos, concurrency=4)
+
+    assert stats == {"planned_queries": 24, "executed_queries": 12}
+    assert len(counting_backend.queries) == 12
+    assert len(set(counting_backend.queries)) == 12
+    for name, data in zip(NAMES, web_data):
+        # Résultats propres à l'entreprise, résultats communs identiques pour toutes
+        assert data["search_metadata"]["company"] == name
+        assert all(name in item["title"] for item in data["company_official"])
+        assert data["industry_news"] == web_data[0]["industry_news"]
+        assert data["competitor_news"] == web_data[0]["competitor_news"]
+        assert len(data["competitor_news"]) == 3 * 10
+    assert web_data[3] == {}
@@ -0,0 +1,67 @@
+import pytest
+
+import history_store
+from history_store import SUMMARY_COLUMNS, AnalysisHistory
+
+
+def _info(company, sector="Énergie", competitors=()):
+    return {"nom_entreprise": company, "secteur_principal": sector, "pays": "France",
+            "concurrents_mentionnes": list(competitors)}
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = AnalysisHistory(str(tmp_path / "history.sqlite"))
+    history.record(_info("Société A", competitors=["Rival X", "Rival Y"]), {}, "rapport 1", "doc-1")
+    history.record(_info("Société B", "Logistique", ["Rival Z"]), {}, "rapport 2", "doc-2")
+    history.record(_info("société  a", "énergie", ["rival x"]), {"industry_news": [{"title": "t"}]},
+                   "rapport 3", "doc-1", source="a.pdf", options={"retrieval": True})
+    return history
+
+
+def test_lists_are_recent_first_and_filtered(history):
+    assert history.count() == 3
+    listed = history.list_analyses()
+    assert [row["id"] for row in listed] == [3, 2, 1]
+    assert set(listed[0]) == set(SUMMARY_COLUMNS)
+
+    # Recherche insensible à la casse et aux espaces
+    assert [row["id"] for row in history.list_analyses(company="SOCIÉTÉ A")] == [3, 1]
+    assert [row["id"] for row in history.list_analyses(sector="logistique")] == [2]
+    assert [row["id"] for row in history.list_analyses(limit=1, offset=1)] == [2]
+
+
+def test_lookups_by_company_document_and_sector(history):
+    assert history.latest_for_company("Société A")["id"] == 3
+    assert history.latest_for_company("Inconnue") is None
+    assert [row["id"] for row in history.find_by_document("doc-1")] == [3, 1]
+    # Une mention par analyse, quelle que soit la graphie
+    assert history.competitors_in_sector("ÉNERGIE") == [
+        {"competitor": "Rival X", "mentions": 2}, {"competitor": "Rival Y", "mentions": 1},
+    ]
+
+
+def test_load_and_delete(history):
+    entry = history.load(3)
+    assert entry["analysis"] == "rapport 3"
+    assert entry["web_data"] == {"industry_news": [{"title": "t"}]}
+    assert entry["options"] == {"retrieval": True}
+    assert entry["company_info"]["concurrents_mentionnes"] == ["rival x"]
+
+    history.delete(1)
+    assert history.load(1) is None
+    assert history.count() == 2
+    assert history.competitors_in_sector("énergie") == [{"competitor": "rival x", "mentions": 1}]
+
+
+def test_history_persists_across_connections(history):
+    reopened = AnalysisHistory(history.path)
+    assert [row["id"] for row in reopened.list_analyses()] == [3, 2, 1]
+
+
+def test_record_analysis_skips_unidentified_companies(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "_default_history", AnalysisHistory(str(tmp_path / "default.sqlite")))
+    assert history_store.record_analysis({}, {}, "rapport", "doc") is None
+    assert history_store.record_analysis(_info("Société C"), {}, "rapport", "doc") == 1
+    monkeypatch.setattr(history_store, "HISTORY_ENABLED", False)
+    assert history_store.record_analysis(_info("Société C"), {}, "rapport", "doc") is None
@@ -0,0 +1,49 @@
+from fpdf import FPDF
+
+import benchmark
+import incremental
+
+
+def _write_report(path, pages, edited_page=None, addition=""):
+    pdf = FPDF()
+    pdf.set_font("helvetica", size=10)
+    for page in range(pages):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, f"Rapport annuel - page {page + 1}")
+        pdf.ln(2)
+        for i in range(6):
+            pdf.multi_cell(0, 5, benchmark.PARAGRAPH.format(year=2000 + (page + i) % 25, growth=(page * 7 + i) % 30))
+            pdf.ln(2)
+        if page == edited_page:
+            pdf.multi_cell(0, 5, addition)
+    pdf.output(str(path))
+    return str(path)
+
+
+def test_editing_one_page_keeps_unrelated_sections(fake_models, tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental, "MANIFEST_DIR", str(tmp_path / "manifests"))
+    path = tmp_path / "rapport.pdf"
+
+    first = incremental.run_incremental_analysis(_write_report(path, 40), llm=fake_models)
+    assert len(first["changes"]["regenerated_sections"]) == len(incremental.SECTIONS)
+
+    _write_report(path, 40, edited_page=30,
+                  addition="Nouveaux contrats clients et renegociation avec les fournisseurs de matieres premieres.")
+    changes = incremental.run_incremental_analysis(str(path), llm=fake_models)["changes"]
+
+    assert changes["changed_pages"] == [30]
+    assert changes["reextracted_chunks"] == 1
+    assert set(changes["regenerated_sections"]) <= {"clients", "fournisseurs"}
+    assert "rivalite" not in changes["regenerated_sections"]
+
+
+def test_unchanged_document_is_fully_cached(fake_models, tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental, "MANIFEST_DIR", str(tmp_path / "manifests"))
+    path = _write_report(tmp_path / "rapport.pdf", 12)
+
+    incremental.run_incremental_analysis(path, llm=fake_models)
+    changes = incremental.run_incremental_analysis(path, llm=fake_models)["changes"]
+
+    assert changes["reextracted_chunks"] == 0
+    assert changes["regenerated_sections"] == []
+    assert not changes["synthesis_regenerated"]
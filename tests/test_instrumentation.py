@@ -0,0 +1,71 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from instrumentation import (
+    TokenUsageCallback,
+    record_llm_call,
+    stage,
+    start_trace,
+    summarize_trace,
+    traced,
+)
+
+
+@traced("extraction")
+def _extract():
+    record_llm_call(prompt_tokens=100, completion_tokens=40, generation_s=2.0)
+    record_llm_call(cache_hit=True)
+    return "ok"
+
+
+def test_trace_export_round_trips_stages(tmp_path):
+    with start_trace(source="rapport.pdf") as trace:
+        assert _extract() == "ok"
+        with pytest.raises(ValueError):
+            with stage("rendu"):
+                raise ValueError("police absente")
+
+    path = trace.export(str(tmp_path))
+    with open(path, encoding="utf-8") as f:
+        exported = json.load(f)
+
+    assert exported["run_id"] == trace.run_id
+    assert exported["metadata"] == {"source": "rapport.pdf"}
+    assert exported["wall_s"] >= sum(s["wall_s"] for s in exported["stages"])
+    extraction, rendering = exported["stages"]
+    assert (extraction["name"], extraction["llm_calls"], extraction["cache_hits"]) == ("extraction", 2, 1)
+    assert (extraction["prompt_tokens"], extraction["completion_tokens"], extraction["tokens_per_s"]) == (100, 40, 20.0)
+    assert rendering["error"] == "ValueError('police absente')"
+
+    rows = summarize_trace(exported)
+    assert [row["Étape"] for row in rows] == ["extraction", "rendu"]
+    assert rows[0]["Tokens/s"] == 20.0
+    assert rows[1]["Tokens/s"] is None
+
+
+def test_stages_outside_a_trace_are_not_recorded():
+    with stage("libre") as record:
+        assert record is None
+        record_llm_call(prompt_tokens=10)
+    assert _extract() == "ok"
+
+
+def test_token_callback_reports_to_the_stage_it_was_created_in():
+    response = SimpleNamespace(generations=[[SimpleNamespace(generation_info={
+        "prompt_eval_count": 50, "eval_count": 25, "eval_duration": 500_000_000,
+    })]])
+    with start_trace() as trace:
+        with stage("generation"):
+            callback = TokenUsageCallback()
+        # Fin de génération signalée depuis un autre thread, hors de l'étape
+        thread = threading.Thread(target=callback.on_llm_end, args=(response,))
+        thread.start()
+        thread.join()
+
+    record = trace.stages[0]
+    assert callback.reported
+    assert (record.llm_calls, record.prompt_tokens, record.completion_tokens) == (1, 50, 25)
+    assert record.tokens_per_s == 50.0
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from jobs import DONE, FAILED, PENDING, RUNNING, JobManager
+
+
+def _wait(manager, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.status in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("tâche non terminée")
+
+
+def test_job_publishes_progress_text_and_result():
+    manager = JobManager(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def work(handle, value):
+        handle.update(0.5, "À mi-chemin")
+        handle.append_text("Bon")
+        handle.append_text("jour")
+        started.set()
+        release.wait(timeout=10)
+        return value * 2
+
+    job_id = manager.submit(work, 21)
+    assert started.wait(timeout=10)
+    job = manager.get(job_id)
+    assert (job.status, job.progress, job.message, job.partial_text) == (RUNNING, 0.5, "À mi-chemin", "Bonjour")
+
+    # get() renvoie une copie : la modifier ne change pas l'état partagé
+    job.status = FAILED
+    assert manager.get(job_id).status == RUNNING
+
+    release.set()
+    job = _wait(manager, job_id)
+    assert (job.status, job.progress, job.result) == (DONE, 1.0, 42)
+    assert job.finished_at is not None
+
+
+def test_failing_job_keeps_the_error():
+    manager = JobManager(max_workers=1)
+
+    def fail(handle):
+        raise ValueError("document illisible")
+
+    job = _wait(manager, manager.submit(fail))
+    assert job.status == FAILED
+    assert job.error.startswith("document illisible")
+    assert "ValueError" in job.error
+    assert manager.get("inconnu") is None
+
+
+def test_jobs_wait_for_a_free_worker():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    first = manager.submit(lambda handle: release.wait(timeout=10))
+    second = manager.submit(lambda handle: "ok")
+
+    assert manager.get(second).status == PENDING
+    release.set()
+    assert _wait(manager, first).status == DONE
+    assert _wait(manager, second).result == "ok"
+
+
+def test_oldest_finished_jobs_are_forgotten():
+    manager = JobManager(max_workers=1, max_finished=2)
+    job_ids = []
+    for i in range(4):
+        job_ids.append(manager.submit(lambda handle, i=i: i))
+        _wait(manager, job_ids[-1])
+
+    # Le nettoyage a lieu à la soumission suivante
+    manager.submit(lambda handle: None)
+    assert manager.get(job_ids[0]) is None
+    assert manager.get(job_ids[1]) is None
+    assert [manager.get(job_id).result for job_id in job_ids[2:]] == [2, 3]
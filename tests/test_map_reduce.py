@@ -0,0 +1,12 @@
+from map_reduce import estimate_tokens, split_into_chunks
+from prompt_budget import count_tokens
+
+TEXT = "La société renforce ses positions face aux concurrents européens (prix −5 %, 2024). " * 300
+
+
+def test_chunks_use_prompt_token_count():
+    assert estimate_tokens(TEXT) == count_tokens(TEXT)
+    chunks = split_into_chunks(TEXT, max_tokens=200, overlap_tokens=0)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+    assert " ".join(chunks).split() == TEXT.split()
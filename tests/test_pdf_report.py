@@ -0,0 +1,21 @@
+from pdf_report import LINE_HEIGHT, Block, PDFReportRenderer
+
+
+def test_list_marker_stays_with_its_text_across_page_break():
+    renderer = PDFReportRenderer()
+    pdf = renderer.pdf
+    assert pdf.page == 1
+    drawn = []
+    cell = pdf.cell
+
+    def recording_cell(w=None, h=None, text="", *args, **kwargs):
+        drawn.append((pdf.page, text))
+        return cell(w, h, text, *args, **kwargs)
+
+    pdf.cell = recording_cell
+    # Curseur juste au-dessus du bas de page : la ligne de la puce ne tient plus sur cette page
+    pdf.set_y(pdf.page_break_trigger - LINE_HEIGHT / 2)
+    renderer.render_blocks([Block("numbered", "Point de liste", marker="1.")])
+    first_page = pdf.page
+    assert drawn == [(first_page, "1."), (first_page, "Point de liste")]
+    assert first_page == 2
@@ -0,0 +1,25 @@
+from fakes import FakeLLM
+from porter_sections import FORCES, SECTIONS, generate_synthesis
+
+
+class RecordingLLM(FakeLLM):
+    def __init__(self):
+        super().__init__(latency_s=0, tokens_per_s=0)
+        self.prompts = []
+
+    def _response(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return "Synthèse."
+
+
+def test_synthesis_uses_forces_by_key_when_some_are_missing():
+    # Deux forces omises (délai atteint) : les actualités et recommandations ne doivent pas les remplacer
+    texts = {section.key: f"{section.heading}\ntexte-{section.key}" for section in SECTIONS
+             if section.key not in ("rivalite", "clients")}
+    llm = RecordingLLM()
+    assert generate_synthesis(llm, "Société", texts, use_cache=False) == "Synthèse."
+    prompt = llm.prompts[0]
+    for key in FORCES:
+        assert (f"texte-{key}" in prompt) == (key in texts)
+    for section in SECTIONS[5:]:
+        assert f"texte-{section.key}" not in prompt
@@ -0,0 +1,101 @@
+import asyncio
+import io
+import threading
+
+import pytest
+
+from map_reduce import parallel_map
+from progress import DONE, FAILED, START, UPDATE, TerminalProgress, fraction_listener, listen, task
+
+
+def test_nested_tasks_report_their_parent():
+    events = []
+    with listen(events.append):
+        with task("Analyse") as root:
+            root.update(0.5)
+            with task("Extraction") as child:
+                pass
+
+    assert [(e.kind, e.message) for e in events] == [
+        (START, "Analyse"), (UPDATE, "Analyse"), (START, "Extraction"), (DONE, "Extraction"), (DONE, "Analyse"),
+    ]
+    assert events[0].parent_id is None
+    assert events[2].task_id == child.task_id
+    assert events[2].parent_id == root.task_id
+    assert events[1].fraction == 0.5
+
+
+def test_failure_is_published_and_raised():
+    events = []
+    with listen(events.append), pytest.raises(ValueError):
+        with task("Rendu"):
+            raise ValueError("police absente")
+
+    assert events[-1].kind == FAILED
+    assert events[-1].error == "police absente"
+
+
+def test_concurrent_analyses_only_see_their_own_events():
+    received = {"a": [], "b": []}
+    barrier = threading.Barrier(2)
+
+    def step(label):
+        with task(label):
+            pass
+
+    def analysis(name):
+        with listen(received[name].append):
+            with task(f"Analyse {name}"):
+                barrier.wait(timeout=5)
+                # Sous-tâches exécutées dans des threads : elles héritent du contexte
+                parallel_map(step, [f"{name}-{i}" for i in range(3)], max_workers=3)
+
+    threads = [threading.Thread(target=analysis, args=(name,)) for name in received]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for name, events in received.items():
+        assert {e.message for e in events} == {f"Analyse {name}"} | {f"{name}-{i}" for i in range(3)}
+        root = events[0].task_id
+        assert all(e.parent_id == root for e in events if e.message != f"Analyse {name}")
+
+
+def test_asyncio_tasks_keep_their_listeners():
+    async def analysis(events):
+        with listen(events.append):
+            with task("Recherche"):
+                await asyncio.sleep(0)
+
+    async def main():
+        first, second = [], []
+        await asyncio.gather(analysis(first), analysis(second))
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert [e.kind for e in first] == [START, DONE]
+    assert {e.task_id for e in first}.isdisjoint({e.task_id for e in second})
+
+
+def test_listener_errors_do_not_stop_the_task():
+    def broken(event):
+        raise RuntimeError("affichage")
+
+    with listen(broken):
+        with task("Analyse"):
+            result = "terminé"
+    assert result == "terminé"
+
+
+def test_fraction_and_terminal_listeners():
+    calls, stream = [], io.StringIO()
+    with listen(fraction_listener(lambda fraction, message: calls.append((fraction, message)))), \
+            listen(TerminalProgress(stream)):
+        with task("Analyse") as root:
+            root.update(0.25)
+            with task("Extraction"):
+                pass
+
+    assert calls == [(0.0, "Analyse"), (0.25, "Analyse"), (0.25, "Extraction")]
+    assert stream.getvalue() == "Analyse\nAnalyse\n✅ Extraction terminé !\n"
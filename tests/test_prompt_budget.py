@@ -0,0 +1,29 @@
+import complet
+from prompt_budget import count_tokens, fit_text, fit_text_with_offset
+
+IRREGULAR_TEXT = "".join(
+    f"Paragraphe  {i} :  le chiffre d'affaires   progresse.\r\nLa marge  {i} reste stable.  \r\n\r\n"
+    for i in range(120)
+)
+
+
+def test_fit_text_offset_resumes_after_the_extract():
+    head, offset = fit_text_with_offset(IRREGULAR_TEXT, 300)
+
+    assert head == fit_text(IRREGULAR_TEXT, 300)
+    assert count_tokens(head) <= 300
+    assert head.split() + IRREGULAR_TEXT[offset:].split() == IRREGULAR_TEXT.split()
+
+
+def test_fit_text_offset_within_a_sentence():
+    text = "mot  " * 400
+    head, offset = fit_text_with_offset(text, 50)
+
+    assert head.split() + text[offset:].split() == text.split()
+
+
+def test_document_head_and_continuation_cover_the_text():
+    head, continuation = complet._split_document_head(IRREGULAR_TEXT)
+
+    assert continuation
+    assert head.split() + continuation.split() == IRREGULAR_TEXT[:complet.EXTRACTION_MAX_CHARS].split()
@@ -0,0 +1,74 @@
+import os
+
+import retrieval
+from map_reduce import estimate_tokens
+
+PARAGRAPHS = [
+    "Nos fournisseurs de matières premières ont relevé leurs prix de 12 %.",
+    "Le conseil a approuvé le rapport de gestion et les comptes annuels.",
+    "La concurrence s'intensifie : deux concurrents ont baissé leurs prix.",
+    "Les clients grands comptes représentent 40 % du chiffre d'affaires.",
+]
+
+
+def _document(filler=30):
+    # Passages distincts : chaque paragraphe suivi de texte neutre
+    neutral = " ".join(f"mention{i}" for i in range(filler))
+    return "\n".join(f"{paragraph} {neutral}" for paragraph in PARAGRAPHS)
+
+
+def test_search_ranks_the_matching_passage_first():
+    index = retrieval.BM25Index.build(_document(filler=200))
+    assert len(index.passages) == len(PARAGRAPHS)
+
+    assert index.search("fournisseurs matières premières")[0][1] == 0
+    assert index.search("concurrents concurrence")[0][1] == 2
+    assert index.search("inexistant") == []
+
+
+def test_retrieve_respects_budget_and_document_order():
+    index = retrieval.BM25Index.build(_document(filler=200))
+    budget = max(estimate_tokens(passage) for passage in index.passages) + 1
+
+    assert index.retrieve(["clients", "fournisseurs"], budget) == index.passages[3]
+    both = index.retrieve(["clients", "fournisseurs"], 10 * budget)
+    assert both == "\n[...]\n".join([index.passages[0], index.passages[3]])
+
+
+def test_stable_ranking_ignores_changes_elsewhere():
+    passages = retrieval.build_passages(_document(filler=200))
+    edited = passages[:2] + [passages[2] + " concurrents nouveaux entrants"] + passages[3:]
+
+    assert retrieval.retrieve_stable(passages, ["clients"], 1000) == passages[3]
+    assert retrieval.retrieve_stable(edited, ["clients"], 1000) == passages[3]
+
+
+def test_index_is_persisted_and_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrieval, "RETRIEVAL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(retrieval, "_indexes", retrieval.OrderedDict())
+    text = _document(filler=200)
+
+    built = retrieval.get_document_index(text)
+    assert retrieval.get_document_index(text) is built
+    (path,) = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    assert path.endswith(f"-v{retrieval.INDEX_VERSION}.json")
+
+    # Nouveau processus : l'index est relu sur disque, pas reconstruit
+    retrieval._indexes.clear()
+    monkeypatch.setattr(retrieval.BM25Index, "build", classmethod(lambda cls, text: 1 / 0))
+    reloaded = retrieval.get_document_index(text)
+    assert reloaded is not built
+    assert reloaded.to_dict() == built.to_dict()
+    assert reloaded.search("clients") == built.search("clients")
+
+
+def test_unreadable_index_file_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(retrieval, "RETRIEVAL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(retrieval, "_indexes", retrieval.OrderedDict())
+    text = _document()
+    retrieval.get_document_index(text)
+    (name,) = os.listdir(tmp_path)
+    (tmp_path / name).write_text("{tronqué", encoding="utf-8")
+    retrieval._indexes.clear()
+
+    assert retrieval.get_document_index(text).passages == retrieval.build_passages(text)
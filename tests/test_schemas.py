@@ -0,0 +1,72 @@
+import json
+
+import complet
+from schemas import PartialCompanyInfo, validate_analysis_plan, validate_company_info
+
+VALID = {"nom_entreprise": " Société Exemple ", "domaines_activite": ["énergie", "Énergie", "", "logistique"],
+         "concurrents_mentionnes": "Concurrent A", "champ_inconnu": 1}
+
+
+class ScriptedLLM:
+    """Renvoie les réponses prévues dans l'ordre et garde les prompts reçus."""
+
+    model = "scripted"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def invoke(self, prompt, config=None, **kwargs):
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+def test_company_info_is_normalized():
+    data, errors = validate_company_info(json.dumps(VALID))
+
+    assert errors is None
+    assert data == {"nom_entreprise": "Société Exemple", "domaines_activite": ["énergie", "logistique"],
+                    "secteur_principal": "", "pays": "", "concurrents_mentionnes": ["Concurrent A"]}
+
+
+def test_invalid_responses_give_readable_errors():
+    data, errors = validate_company_info('{"nom_entreprise": "Soci')
+    assert data is None and errors.startswith("JSON invalide ou tronqué")
+
+    data, errors = validate_company_info(json.dumps({"domaines_activite": [f"domaine {i}" for i in range(7)]}))
+    assert data is None
+    assert "nom_entreprise" in errors and "domaines_activite" in errors
+
+    data, errors = validate_analysis_plan(json.dumps({"entreprise": VALID, "plan": {"clients": "Un point"}}))
+    assert errors is None
+    assert data["plan"]["clients"] == ["Un point"]
+
+
+def test_partial_company_info_keeps_closed_values_only():
+    partial = PartialCompanyInfo()
+
+    assert not partial.feed('{"nom_entreprise": "Société Ex')
+    assert partial.info == {}
+    assert partial.feed('emple", "domaines_activite": ["énergie", "logis')
+    assert partial.info == {"nom_entreprise": "Société Exemple", "domaines_activite": ["énergie"]}
+    assert not partial.feed("ti")
+    assert partial.feed('que"]}')
+    assert partial.info["domaines_activite"] == ["énergie", "logistique"]
+
+
+def test_invalid_extraction_is_repaired_with_a_single_call():
+    llm = ScriptedLLM('{"nom_entreprise": ""}', json.dumps(VALID))
+
+    info = complet.extract_partial_company_info("Rapport annuel", llm, use_cache=False)
+
+    assert info["nom_entreprise"] == "Société Exemple"
+    assert len(llm.prompts) == 2
+    assert "ne respecte pas le schéma" in llm.prompts[1]
+    assert '{"nom_entreprise": ""}' in llm.prompts[1]
+
+
+def test_extraction_gives_up_after_one_repair():
+    llm = ScriptedLLM("pas du JSON", "toujours pas", json.dumps(VALID))
+
+    assert complet.extract_partial_company_info("Rapport annuel", llm, use_cache=False) == {}
+    assert len(llm.prompts) == 2
@@ -0,0 +1,64 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cache_store import SQLiteCache
+from search_backends import CachedSearchBackend, SerpApiBackend, TokenBucket, get_http_session
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_token_bucket_rejects_non_positive_rate(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate)
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # Le premier jeton est disponible immédiatement, les 4 suivants à 1/20 s d'intervalle
+    assert time.monotonic() - started >= 4 / 20 * 0.9
+
+
+@pytest.fixture
+def serpapi_server():
+    """Faux SerpApi local : la première requête répond 503, les suivantes des résultats."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            if len(calls) == 1:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = json.dumps({"organic_results": [{"title": "Résultat", "link": "https://example.com"}]})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body.encode("utf-8"))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", calls
+    server.shutdown()
+
+
+def test_transient_error_is_retried_and_result_cached(serpapi_server, tmp_path):
+    base_url, calls = serpapi_server
+    backend = SerpApiBackend("cle", base_url, session=get_http_session(), rate_limiter=TokenBucket(100))
+    cached = CachedSearchBackend(backend, SQLiteCache(str(tmp_path / "search.sqlite"), 3600, 1024 * 1024))
+
+    results = cached.search("énergie", num_results=1)
+    assert results[0]["title"] == "Résultat"
+    assert len(calls) == 2  # 503 puis succès
+
+    assert cached.search("énergie", num_results=1) == results
+    assert len(calls) == 2  # servi par le cache
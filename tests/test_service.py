@@ -0,0 +1,136 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+import service
+from fakes import FakeLLM
+from jobs import DONE, FAILED
+from llm_registry import register_llm
+from porter_sections import SECTIONS
+from tiers import TIERS
+
+
+class NoRunService(service.AnalysisService):
+    """Service dont les tâches ne sont jamais exécutées."""
+
+    def __init__(self, directory):
+        super().__init__(max_workers=1, directory=directory)
+        self.submitted = []
+
+    def submit(self, content, options):
+        self.submitted.append((content, options))
+        return {"job_id": "job", "coalesced": False}
+
+
+class BlockingLLM(FakeLLM):
+    """FakeLLM dont les appels attendent release : la première tâche reste en cours."""
+
+    def __init__(self):
+        super().__init__(latency_s=0, tokens_per_s=0, output_tokens=120)
+        self.release = threading.Event()
+
+    def invoke(self, prompt, config=None, **kwargs):
+        self.release.wait(timeout=30)
+        return super().invoke(prompt, config, **kwargs)
+
+    def stream(self, prompt, config=None, **kwargs):
+        self.release.wait(timeout=30)
+        yield from super().stream(prompt, config, **kwargs)
+
+
+def test_read_upload_stops_past_limit(monkeypatch):
+    monkeypatch.setattr(service, "UPLOAD_CHUNK_BYTES", 4)
+    upload = UploadFile(io.BytesIO(b"%PDF" + b"x" * 100))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(service.read_upload(upload, max_bytes=10))
+    assert error.value.status_code == 413
+    # Lecture arrêtée au premier morceau qui dépasse la limite
+    assert upload.file.tell() == 12
+
+
+def test_oversized_upload_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "MAX_UPLOAD_MB", 1)
+    backend = NoRunService(str(tmp_path))
+    client = TestClient(service.create_app(backend))
+    content = b"%PDF" + b"x" * (2 * 1024 * 1024)
+    response = client.post("/analyses", files={"file": ("a.pdf", content, "application/pdf")})
+    assert response.status_code == 413
+    assert backend.submitted == []
+
+    response = client.post("/analyses", files={"file": ("a.pdf", b"%PDF-1.4 petit", "application/pdf")})
+    assert response.status_code == 202
+    assert backend.submitted[0][0] == b"%PDF-1.4 petit"
+
+
+def _wait(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/analyses/{job_id}").json()
+        if status["status"] in (DONE, FAILED):
+            return status
+        time.sleep(0.05)
+    raise AssertionError("analyse non terminée")
+
+
+def test_tier_options_apply_when_flags_are_not_sent(tmp_path, fake_models, sample_pdf):
+    backend = service.AnalysisService(max_workers=1, directory=str(tmp_path))
+    client = TestClient(service.create_app(backend))
+    with open(sample_pdf, "rb") as f:
+        content = f.read()
+
+    response = client.post("/analyses", files={"file": ("a.pdf", content, "application/pdf")}, data={"tier": "deep"})
+    assert _wait(client, response.json()["job_id"])["status"] == DONE
+    result = backend.manager.get(response.json()["job_id"]).result
+    analysis_stage = next(s for s in result["trace"]["stages"] if s["name"] == "generate_enhanced_porter_analysis")
+    # Niveau deep : une génération par section plus la synthèse, et non le prompt unique
+    assert analysis_stage["llm_calls"] == len(SECTIONS) + 1
+    assert result["trace"]["metadata"]["options"] == {"parallel_sections": True, "retrieval": True}
+    for section in SECTIONS:
+        assert section.heading in result["analysis"]
+
+    # Une option envoyée explicitement l'emporte sur le niveau
+    response = client.post("/analyses", files={"file": ("a.pdf", content, "application/pdf")},
+                           data={"tier": "deep", "parallel_sections": "false"})
+    assert _wait(client, response.json()["job_id"])["status"] == DONE
+    result = backend.manager.get(response.json()["job_id"]).result
+    analysis_stage = next(s for s in result["trace"]["stages"] if s["name"] == "generate_enhanced_porter_analysis")
+    assert analysis_stage["llm_calls"] == 1
+
+
+def test_identical_submissions_are_coalesced(tmp_path, fake_models, sample_pdf):
+    llm = BlockingLLM()
+    for model in {tier.model for tier in TIERS.values()}:
+        register_llm(llm, model)
+    backend = service.AnalysisService(max_workers=1, directory=str(tmp_path))
+    client = TestClient(service.create_app(backend))
+    with open(sample_pdf, "rb") as f:
+        content = f.read()
+
+    def post(**data):
+        response = client.post("/analyses", files={"file": ("a.pdf", content, "application/pdf")}, data=data)
+        assert response.status_code == 202
+        return response.json()
+
+    try:
+        first = post(tier="fast", retrieval="true")
+        second = post(tier="fast", retrieval="true")
+        other_tier = post(tier="standard", retrieval="true")
+    finally:
+        llm.release.set()
+
+    assert first["coalesced"] is False
+    assert second == dict(first, coalesced=True)
+    assert other_tier["coalesced"] is False
+    assert other_tier["job_id"] != first["job_id"]
+    assert _wait(client, first["job_id"])["status"] == DONE
+    assert _wait(client, other_tier["job_id"])["status"] == DONE
+
+    # Une fois la tâche terminée, la même demande relance une analyse
+    again = post(tier="fast", retrieval="true")
+    assert again["job_id"] != first["job_id"]
+    assert _wait(client, again["job_id"])["status"] == DONE
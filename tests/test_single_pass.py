@@ -0,0 +1,49 @@
+import complet
+from fakes import FAKE_COMPANY_INFO, FakeLLM
+
+
+class RecordingLLM(FakeLLM):
+    """FakeLLM qui garde ses prompts ; la réponse au prompt combiné peut être rendue invalide."""
+
+    def __init__(self, broken_plan=False):
+        super().__init__(latency_s=0, tokens_per_s=0, output_tokens=120)
+        self.broken_plan = broken_plan
+        self.prompts = []
+
+    def _response(self, prompt):
+        self.prompts.append(prompt)
+        if self.broken_plan and '"plan"' in prompt:
+            return '{"entreprise": {"nom_entreprise": "Société'
+        return super()._response(prompt)
+
+
+def _analysis_prompts(llm):
+    return [prompt for prompt in llm.prompts if "JSON" not in prompt]
+
+
+def _stage_names(result):
+    return [stage["name"] for stage in result["trace"]["stages"]]
+
+
+def test_single_pass_analyses_from_the_plan(fake_models, sample_pdf, tmp_path):
+    llm = RecordingLLM()
+    result = complet.run_enhanced_pipeline(sample_pdf, str(tmp_path / "rapport.pdf"), llm=llm, single_pass=True)
+
+    assert result["company_info"] == FAKE_COMPANY_INFO
+    assert "extract_company_info" not in _stage_names(result)
+    (analysis_prompt,) = _analysis_prompts(llm)
+    assert "Points clés relevés dans le document" in analysis_prompt
+
+
+def test_invalid_plan_falls_back_to_the_document(fake_models, sample_pdf, tmp_path):
+    llm = RecordingLLM(broken_plan=True)
+    result = complet.run_enhanced_pipeline(sample_pdf, str(tmp_path / "rapport.pdf"), llm=llm, single_pass=True)
+
+    # Prompt combiné puis sa réparation, tous deux invalides : extraction et analyse reprennent le document
+    assert sum('"plan"' in prompt for prompt in llm.prompts) == 2
+    assert "extract_company_info" in _stage_names(result)
+    assert result["company_info"] == FAKE_COMPANY_INFO
+    (analysis_prompt,) = _analysis_prompts(llm)
+    assert "Points clés relevés dans le document" not in analysis_prompt
+    assert "Le chiffre d'affaires progresse" in analysis_prompt
+    assert result["output_path"] and (tmp_path / "rapport.pdf").exists()
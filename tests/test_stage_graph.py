@@ -0,0 +1,60 @@
+import contextvars
+import threading
+
+import pytest
+
+from stage_graph import Stage, check_graph, run_stage_graph
+
+
+def test_check_graph_orders_and_rejects_bad_graphs():
+    stages = [Stage("c", None, ("a", "b")), Stage("b", None, ("source",)), Stage("a", None, ("source",))]
+    assert [stage.name for stage in check_graph(stages, ["source"])] == ["b", "a", "c"]
+
+    with pytest.raises(ValueError, match="inconnues pour c : b"):
+        check_graph([Stage("c", None, ("b",))])
+    with pytest.raises(ValueError, match="deux fois : a"):
+        check_graph([Stage("a", None), Stage("a", None)])
+    with pytest.raises(ValueError, match="Cycle"):
+        check_graph([Stage("a", None, ("b",)), Stage("b", None, ("a",))])
+
+
+def test_stages_receive_dependency_results_in_order():
+    started = []
+    results = run_stage_graph([
+        Stage("somme", lambda double, triple: double + triple, ("double", "triple")),
+        Stage("double", lambda valeur: valeur * 2, ("valeur",)),
+        Stage("triple", lambda valeur: valeur * 3, ("valeur",)),
+    ], inputs={"valeur": 5}, on_start=started.append)
+
+    assert results == {"valeur": 5, "double": 10, "triple": 15, "somme": 25}
+    assert started[-1] == "somme"
+    assert set(started[:2]) == {"double", "triple"}
+
+
+def test_independent_stages_run_in_parallel_with_the_caller_context():
+    variable = contextvars.ContextVar("variable")
+    variable.set("appelant")
+    barrier = threading.Barrier(2)
+
+    def branch():
+        # Bloquerait si les deux branches ne tournaient pas en même temps
+        barrier.wait(timeout=5)
+        return variable.get()
+
+    results = run_stage_graph([Stage("a", branch), Stage("b", branch)])
+    assert (results["a"], results["b"]) == ("appelant", "appelant")
+
+
+def test_first_failure_is_raised_and_dependents_never_start():
+    started = []
+
+    def fail():
+        raise RuntimeError("extraction impossible")
+
+    with pytest.raises(RuntimeError, match="extraction impossible"):
+        run_stage_graph([
+            Stage("extraction", fail),
+            Stage("analyse", lambda extraction: extraction, ("extraction",)),
+            Stage("rendu", lambda analyse: analyse, ("analyse",)),
+        ], on_start=started.append)
+    assert started == ["extraction"]
@@ -0,0 +1,47 @@
+import os
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from llm_registry import MODEL_NAME
+from porter_sections import FORCES, SECTIONS
+
+# === Configuration ===
+FAST_MODEL = os.getenv("OLLAMA_FAST_MODEL", MODEL_NAME)
+DEEP_MODEL = os.getenv("OLLAMA_DEEP_MODEL", MODEL_NAME)
+DEFAULT_TIER = os.getenv("ANALYSIS_TIER", "standard")
+# Temps gardé en fin d'échéance pour le rendu du PDF (secondes)
+DEADLINE_RESERVE_S = float(os.getenv("DEADLINE_RESERVE_S", "2"))
+# Part du temps restant accordée à la recherche web quand une échéance est fixée
+DEADLINE_SEARCH_SHARE = 0.2
+# Part du temps de génération réservée aux sections, le reste à la synthèse
+DEADLINE_SECTIONS_SHARE = 0.85
+
+ALL_SECTIONS = tuple(section.key for section in SECTIONS)
+
+
+class AnalysisTier(NamedTuple):
+    name: str
+    model: str
+    slot_tokens: Optional[Dict[str, int]]   # budgets des variables du prompt (None : ANALYSIS_SLOT_TOKENS)
+    output_tokens: Optional[int]            # num_predict par appel de génération (None : non borné)
+    sections: Tuple[str, ...]               # clés de SECTIONS produites
+    synthesis: bool                         # synthèse exécutive (appel supplémentaire en mode par sections)
+    options: Dict[str, bool]                # options par défaut de generate_enhanced_porter_analysis
+
+
+TIERS: Dict[str, AnalysisTier] = {
+    # Aperçu en une trentaine de secondes : les cinq forces seules, réponses courtes
+    "fast": AnalysisTier("fast", FAST_MODEL, {"company_info": 100, "original_text": 400, "web_data": 300},
+                         250, FORCES, False, {"parallel_sections": True}),
+    # Comportement historique : un seul prompt pour le rapport complet
+    "standard": AnalysisTier("standard", MODEL_NAME, None, None, ALL_SECTIONS, True, {}),
+    # Rapport de fond : plus de contexte, passages retrouvés par section, réponses longues
+    "deep": AnalysisTier("deep", DEEP_MODEL, {"company_info": 200, "original_text": 2500, "web_data": 1500},
+                         1500, ALL_SECTIONS, True, {"parallel_sections": True, "retrieval": True}),
+}
+
+
+def get_tier(name: Optional[str] = None) -> AnalysisTier:
+    name = name or DEFAULT_TIER
+    if name not in TIERS:
+        raise ValueError(f"Niveau d'analyse inconnu : {name} (choix : {', '.join(TIERS)})")
+    return TIERS[name]